@@ -0,0 +1,259 @@
+# benchmarks/run_benchmarks.py
+"""
+Mesures de performance sans interface graphique (plateforme Qt 'offscreen') :
+chargement via AppController.select_data_source (avec et sans cache de lecture), mémoire,
+lecture et édition du modèle, requêtes spatiales, annulation, écriture du fichier et
+publication vers un dépôt nu local servant de remote.
+
+Les résultats sont écrits en JSON pour comparer les versions entre elles :
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --output resultats.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import git
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtCore import QCoreApplication, QEventLoop
+
+from controller import AppController
+from geojson_io import write_geojson
+from git_handler import GitHandler
+from logging_setup import logger
+from parse_cache import ParseCache
+from synthetic import KINDS, column_types, write_collection
+
+DATA_FILE = "data.geojson"
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def setup_repository(workdir, size, kind):
+    """
+    Crée un dépôt nu local (le 'remote') contenant un fichier synthétique, et renvoie
+    le chemin d'une copie de travail clonée depuis ce dépôt.
+    """
+    seed_path = os.path.join(workdir, 'seed')
+    git.Repo.init(seed_path)
+    write_collection(os.path.join(seed_path, DATA_FILE), size, kind)
+    result = GitHandler(seed_path).commit([DATA_FILE], "Données synthétiques")
+    if result is not True: raise RuntimeError(result)
+    remote_path = os.path.join(workdir, 'remote.git')
+    git.Repo.clone_from(seed_path, remote_path, bare=True)
+    work_path = os.path.join(workdir, 'work')
+    git.Repo.clone_from(remote_path, work_path)
+    shutil.rmtree(seed_path, ignore_errors=True)
+    return work_path
+
+
+def load(repo_path, kind, storage, cache_dir=None):
+    """
+    Charge le fichier comme le fait l'application. Renvoie (contrôleur, durée totale, durée jusqu'aux premières lignes).
+    Le cache de lecture n'est utilisé que dans 'cache_dir', jamais celui de l'utilisateur.
+    """
+    controller = AppController()
+    controller.config = {"LOCAL_REPO_PATH": repo_path, "CACHE_MAX_MB": 1024 if cache_dir else 0}
+    if cache_dir: controller.parse_cache = ParseCache(cache_dir)
+    file_info = {"name": kind, "path": DATA_FILE, "types": column_types(kind), "storage": storage}
+    loop, errors, first_rows = QEventLoop(), [], []
+
+    def on_failed(success, message):
+        errors.append(message)
+        loop.quit()
+    controller.data_loaded_and_ready.connect(lambda name: loop.quit())
+    controller.clone_finished.connect(on_failed)
+
+    start = time.perf_counter()
+    controller.select_data_source(file_info)
+    controller.model.rowsInserted.connect(lambda *args: first_rows or first_rows.append(time.perf_counter() - start))
+    loop.exec()
+    elapsed = time.perf_counter() - start
+    if errors: raise RuntimeError(errors[0])
+    return controller, elapsed, first_rows[0] if first_rows else elapsed
+
+
+def measure_memory(repo_path, kind, storage):
+    """Pic et reste d'allocations Python pendant et après le chargement (en Mo)."""
+    gc.collect()
+    tracemalloc.start()
+    controller, _, _ = load(repo_path, kind, storage)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del controller
+    gc.collect()
+    return {"peak_memory_mb": round(peak / 1e6, 1), "retained_memory_mb": round(current / 1e6, 1)}
+
+
+def text_column(model, kind):
+    """Première colonne non entière : celle qu'on édite pendant les mesures."""
+    types = column_types(kind)
+    return next(column for column, header in enumerate(model.get_headers(), start=1) if header not in types)
+
+
+def bench_data(model, samples, rng):
+    rows, columns = model.rowCount(), model.columnCount()
+    indexes = [model.index(rng.randrange(rows), rng.randrange(1, columns)) for _ in range(samples)]
+    start = time.perf_counter()
+    for index in indexes: model.data(index)
+    return samples / (time.perf_counter() - start)
+
+
+def edit_cells(model, column, count, rng):
+    """Modifie 'count' cellules au hasard. Renvoie la durée moyenne d'un setData (en microsecondes)."""
+    indexes = [model.index(rng.randrange(model.rowCount()), column) for _ in range(count)]
+    start = time.perf_counter()
+    for number, index in enumerate(indexes): model.setData(index, f"Valeur modifiée {number}")
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def bench_remove(model, count, rng):
+    """Supprime 'count' lignes une à une. Renvoie la durée moyenne d'une suppression (en millisecondes)."""
+    rows = [rng.randrange(model.rowCount() - number) for number in range(count)]
+    start = time.perf_counter()
+    for row in rows: model.remove_rows([row])
+    return (time.perf_counter() - start) / count * 1e3
+
+
+def bench_bulk_remove(model, count, rng):
+    """Supprime d'un coup 'count' lignes dispersées (sélection multiple). Renvoie la durée (en millisecondes)."""
+    rows = rng.sample(range(model.rowCount()), min(count, model.rowCount() // 2))
+    start = time.perf_counter()
+    model.remove_rows(rows)
+    return (time.perf_counter() - start) * 1e3
+
+
+def bench_spatial(controller, queries, rng):
+    """Requêtes spatiales autour de points tirés au hasard. Renvoie les durées moyennes (en millisecondes)."""
+    points = [(rng.uniform(-17.35, -17.05), rng.uniform(14.55, 14.80)) for _ in range(queries)]
+    build_s, _ = timed(controller.current_session.spatial_index.build)
+    durations = {"spatial_build_s": build_s}
+    for name, query in (("nearest_ms", lambda x, y: controller.nearest_features(x, y, 10)),
+                        ("within_2km_ms", lambda x, y: controller.features_within_distance(x, y, 2000)),
+                        ("bbox_ms", lambda x, y: controller.features_in_bbox(x, y, x + 0.01, y + 0.01))):
+        start = time.perf_counter()
+        for x, y in points: query(x, y)
+        durations[f"spatial_{name}"] = (time.perf_counter() - start) / queries * 1e3
+    return durations
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def publish(handler, model, path, fast):
+    """Écrit le fichier puis commit et push vers le dépôt nu, comme GitPublishWorker."""
+    start = time.perf_counter()
+    model.source = write_geojson(path, model)
+    result = handler.commit_and_push([DATA_FILE], "Mesure de performance", fast=fast)
+    if result is not True: raise RuntimeError(result)
+    model.accept_changes()
+    return time.perf_counter() - start, dict(handler.timings)
+
+
+def run_case(size, kind, storage, options):
+    rng = random.Random(size)
+    workdir = tempfile.mkdtemp(prefix="geojson-bench-")
+    try:
+        repo_path = setup_repository(workdir, size, kind)
+        path = os.path.join(repo_path, DATA_FILE)
+        result = {"kind": kind, "features": size, "storage": storage,
+                  "file_mb": round(os.path.getsize(path) / 1e6, 2)}
+        if not options.skip_memory:
+            result.update(measure_memory(repo_path, kind, storage))
+
+        controller, result["load_s"], result["first_rows_s"] = load(repo_path, kind, storage)
+        cache_dir = os.path.join(workdir, 'cache')
+        load(repo_path, kind, storage, cache_dir) # Remplit le cache
+        _, result["load_cached_s"], _ = load(repo_path, kind, storage, cache_dir)
+        model = controller.model
+        column = text_column(model, kind)
+        result["data_cells_per_s"] = round(bench_data(model, options.samples, rng))
+        result.update(bench_spatial(controller, options.spatial_queries, rng))
+        result["set_data_us"] = round(edit_cells(model, column, options.edits, rng), 2)
+        result["remove_row_ms"] = round(bench_remove(model, options.deletions, rng), 3)
+        result["remove_bulk_ms"] = round(bench_bulk_remove(model, options.bulk_deletions, rng), 3)
+        result["revert_s"], _ = timed(model.revert_changes)
+
+        edit_cells(model, column, options.edits, rng)
+        source = model.source
+        result["save_incremental_s"], model.source = timed(write_geojson, path, model)
+        model.source = None
+        result["save_full_s"], model.source = timed(write_geojson, path, model)
+        model.source = source
+        handler = GitHandler(repo_path)
+        handler.repo.git.checkout('--', DATA_FILE)
+
+        if not options.skip_git:
+            result["commit_and_push_s"], result["git_stages_s"] = publish(handler, model, path, fast=True)
+            edit_cells(model, column, options.edits, rng)
+            result["commit_and_push_full_s"], result["git_stages_full_s"] = publish(handler, model, path, fast=False)
+        return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def environment():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {"date": datetime.now(timezone.utc).isoformat(timespec='seconds'), "revision": revision,
+            "python": platform.python_version(), "platform": platform.platform(), "pyside6": PYSIDE_VERSION,
+            "git": ".".join(map(str, git.Git().version_info))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance de l'éditeur GeoJSON.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Nombres de features à générer (jusqu'à 1000000).")
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--storage', choices=('columnar', 'dict', 'lazy'), default='columnar')
+    parser.add_argument('--samples', type=int, default=200000, help="Appels à data() mesurés.")
+    parser.add_argument('--edits', type=int, default=1000, help="Appels à setData() mesurés.")
+    parser.add_argument('--deletions', type=int, default=100, help="Lignes supprimées une à une.")
+    parser.add_argument('--bulk-deletions', type=int, default=5000, help="Lignes dispersées supprimées en une fois.")
+    parser.add_argument('--spatial-queries', type=int, default=1000, help="Requêtes spatiales mesurées par type.")
+    parser.add_argument('--skip-memory', action='store_true', help="Ne pas mesurer la mémoire (chargement supplémentaire).")
+    parser.add_argument('--skip-git', action='store_true', help="Ne pas mesurer commit_and_push.")
+    parser.add_argument('--output', help="Fichier JSON de résultats (sortie standard par défaut).")
+    options = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    QCoreApplication.instance() or QCoreApplication(sys.argv) # PySide garde l'instance (qApp)
+    results = []
+    for kind in options.kinds:
+        for size in options.sizes:
+            log(f"{kind} : {size} features...")
+            results.append(run_case(size, kind, options.storage, options))
+            log(json.dumps(results[-1]))
+
+    report = json.dumps({"environment": environment(), "results": results}, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f: f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/synthetic.py
+"""
+Génération de FeatureCollections synthétiques ayant la forme des fichiers réels
+(cantines.geojson, fournisseurs.geojson), pour mesurer les performances à grande échelle.
+"""
+import json
+import random
+import uuid
+
+KINDS = ('cantines', 'fournisseurs')
+
+# Même entête que les fichiers exportés par ogr2ogr.
+_HEADER = ('{{\n"type": "FeatureCollection",\n"name": "{name}",\n'
+           '"crs": {{ "type": "name", "properties": {{ "name": "urn:ogc:def:crs:OGC:1.3:CRS84" }} }},\n'
+           '"features": [\n')
+_FOOTER = '\n]\n}\n'
+
+_CUISINES = ["Cuisine centrale Yene", "Cuisine centrale Bargny", "Cuisine centrale Sendou",
+             "Cuisine centrale Rufisque Est", "Lycée moderne (Rufisque Est)"]
+_STATUTS = ["Gie", "Entreprise individuelle/ SUARL", "Association", "Coopérative"]
+_ACTIVITES = ["Aviculture", "Maraîchage", "Céréales", "Boucherie", "Poisson", "Boutique"]
+_LIVRAISON_PC = ["0.1 à 10%", "10 à 25%", "25 à 50%", "plus de 50%"]
+_URL = "https://kc-eu.kobotoolbox.org/media/original?media_file=niamde%2Fattachments%2F{}%2F{}.jpg"
+
+
+def _point(rng):
+    # Points répartis autour de Rufisque, avec la précision des relevés KoboToolbox.
+    return {"type": "Point", "coordinates": [round(rng.uniform(-17.35, -17.05), 6), round(rng.uniform(14.55, 14.80), 6)]}
+
+
+def _cantine(rng, index):
+    photo = f"{rng.getrandbits(64)}-16_33_33.jpg" if rng.random() < 0.7 else None
+    return {"type": "Feature", "properties": {
+        "categorie": "cantine",
+        "cuisine_ratachement": rng.choice(_CUISINES),
+        "nom_etab": f"École Élémentaire {index}",
+        "annee_ratachement": rng.randint(2019, 2025),
+        "nb_repas_moyen": rng.randint(50, 900),
+        "fille_pc": rng.randint(30, 70),
+        "Merci de prendre une photo de l'école": photo,
+        "Merci de prendre une photo de l'école_URL": _URL.format(uuid.UUID(int=rng.getrandbits(128)).hex, photo) if photo else None,
+        "_id": 662683249 + index,
+        "_uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "_submission_time": f"2025-05-{rng.randint(1, 28):02d}",
+        "_validation_status": None,
+        "_notes": None,
+        "_status": "submitted_via_web",
+        "_submitted_by": None,
+        "__version__": "vnb2qTUE64f9SdroiHFUCC",
+        "_tags": None,
+        "_index": index + 1,
+    }, "geometry": _point(rng)}
+
+
+def _fournisseur(rng, index):
+    activite = rng.choice(_ACTIVITES)
+    return {"type": "Feature", "properties": {
+        "theme": "Fournisseur cuisine centrale",
+        "cuisine_ratachement": rng.choice(_CUISINES),
+        "statut": rng.choice(_STATUTS),
+        "activite": activite,
+        "cereales": int(activite == "Céréales"),
+        "maraichage": int(activite == "Maraîchage"),
+        "aviculture": int(activite == "Aviculture"),
+        "boucherie": int(activite == "Boucherie"),
+        "boutique": int(activite == "Boutique"),
+        "poisson": int(activite == "Poisson"),
+        "nb_employe": rng.randint(1, 40),
+        "nb_femme": rng.randint(0, 20),
+        "date_cuisine_centrale": rng.randint(2018, 2025),
+        "livraison_kg": rng.randint(10, 5000),
+        "livraison_fcfa": rng.randint(10, 5000) * 1000,
+        "livraison_pc": rng.choice(_LIVRAISON_PC),
+        "merci de prendre une photo_URL": _URL.format(uuid.UUID(int=rng.getrandbits(128)).hex, index),
+    }, "geometry": _point(rng)}
+
+
+def make_features(count, kind='cantines', seed=0):
+    """Générateur de 'count' features synthétiques (reproductibles pour une même graine)."""
+    rng = random.Random(seed)
+    make = _cantine if kind == 'cantines' else _fournisseur
+    for index in range(count):
+        yield make(rng, index)
+
+
+def column_types(kind='cantines'):
+    """Types déclarés dans la configuration pour ce genre de fichier (option 'types' de FILES)."""
+    if kind == 'cantines':
+        return {"annee_ratachement": "int", "nb_repas_moyen": "int", "fille_pc": "int", "_id": "int", "_index": "int"}
+    return {key: "int" for key in ("cereales", "maraichage", "aviculture", "boucherie", "boutique", "poisson",
+                                   "nb_employe", "nb_femme", "date_cuisine_centrale", "livraison_kg", "livraison_fcfa")}
+
+
+def write_collection(path, count, kind='cantines', seed=0):
+    """Écrit une FeatureCollection de 'count' features, une feature par ligne, sans tout garder en mémoire."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_HEADER.format(name=f"{kind}_synthetique"))
+        for index, feature in enumerate(make_features(count, kind, seed)):
+            if index: f.write(',\n')
+            f.write(json.dumps(feature, ensure_ascii=False))
+        f.write(_FOOTER)
+    return path
@@ -0,0 +1,215 @@
+# src/batch.py
+"""
+Mode batch, sans interface : applique un fichier de correctifs (CSV ou JSON) à un fichier
+GeoJSON de la configuration et publie le résultat en un seul commit. Le chargement, l'édition
+et la publication passent par les mêmes objets que l'application (EditSession, workers du
+contrôleur, GitHandler), exécutés dans le thread courant.
+
+    python src/batch.py --file "Cantines Scolaires" export_kobo.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from PySide6.QtCore import QCoreApplication
+
+from logging_setup import logger
+from settings import CONFIG_FILE
+from controller import AppController, GeoJsonLoadWorker, GitPublishWorker
+from git_handler import GitHandler
+from journal import describe_changes
+from merge import DEFAULT_KEY
+from session import EditSession
+
+
+
+def read_patch(path):
+    """
+    Lit un fichier de correctifs : CSV (séparateur ',' ou ';', avec ou sans BOM, comme les exports
+    KoboToolbox), liste JSON d'objets {propriété: valeur}, ou GeoJSON (propriétés des features).
+    Dans un CSV, une cellule vide laisse la valeur inchangée ; en JSON, null efface la valeur.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            return [{name: value for name, value in record.items() if name and value not in ('', None)}
+                    for record in csv.DictReader(f, dialect=dialect)]
+    with open(path, encoding='utf-8') as f: data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get('features'), list):
+        data = [feature.get('properties') or {} for feature in data['features']]
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        raise ValueError("Le fichier JSON doit contenir une liste d'objets ou une FeatureCollection.")
+    return data
+
+
+def _key(value):
+    return None if value is None else str(value).strip() or None
+
+
+def apply_patch(model, records, key=DEFAULT_KEY, add_missing=False):
+    """
+    Applique des enregistrements au modèle, en une seule étape d'annulation. Les lignes sont
+    retrouvées par la valeur de la propriété 'key' (un index construit en un passage sur la
+    colonne) ; les enregistrements sans ligne correspondante sont ajoutés si 'add_missing'.
+    Renvoie un rapport : enregistrements appliqués, ajoutés, sans clé, clés inconnues ou en double,
+    colonnes ignorées (absentes du tableau), valeurs refusées par le schéma [(ligne, propriété, message)].
+    """
+    headers = set(model.get_headers())
+    if key not in headers: raise ValueError(f"La propriété clé '{key}' n'existe pas dans le fichier.")
+    rows = {}
+    duplicates = set()
+    for row, value in enumerate(model.get_column_values(key)):
+        value = _key(value)
+        if value is None: continue
+        if value in rows: duplicates.add(value)
+        else: rows[value] = row
+
+    report = {"applied": 0, "added": 0, "without_key": 0, "unknown_keys": [], "duplicate_keys": sorted(duplicates), "ignored_columns": set(), "rejected": []}
+    updates, new_records = [], []
+    for record in records:
+        value = _key(record.get(key))
+        if value is None:
+            report["without_key"] += 1
+            continue
+        report["ignored_columns"].update(name for name in record if name not in headers)
+        values = {name: record[name] for name in record if name in headers and name != key}
+        if value in rows: updates.append((rows[value], values))
+        elif add_missing: new_records.append({**values, key: record[key]})
+        else: report["unknown_keys"].append(value)
+
+    on_rejected = lambda row, prop_name, message: report["rejected"].append((row, prop_name, message))
+    model.validation_failed.connect(on_rejected)
+    model.begin_group(f"Import de {len(records)} enregistrement(s)")
+    try:
+        for row, values in updates:
+            if values: model.set_values(row, values)
+        report["applied"] = len(updates)
+        if new_records:
+            first = model.rowCount()
+            model.insert_rows(len(new_records))
+            for offset, values in enumerate(new_records): model.set_values(first + offset, values)
+            report["added"] = len(new_records)
+    finally:
+        model.end_group()
+        model.validation_failed.disconnect(on_rejected)
+    report["ignored_columns"] = sorted(report["ignored_columns"])
+    return report
+
+
+def find_file_info(config, name_or_path):
+    """Entrée de FILES désignée par son nom ou son chemin relatif."""
+    for file_info in config.get("FILES", []):
+        if name_or_path in (file_info['name'], file_info['path']): return file_info
+    return None
+
+
+def load_session(config, file_info, git_handler, parse_cache=None):
+    """Charge un fichier dans le thread courant. Renvoie la session, ou un message d'erreur."""
+    session = EditSession(file_info)
+    model = session.model
+    storage = file_info.get('storage', 'columnar')
+    visible_cols = file_info.get('columns', None)
+    model.begin_load(visible_headers=visible_cols, column_types=session.column_types, storage=storage)
+    cache_options = {"storage": storage, "column_types": session.column_types, "visible_headers": visible_cols}
+    worker = GeoJsonLoadWorker(os.path.join(config["LOCAL_REPO_PATH"], file_info['path']), git_handler, file_info['path'],
+                               None if storage == 'lazy' else parse_cache, cache_options, lazy=storage == 'lazy')
+    result = {}
+    worker.batch_loaded.connect(model.append_features)
+    worker.cache_loaded.connect(model.load_cached)
+    worker.finished.connect(lambda success, message, metadata, source: result.update(success=success, message=message, metadata=metadata, source=source))
+    worker.run()
+    if not result.get('success'): return result.get('message') or "Chargement interrompu."
+    model.end_load(result['metadata'], result['source'], worker.inference)
+    session.loaded = True
+    return session
+
+
+def publish_sessions(controller, sessions, prefer=None):
+    """
+    Publie des sessions modifiées en un seul commit et un seul push. Renvoie True ou un message
+    d'erreur. 'prefer' tranche les conflits de fusion avec les modifications distantes (voir merge.py).
+    """
+    worker = GitPublishWorker(controller.git_handler, [(session.path, session.model) for session in sessions],
+                              controller.commit_message(sessions), fast=controller.config.get("PUBLISH_MODE", "fast") == "fast",
+                              merge_keys={session.path: session.merge_key for session in sessions}, prefer=prefer)
+    result = {}
+    worker.progress.connect(lambda stage, message: logger.info(message))
+    worker.finished.connect(lambda success, message: result.update(success=success, message=message))
+    worker.run()
+    if result.get('success') or worker.committed: # Commit créé : poussé avec la prochaine publication si le push a échoué
+        for session in sessions:
+            session.model.accept_changes()
+            session.model.source = worker.sources.get(session.path)
+    if not result.get('success'): return result.get('message') or "Publication interrompue."
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Applique un fichier de correctifs (CSV ou JSON) à un fichier GeoJSON du dépôt et publie en un seul commit.")
+    parser.add_argument('patch', help="Fichier de correctifs (.csv, .json ou .geojson).")
+    parser.add_argument('--file', required=True, help="Nom ou chemin relatif du fichier dans la configuration (FILES).")
+    parser.add_argument('--key', help=f"Propriété qui identifie les lignes (défaut : option 'key' du fichier, sinon {DEFAULT_KEY}).")
+    parser.add_argument('--add-missing', action='store_true', help="Ajoute les enregistrements dont la clé est absente du fichier.")
+    parser.add_argument('--dry-run', action='store_true', help="Affiche les modifications sans écrire ni publier.")
+    parser.add_argument('--prefer', choices=('ours', 'theirs'), help="En cas de conflit avec des modifications distantes, garde les valeurs du correctif (ours) ou celles du dépôt (theirs) ; par défaut, la publication est abandonnée.")
+    parser.add_argument('--config', default=CONFIG_FILE, help="Fichier de configuration (défaut : celui de l'application).")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1]) # Objets Qt sans fenêtre
+    app.setApplicationName("GeoJSONEditor") # Comme le journal (logging_setup)
+    try:
+        with open(args.config, 'r') as f: config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Configuration illisible ({args.config}) : {e}", file=sys.stderr)
+        return 2
+    file_info = find_file_info(config, args.file)
+    if file_info is None:
+        print(f"Fichier '{args.file}' absent de la configuration.", file=sys.stderr)
+        return 2
+
+    controller = AppController()
+    controller.config = config
+    controller.git_handler = GitHandler(config["LOCAL_REPO_PATH"])
+    session = load_session(config, file_info, controller.git_handler, controller._parse_cache())
+    if not isinstance(session, EditSession):
+        print(session, file=sys.stderr)
+        return 1
+    controller.sessions[session.path] = session
+    key = args.key or session.merge_key
+
+    try:
+        report = apply_patch(session.model, read_patch(args.patch), key=key, add_missing=args.add_missing)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Correctifs non appliqués : {e}", file=sys.stderr)
+        return 1
+    print(f"{report['applied']} enregistrement(s) appliqué(s), {report['added']} ajouté(s).")
+    if report['without_key']: print(f"{report['without_key']} enregistrement(s) sans '{key}', ignoré(s).")
+    if report['unknown_keys']: print(f"{len(report['unknown_keys'])} clé(s) absente(s) du fichier, ignorée(s) (--add-missing pour les ajouter).")
+    if report['duplicate_keys']: print(f"Clé(s) en double dans le fichier, seule la première ligne est modifiée : {', '.join(report['duplicate_keys'][:10])}")
+    if report['ignored_columns']: print(f"Colonne(s) absente(s) du tableau, ignorée(s) : {', '.join(report['ignored_columns'])}")
+    if report['rejected']:
+        print(f"{len(report['rejected'])} valeur(s) refusée(s) (type de colonne) :", file=sys.stderr)
+        for row, prop_name, message in report['rejected'][:10]: print(f"  ligne {row + 1}, {prop_name} : {message}", file=sys.stderr)
+
+    if not session.has_changes():
+        print("Aucune modification à publier.")
+        return 0
+    print(f"{session.name} : lignes {describe_changes(session.change_summary())}.")
+    if args.dry_run: return 0
+    result = publish_sessions(controller, [session], prefer=args.prefer)
+    if result is not True:
+        print(result, file=sys.stderr)
+        return 1
+    print("Modifications poussées sur GitHub !")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
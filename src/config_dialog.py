@@ -3,19 +3,16 @@ import json
 import os
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QFormLayout, QLineEdit,
-    QPushButton, QDialogButtonBox, QLabel, QFileDialog
+    QPushButton, QDialogButtonBox, QLabel, QFileDialog, QCheckBox
 )
 from PySide6.QtCore import Qt
 
-# (Le code de définition des chemins reste identique)
-APP_NAME = "EditeurGeoJSON"
-CONFIG_DIR = os.path.join(os.path.expanduser("~"), f".{APP_NAME}")
-CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
-os.makedirs(CONFIG_DIR, exist_ok=True)
+from settings import CONFIG_FILE
 
 class ConfigDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, config=None):
         super().__init__(parent)
+        self._config = dict(config or {}) # Les clés non éditées ici (FILES, types...) sont conservées
         self.setWindowTitle("Configuration de l'accès GitHub")
         # --- CORRECTION DE LA LARGEUR ---
         self.setMinimumWidth(600)
@@ -27,6 +24,8 @@ class ConfigDialog(QDialog):
         self.username_edit = QLineEdit()
         self.token_edit = QLineEdit()
         self.token_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        self.sparse_clone_check = QCheckBox("Clone léger : ne télécharger que les fichiers édités")
+        self.sparse_clone_check.setChecked(True)
         local_path_layout = QVBoxLayout(); local_path_layout.setContentsMargins(0,0,0,0); local_path_layout.addWidget(self.local_path_edit); local_path_layout.addWidget(self.browse_button, 0, Qt.AlignmentFlag.AlignRight)
         layout = QFormLayout(self)
         layout.addRow(QLabel("Veuillez entrer les informations de votre dépôt GitHub."))
@@ -34,6 +33,7 @@ class ConfigDialog(QDialog):
         layout.addRow("Dossier local pour le dépôt:", local_path_layout)
         layout.addRow("Nom d'utilisateur GitHub:", self.username_edit)
         layout.addRow("Personal Access Token (PAT):", self.token_edit)
+        layout.addRow("", self.sparse_clone_check)
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         layout.addRow(self.button_box)
         self.button_box.accepted.connect(self.accept)
@@ -51,11 +51,14 @@ class ConfigDialog(QDialog):
             self.local_path_edit.setText(config.get("LOCAL_REPO_PATH", default_repo_path))
             self.username_edit.setText(config.get("GITHUB_USERNAME", ""))
             self.token_edit.setText(config.get("GITHUB_TOKEN", ""))
+            self.sparse_clone_check.setChecked(config.get("CLONE_MODE", "sparse") == "sparse")
+            self._config = {**config, **self._config}
         except FileNotFoundError:
             default_repo_path = os.path.join(os.path.expanduser("~"), "geojson_editor_repo")
             self.local_path_edit.setText(default_repo_path)
     def get_config(self):
-        return {"REPO_URL": self.repo_url_edit.text(), "LOCAL_REPO_PATH": self.local_path_edit.text(), "GITHUB_USERNAME": self.username_edit.text(), "GITHUB_TOKEN": self.token_edit.text(), "FILES": [ {"name": "Cantines Scolaires", "path": "mviewer/apps/public/cantines/cantines_scolaires.geojson"}, {"name": "Cuisines Centrales", "path": "mviewer/apps/public/cantines/cuisine_centrale.geojson"}, {"name": "Fournisseurs", "path": "mviewer/apps/public/gouvernance/fournisseurs.geojson"} ]}
-
-def save_config(config):
-    with open(CONFIG_FILE, 'w') as f: json.dump(config, f, indent=4)
\ No newline at end of file
+        config = dict(self._config)
+        config.update({"REPO_URL": self.repo_url_edit.text(), "LOCAL_REPO_PATH": self.local_path_edit.text(), "GITHUB_USERNAME": self.username_edit.text(), "GITHUB_TOKEN": self.token_edit.text(), "CLONE_MODE": "sparse" if self.sparse_clone_check.isChecked() else "full"})
+        cuisine = {"path": "mviewer/apps/public/cantines/cuisine_centrale.geojson", "key": "nom"}
+        config.setdefault("FILES", [ {"name": "Cantines Scolaires", "path": "mviewer/apps/public/cantines/cantines_scolaires.geojson", "references": {"cuisine_ratachement": cuisine}}, {"name": "Cuisines Centrales", "path": cuisine["path"]}, {"name": "Fournisseurs", "path": "mviewer/apps/public/gouvernance/fournisseurs.geojson", "references": {"cuisine_ratachement": cuisine}} ])
+        return config
\ No newline at end of file
@@ -1,13 +1,22 @@
 import os
 import json
-import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from PySide6.QtCore import QObject, Signal, QThread
+from PySide6.QtCore import QObject, Signal, QThread, QTimer
 
+import profiling
 from logging_setup import logger
-from git_handler import GitHandler
-from config_dialog import CONFIG_FILE, save_config
+from settings import CONFIG_FILE, DEFAULT_GIT_TIMEOUT, save_config
 from models import GeoJsonTableModel
+from session import EditSession
+from geojson_io import GeoJsonStreamReader, MappedFile, write_geojson
+from merge import DEFAULT_KEY, merge_file, describe_conflicts
+from schema import SchemaInference
+from feature_store import create_store
+from journal import describe_changes
+from joins import Relation, ValueIndex
+from parse_cache import ParseCache, DEFAULT_MAX_MB, blob_id
 
 # Le worker pour le clonage en arrière-plan. Il est privé au contrôleur.
 class GitCloneWorker(QObject):
@@ -21,12 +30,17 @@ class GitCloneWorker(QObject):
 
     def run(self):
         try:
+            from git_handler import GitHandler # GitPython n'est chargé qu'au premier besoin (démarrage plus rapide)
             git_handler = GitHandler(self.config["LOCAL_REPO_PATH"])
+            sparse_paths = None
+            if self.config.get("CLONE_MODE", "sparse") == "sparse":
+                sparse_paths = [file_info['path'] for file_info in self.config.get("FILES", [])] or None
             clone_result = git_handler.clone(
                 self.config["REPO_URL"], 
                 self.config.get("GITHUB_USERNAME", ""), 
                 self.config.get("GITHUB_TOKEN", ""), 
-                progress_callback=self.progress.emit
+                progress_callback=self.progress.emit,
+                sparse_paths=sparse_paths
             )
             if self._is_cancelled:
                 self.finished.emit(False, "Clonage annulé par l'utilisateur.")
@@ -44,6 +58,272 @@ class GitCloneWorker(QObject):
         self._is_cancelled = True
 
 
+# Marge (en secondes) accordée à la vérification de connexion au-delà du délai de git (voir AppController.on_connection_timeout).
+CONNECTION_GRACE = 5
+
+
+# Le worker de vérification de connexion, pour ne pas bloquer le démarrage.
+# Il crée aussi le GitHandler : l'import de GitPython (qui interroge l'exécutable git) se fait hors du thread de l'interface.
+class GitConnectionWorker(QObject):
+    handler_ready = Signal(object)
+    finished = Signal(bool, str)
+
+    def __init__(self, local_path, timeout=DEFAULT_GIT_TIMEOUT):
+        super().__init__()
+        self.local_path = local_path
+        self.timeout = timeout
+        self.ahead = False # Commits locaux pas encore poussés (publication précédente interrompue)
+
+    def run(self):
+        try:
+            from git_handler import GitHandler
+            git_handler = GitHandler(self.local_path)
+            self.handler_ready.emit(git_handler)
+            connection_result = git_handler.test_connection(timeout=self.timeout)
+            self.ahead = git_handler.is_ahead()
+        except Exception as e:
+            logger.error(f"Erreur inattendue lors du test de connexion : {e}", exc_info=True)
+            connection_result = f"Erreur inattendue : {e}"
+        is_success = connection_result is True
+        self.finished.emit(is_success, "Connecté au dépôt" if is_success else str(connection_result))
+
+
+# Le worker de chargement : lit le fichier par lots sans bloquer l'interface.
+class GeoJsonLoadWorker(QObject):
+    batch_loaded = Signal(list, object)
+    cache_loaded = Signal(object)
+    finished = Signal(bool, str, dict, object)
+
+    def __init__(self, file_path, git_handler=None, file_path_relative=None, cache=None, cache_options=None, lazy=False):
+        super().__init__()
+        self.file_path = file_path
+        # Stockage 'lazy' : les lots sont accompagnés des positions des features dans une copie projetée du fichier.
+        self.lazy = lazy
+        # Le schéma est déduit au fil de la lecture, dans ce thread, plutôt qu'en parcourant de nouveau
+        # tout le fichier dans celui de l'interface (voir GeoJsonTableModel.end_load). Sans objet quand
+        # le fichier vient du cache de lecture, qui garde son schéma.
+        self.inference = SchemaInference()
+        self.git_handler = git_handler
+        self.file_path_relative = file_path_relative
+        # Cache de lecture (parse_cache.ParseCache) et options de chargement qui font partie de sa clé.
+        self.cache = cache
+        self.cache_options = cache_options or {}
+        self.cache_key = None # Clé sous laquelle le fichier lu a été enregistré (absent du cache)
+        self._is_cancelled = False
+
+    def run(self):
+        try:
+            # Fichier ajouté à la configuration après un clone léger : on l'ajoute à la copie de travail.
+            if not os.path.exists(self.file_path) and self.git_handler:
+                sparse_result = self.git_handler.add_sparse_path(self.file_path_relative)
+                if sparse_result is not True:
+                    self.finished.emit(False, sparse_result, {}, None)
+                    return
+            if self.cache:
+                key = self.cache.key(blob_id(self.file_path), **self.cache_options)
+                entry = self.cache.load(key)
+                if entry is not None:
+                    self.inference = None
+                    self.cache_loaded.emit(entry)
+                    self.finished.emit(True, "", entry['metadata'], entry['source'])
+                    return
+            mapped = MappedFile(self.file_path) if self.lazy else None
+            reader = GeoJsonStreamReader(mapped.path if mapped else self.file_path)
+            # Entrée du cache construite au fil de la lecture, avec le même stockage que le modèle.
+            store = create_store(self.cache_options.get('storage', 'columnar'), self.cache_options.get('column_types')) if self.cache else None
+            headers = set()
+            count = 0
+            for batch in reader.iter_batches():
+                if self._is_cancelled:
+                    self.finished.emit(False, "Chargement annulé.", {}, None)
+                    return
+                mapped_spans = (mapped, reader.offsets[2 * count:2 * (count + len(batch))]) if mapped else None
+                count += len(batch)
+                self.inference.add_features(batch)
+                if store is not None:
+                    store.extend(batch)
+                    headers.update(name for feature in batch if isinstance(feature.get('properties'), dict) for name in feature['properties'])
+                self.batch_loaded.emit(batch, mapped_spans)
+            # Écrit dans ce thread, avant 'finished' : le modèle est encore en lecture seule et l'écriture
+            # (pickle de tout le fichier) ne bloque pas l'interface.
+            if store is not None and reader.source is not None and self.cache.store(key, self._cache_entry(store, sorted(headers), reader)):
+                self.cache_key = key
+            self.finished.emit(True, "", reader.metadata, reader.source)
+        except Exception as e:
+            logger.error(f"Erreur de chargement du fichier : {e}", exc_info=True)
+            self.finished.emit(False, f"Erreur de chargement du fichier : {e}", {}, None)
+
+    def _cache_entry(self, store, headers, reader):
+        """Entrée du cache de lecture (voir parse_cache), telle que GeoJsonTableModel.load_cached la reprend."""
+        visible_headers, column_types = self.cache_options.get('visible_headers'), self.cache_options.get('column_types')
+        headers = list(visible_headers) if visible_headers is not None else headers # Comme GeoJsonTableModel.begin_load
+        return {"store": store, "headers": headers, "metadata": reader.metadata, "source": reader.source,
+                "schema": self.inference.schema(headers, column_types)}
+
+    def cancel(self):
+        self._is_cancelled = True
+
+
+# Le worker des références : lit les fichiers non ouverts pour indexer les propriétés qui les relient (voir AppController.build_relations).
+class ValueIndexWorker(QObject):
+    finished = Signal()
+
+    def __init__(self, local_path, keys):
+        super().__init__()
+        self.local_path = local_path
+        self.keys = keys # Couples (chemin relatif, propriété) à indexer
+        self.indexes = {} # (chemin relatif, propriété) -> ValueIndex, complet à l'émission de 'finished'
+
+    def run(self):
+        for file_path, prop_name in self.keys:
+            try:
+                self.indexes[(file_path, prop_name)] = ValueIndex.from_file(os.path.join(self.local_path, file_path), prop_name)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Références : impossible de lire '{file_path}' : {e}")
+                self.indexes[(file_path, prop_name)] = ValueIndex(prop_name)
+        self.finished.emit()
+
+
+# Étapes de la publication, dans l'ordre (valeurs émises par GitPublishWorker.progress).
+# Le contrôle des valeurs parcourt tous les fichiers modifiés : il a lieu dans le worker.
+# La synchronisation a lieu avant l'écriture : le fichier local est encore propre,
+# ce qui permet un simple fast-forward quand le dépôt distant a avancé.
+PUBLISH_VALIDATE, PUBLISH_PULL, PUBLISH_SERIALIZE, PUBLISH_COMMIT, PUBLISH_PUSH = range(5)
+
+
+# Le worker de publication : synchronisation, écriture des fichiers, commit et push hors du thread de l'interface.
+class GitPublishWorker(QObject):
+    progress = Signal(int, str)
+    finished = Signal(bool, str)
+
+    def __init__(self, git_handler, jobs, commit_message, fast=True, merge_keys=None, prefer=None, validate=False):
+        super().__init__()
+        self.git_handler = git_handler
+        # Liste de (chemin relatif, modèle) ; les modèles restent en lecture seule pendant toute la publication.
+        self.jobs = jobs
+        self.commit_message = commit_message
+        self.fast = fast
+        # Fusion avec les versions distantes (voir merge.py) : clé des features par chemin relatif,
+        # et côté qui l'emporte en cas de conflit ('ours', 'theirs', ou None pour signaler les conflits).
+        self.merge_keys = merge_keys or {}
+        self.prefer = prefer
+        # Contrôle des valeurs selon le schéma de chaque fichier (voir GeoJsonTableModel.validate) : les
+        # problèmes trouvés, par chemin relatif, interrompent la publication avant toute écriture.
+        self.validate = validate
+        self.problems = {}
+        # Nouvelle disposition de chaque fichier écrit (geojson_io.GeoJsonSource), par chemin relatif.
+        self.sources = {}
+        self.merged = [] # Fichiers modifiés à distance depuis leur lecture, fusionnés avant le commit
+        self.superseded = [] # Fichiers fusionnés sans rien à publier : la version distante l'emporte partout
+        self.conflicts = {} # Conflits de fusion par chemin relatif ; la publication est alors abandonnée
+        # Commit local créé : les modifications publiées sont la nouvelle référence des modèles, même si
+        # le push échoue ensuite (il sera refait à la publication suivante, voir GitHandler.is_ahead).
+        self.committed = False
+        self.pushed = False
+        self._is_cancelled = False
+
+    @property
+    def file_paths(self): return [file_path for file_path, _ in self.jobs]
+
+    def run(self):
+        self.git_handler.timings = {}
+        try:
+            result = self._publish()
+        except Exception as e:
+            logger.error(f"Erreur inattendue dans le worker de publication : {e}", exc_info=True)
+            result = f"Erreur inattendue : {e}"
+        logger.info(f"Durée des étapes de publication : {self.git_handler.format_timings()}")
+        if result is True and not self.pushed:
+            self.finished.emit(True, "Rien à publier : les valeurs distantes ont été gardées.")
+        elif result is True and self.merged:
+            self.finished.emit(True, f"Modifications poussées sur GitHub ! Fusionnées avec les changements distants de : {', '.join(self.merged)}.")
+        elif result is True:
+            self.finished.emit(True, "Modifications poussées sur GitHub !")
+        else:
+            self.finished.emit(False, str(result))
+
+    def _publish(self):
+        handler = self.git_handler
+        if self.validate:
+            self.progress.emit(PUBLISH_VALIDATE, "Contrôle des valeurs...")
+            with handler.timed('validate'):
+                for file_path, model in self.jobs:
+                    problems = model.validate()
+                    if problems: self.problems[file_path] = problems
+            if self.problems: return "Certaines valeurs ne correspondent pas au type de leur colonne."
+            if self._is_cancelled: return "Publication annulée par l'utilisateur."
+        self.progress.emit(PUBLISH_PULL, "Récupération des changements distants...")
+        sync_result = handler.sync() if self.fast else handler.pull()
+        if sync_result is not True:
+            return f"Impossible de pousser les changements car le pull a échoué : {sync_result}"
+
+        if self._is_cancelled: return "Publication annulée par l'utilisateur."
+        write_error = self._write_files() if self.jobs else None
+        if write_error: return write_error
+        if self.conflicts:
+            self._restore_files()
+            details = "\n".join(f"{file_path} :\n{describe_conflicts(conflicts)}" for file_path, conflicts in self.conflicts.items())
+            return f"Des modifications distantes touchent les mêmes données que les vôtres :\n{details}"
+
+        if self._is_cancelled: return self._rollback(committed=False)
+        if len(self.superseded) < len(self.jobs): # Sinon, aucun fichier à commiter
+            self.progress.emit(PUBLISH_COMMIT, "Création du commit...")
+            commit_result = handler.commit(self.file_paths, self.commit_message)
+            if commit_result is True: self.committed = True
+            elif commit_result != handler.NOTHING_TO_COMMIT: return commit_result
+        # Les commits d'une publication précédente dont le push a échoué partent avec celui-ci.
+        if not self.committed and not handler.is_ahead():
+            return True if len(self.superseded) == len(self.jobs) else handler.NOTHING_TO_COMMIT
+
+        # Dernière occasion d'annuler : une fois le push lancé, il va jusqu'au bout.
+        if self._is_cancelled: return self._rollback(committed=self.committed)
+        self.progress.emit(PUBLISH_PUSH, "Envoi sur GitHub...")
+        result = handler.push()
+        self.pushed = result is True
+        return result
+
+    def _write_files(self):
+        """Écrit (ou fusionne) les fichiers modifiés. Renvoie un message en cas d'erreur."""
+        self.progress.emit(PUBLISH_SERIALIZE, "Écriture des fichiers...")
+        try:
+            # Les fichiers sont indépendants : ils sont écrits en parallèle.
+            with self.git_handler.timed('serialize'), ThreadPoolExecutor(max_workers=len(self.jobs)) as executor:
+                list(executor.map(lambda job: self._write_file(*job), self.jobs))
+        except Exception as e:
+            return f"Erreur d'écriture du fichier : {e}"
+        return None
+
+    def _write_file(self, file_path, model):
+        absolute_path = os.path.join(self.git_handler.local_path, file_path)
+        base = model.source
+        # Fichier changé par la synchronisation : ses modifications distantes sont gardées (fusion à trois).
+        if base is not None and os.path.exists(absolute_path) and blob_id(absolute_path) != base.digest:
+            base_content = self.git_handler.read_blob(base.digest)
+            if base_content is None:
+                raise ValueError(f"{file_path} a changé sur le dépôt distant et sa version d'origine est introuvable, fusion impossible.")
+            with self.git_handler.timed('merge_features'):
+                conflicts, changed, source = merge_file(absolute_path, base_content, model, self.merge_keys.get(file_path, DEFAULT_KEY), self.prefer)
+            if conflicts: self.conflicts[file_path] = conflicts
+            elif source is not None: self.sources[file_path] = source # Fichier remplacé par le modèle : rien à relire
+            else: self.merged.append(file_path)
+            if not conflicts and not changed: self.superseded.append(file_path)
+            return
+        self.sources[file_path] = write_geojson(absolute_path, model)
+
+    def _restore_files(self):
+        for file_path in self.file_paths:
+            self.git_handler.restore_file(file_path)
+
+    def _rollback(self, committed):
+        """Défait le commit local et remet les fichiers dans leur état publié."""
+        if committed: self.git_handler.undo_last_commit()
+        self._restore_files()
+        return "Publication annulée par l'utilisateur."
+
+    def cancel(self):
+        self._is_cancelled = True
+
+
 class AppController(QObject):
     """
     Contient toute la logique applicative. Il possède le modèle de données,
@@ -51,15 +331,21 @@ class AppController(QObject):
     """
     # --- Signaux pour la communication avec la Vue ---
     config_state_changed = Signal(bool, str)
+    connection_check_started = Signal()
     connection_status_changed = Signal(bool, str)
     clone_started = Signal()
     clone_progress = Signal(int, str)
     clone_finished = Signal(bool, str)
+    publish_started = Signal()
+    publish_progress = Signal(int, str)
     publish_finished = Signal(bool, str)
+    current_model_changed = Signal()
+    data_loading_started = Signal(str)
     data_loaded_and_ready = Signal(str)
     modifications_updated = Signal(int, bool)
     status_message_changed = Signal(str)
     view_change_requested = Signal(str)
+    relations_ready = Signal()
 
     def __init__(self):
         super().__init__()
@@ -67,22 +353,44 @@ class AppController(QObject):
         self.git_handler = None
         self.thread = None
         self.worker = None
+        self.load_thread = None
+        self.load_worker = None
+        self._cancelled_loads = [] # Threads annulés, gardés en vie jusqu'à leur fin
+        self.publish_thread = None
+        self.publish_worker = None
+        self.connection_thread = None
+        self.connection_worker = None
+        self._abandoned_checks = [] # Vérifications abandonnées (délai dépassé), gardées en vie jusqu'à leur fin
+        # Échéance de la vérification de connexion, imposée ici : sous Windows, git lui-même ne peut pas être interrompu.
+        self.connection_timer = QTimer(self)
+        self.connection_timer.setSingleShot(True)
+        self.connection_timer.timeout.connect(self.on_connection_timeout)
 
-        self.model = GeoJsonTableModel()
-        self.original_geojson_data = None
-        self.session_adds = 0
-        self.session_deletes = 0
-        self.session_edits = set()
+        # Une session d'édition par fichier ouvert (clé : chemin relatif), conservée d'un fichier à l'autre.
+        self.sessions = {}
+        self.current_session = None
+        self.loading_session = None
+        self.model = GeoJsonTableModel() # Modèle du fichier affiché (vide tant qu'aucun fichier n'est ouvert)
+        self.unpushed = False # Commit local dont le push a échoué : la prochaine publication le pousse
+        self.merge_conflicts = {} # Conflits de la dernière publication, par chemin (voir GitPublishWorker.conflicts)
+        self.validation_problems = {} # Valeurs refusées par le contrôle de la dernière publication (voir GitPublishWorker.problems)
+        self.parse_cache = None # Cache de lecture, créé d'après la configuration (voir _parse_cache)
         self.current_file_info = None
         self.current_column_types = {} # Pour stocker les types du fichier actuel
-
-        self.model.dataChanged.connect(self.on_data_changed_in_model)
+        self._load_started = self._publish_started = 0.0 # Début du chargement et de la publication en cours (mesures)
+        # Références entre fichiers (voir join_relations), construites à la première demande.
+        self._relations = None
+        self._value_indexes = {}
+        self.relations_thread = None
+        self.relations_worker = None
+        self._abandoned_relations = [] # Lectures devenues inutiles, gardées en vie jusqu'à leur fin
 
     def load_configuration(self):
         """Charge la configuration et vérifie l'état du dépôt local."""
         try:
             with open(CONFIG_FILE, 'r') as f:
                 self.config = json.load(f)
+            self._invalidate_relations()
             repo_path = self.config.get("LOCAL_REPO_PATH")
             repo_exists = repo_path and os.path.exists(os.path.join(repo_path, '.git'))
             self.config_state_changed.emit(repo_exists, "Configuration chargée.")
@@ -96,133 +404,539 @@ class AppController(QObject):
         """Sauvegarde la nouvelle configuration et lance le clonage."""
         self.config = new_config
         save_config(self.config)
+        self._invalidate_relations()
         self._start_clone_process()
 
     def initialize_repo(self):
-        """Initialise le gestionnaire Git et teste la connexion au dépôt distant."""
+        """Initialise le gestionnaire Git et lance en arrière-plan le test de connexion au dépôt distant."""
         if not self.config.get("LOCAL_REPO_PATH"):
             self.connection_status_changed.emit(False, "Chemin du dépôt local manquant.")
             return
-        self.git_handler = GitHandler(self.config["LOCAL_REPO_PATH"])
-        connection_result = self.git_handler.test_connection()
-        is_success = connection_result is True
-        message = "Connecté au dépôt" if is_success else str(connection_result)
+        if self.connection_worker: return # Une vérification est déjà en cours
+
+        self.connection_check_started.emit()
+        timeout = self.config.get("GIT_TIMEOUT") or DEFAULT_GIT_TIMEOUT
+        self.connection_thread = QThread(self)
+        self.connection_worker = GitConnectionWorker(self.config["LOCAL_REPO_PATH"], timeout)
+        self.connection_worker.moveToThread(self.connection_thread)
+        self.connection_thread.started.connect(self.connection_worker.run)
+        self.connection_worker.handler_ready.connect(self.on_git_handler_ready)
+        self.connection_worker.finished.connect(self.on_connection_worker_finished)
+        self.connection_worker.finished.connect(self.connection_thread.quit)
+        self.connection_thread.finished.connect(self.connection_worker.deleteLater) # Après le traitement de 'finished' (voir select_data_source)
+        self.connection_thread.finished.connect(self.connection_thread.deleteLater)
+        # Le délai de git, plus une marge pour le lancement de git et la vérification des commits locaux.
+        self.connection_timer.start(int((timeout + CONNECTION_GRACE) * 1000))
+        self.connection_thread.start()
+
+    def on_git_handler_ready(self, git_handler):
+        """Le gestionnaire Git est prêt (avant la fin du test de connexion, qui peut durer)."""
+        self.git_handler = git_handler
+
+    def on_connection_worker_finished(self, is_success, message):
+        """Transmet à la vue le résultat du test de connexion."""
+        if self.sender() is not self.connection_worker: # Vérification abandonnée : son résultat arrive trop tard
+            self._abandoned_checks = [(t, w) for t, w in self._abandoned_checks if w is not self.sender()]
+            return
+        self.connection_timer.stop()
+        if self.connection_worker.ahead and not self.unpushed:
+            self.unpushed = True
+            self._update_modifications()
+        self.connection_thread = None
+        self.connection_worker = None
         self.connection_status_changed.emit(is_success, message)
 
+    def on_connection_timeout(self):
+        """
+        Échéance de la vérification de connexion : la vérification est abandonnée et signalée en
+        échec. Son thread (git qui ne répond pas, sous Windows) continue jusqu'à la fin de git,
+        mais son résultat sera ignoré ; une nouvelle vérification peut être lancée entre-temps.
+        """
+        if not self.connection_worker: return
+        timeout = self.connection_worker.timeout
+        logger.warning(f"Vérification de connexion abandonnée après {timeout + CONNECTION_GRACE} s.")
+        self._abandoned_checks.append((self.connection_thread, self.connection_worker))
+        self.connection_thread = None
+        self.connection_worker = None
+        self.connection_status_changed.emit(False, f"Le dépôt distant ne répond pas (délai de {timeout} s dépassé). Vérifiez votre connexion internet.")
+
+    @profiling.profiled('controller.select_data_source')
     def select_data_source(self, file_info):
-        """Charge les données et la configuration des types de colonnes."""
-        self.current_file_info = file_info
-        self.reset_modification_counters()
-        
-        # Récupère la config des types pour le fichier actuel
-        self.current_column_types = file_info.get('types', {})
-        
-        file_path_absolute = os.path.join(self.config["LOCAL_REPO_PATH"], file_info['path'])
-        try:
-            with open(file_path_absolute, 'r', encoding='utf-8') as f:
-                geojson_data = json.load(f)
-
-            visible_cols = file_info.get('columns', None)
-            
-            self.original_geojson_data = copy.deepcopy(geojson_data)
-            # Passe la config des types au modèle
-            self.model.load_data(copy.deepcopy(geojson_data), visible_headers=visible_cols, column_types=self.current_column_types)
-            
-            self.status_message_changed.emit(f"Fichier '{file_info['name']}' chargé.")
-            self.data_loaded_and_ready.emit(file_info['name'])
+        """
+        Affiche un fichier de la configuration. Un fichier déjà ouvert est repris tel quel,
+        avec ses modifications en cours ; sinon il est chargé par lots en arrière-plan.
+        """
+        if self.is_publishing():
+            self.status_message_changed.emit("Publication en cours, veuillez patienter.")
+            return
+        session = self.sessions.get(file_info['path'])
+        if session is None:
+            session = self.sessions[file_info['path']] = EditSession(file_info)
+            session.model.undo_stack.indexChanged.connect(self.on_undo_index_changed)
+            session.model.validation_failed.connect(self.on_validation_failed)
+        self._set_current_session(session)
+        if session is self.loading_session: # Déjà en cours de chargement
+            self.data_loading_started.emit(file_info['name'])
+            self.view_change_requested.emit('editor')
+            return
+        if session.loaded:
+            self.data_loading_started.emit(file_info['name'])
             self.view_change_requested.emit('editor')
+            self.data_loaded_and_ready.emit(file_info['name'])
+            self._update_modifications()
+            return
 
-        except Exception as e:
-            logger.error(f"Erreur de chargement du fichier : {e}", exc_info=True)
-            self.model.load_data({})
-            self.original_geojson_data = None
-            self.clone_finished.emit(False, f"Erreur de chargement du fichier : {str(e)}")
+        self.cancel_loading()
+        self.loading_session = session
+        visible_cols = file_info.get('columns', None)
+
+        # Le modèle reste en lecture seule tant que le fichier n'est pas entièrement lu.
+        self.model.begin_load(visible_headers=visible_cols, column_types=self.current_column_types,
+                              storage=file_info.get('storage', 'columnar'))
+        self.model.set_read_only(True)
+        self._update_modifications()
+        self.data_loading_started.emit(file_info['name'])
+        self.status_message_changed.emit(f"Chargement de '{file_info['name']}'...")
+        self.view_change_requested.emit('editor')
+
+        file_path_absolute = os.path.join(self.config["LOCAL_REPO_PATH"], file_info['path'])
+        self._load_started = time.perf_counter()
+        self.load_thread = QThread(self) # Enfant du contrôleur : détruit à son arrêt (deleteLater), pas avant
+        storage = file_info.get('storage', 'columnar')
+        cache_options = {"storage": storage, "column_types": self.current_column_types, "visible_headers": visible_cols}
+        # Le stockage 'lazy' ne garde que des positions dans le fichier : rien à mettre en cache.
+        self.load_worker = GeoJsonLoadWorker(file_path_absolute, self.git_handler, file_info['path'],
+                                             None if storage == 'lazy' else self._parse_cache(), cache_options,
+                                             lazy=storage == 'lazy')
+        self.load_worker.moveToThread(self.load_thread)
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.batch_loaded.connect(self.on_batch_loaded)
+        self.load_worker.cache_loaded.connect(self.on_cache_loaded)
+        self.load_worker.finished.connect(self.on_load_worker_finished)
+        self.load_worker.finished.connect(self.load_thread.quit)
+        # Le worker n'est détruit qu'à l'arrêt du thread, demandé (quit) après les signaux déjà en attente :
+        # ses lots et sa fin sont donc traités pendant qu'il existe encore (sender(), voir on_batch_loaded).
+        self.load_thread.finished.connect(self.load_worker.deleteLater)
+        self.load_thread.finished.connect(self.load_thread.deleteLater)
+        self.load_thread.start()
+
+    def _set_current_session(self, session):
+        """Fait du modèle de la session le modèle affiché par la vue."""
+        self.current_session = session
+        self.current_file_info = session.file_info
+        # Récupère la config des types pour le fichier actuel
+        self.current_column_types = session.column_types
+        if self.model is not session.model:
+            self.model = session.model
+            self.current_model_changed.emit()
+
+    def on_batch_loaded(self, features, mapped_spans):
+        """Ajoute au modèle un lot de features lu par le worker."""
+        if self.sender() is not self.load_worker: return # Lot d'un chargement annulé
+        model = self.loading_session.model
+        model.append_features(features, mapped_spans)
+        if model is self.model:
+            self.status_message_changed.emit(f"Chargement... {model.rowCount()} entités lues.")
+
+    def _parse_cache(self):
+        """Cache de lecture, limité à CACHE_MAX_MB Mo (0 le désactive)."""
+        max_mb = self.config.get("CACHE_MAX_MB", DEFAULT_MAX_MB)
+        if not max_mb: return None
+        if self.parse_cache is None: self.parse_cache = ParseCache()
+        self.parse_cache.max_bytes = max_mb * 1024 * 1024
+        return self.parse_cache
+
+    def on_cache_loaded(self, entry):
+        """Reprend le fichier depuis le cache de lecture : il n'a pas changé depuis sa dernière lecture."""
+        if self.sender() is not self.load_worker: return
+        self.loading_session.model.load_cached(entry)
+
+    def on_load_worker_finished(self, success, message, metadata, source):
+        """Termine le chargement, ou le signale en erreur."""
+        if self.sender() is not self.load_worker:
+            self._cancelled_loads = [(t, w) for t, w in self._cancelled_loads if w is not self.sender()]
+            return
+        session, self.loading_session = self.loading_session, None
+        inference = self.load_worker.inference
+        self.load_thread = None
+        self.load_worker = None
+        if success:
+            profiling.record('controller.load_file', self._load_started, time.perf_counter() - self._load_started)
+            session.model.end_load(metadata, source, inference)
+            # En stockage 'lazy', l'index spatial n'est construit qu'à la première requête (il décode tout le fichier).
+            if session.file_info.get('storage') != 'lazy': session.spatial_index.build()
+            session.model.set_read_only(False)
+            session.loaded = True
+            self._invalidate_relations() # Le fichier ouvert remplace sa lecture sur disque
+            if session.model.rowCount() and session.merge_key not in session.model.get_headers():
+                # Sans clé, une modification distante concurrente ne pourra pas être fusionnée ligne par ligne.
+                self.status_message_changed.emit(f"Fichier '{session.name}' chargé. Propriété « {session.merge_key} » absente : "
+                                                 "renseignez l'option 'key' du fichier dans la configuration pour permettre la fusion des modifications distantes.")
+            else: self.status_message_changed.emit(f"Fichier '{session.name}' chargé.")
+            self.data_loaded_and_ready.emit(session.name)
+        else:
+            session.model.load_data({})
+            del self.sessions[session.path]
+            self._invalidate_relations()
+            self.clone_finished.emit(False, message)
+
+    def is_loading(self):
+        return self.load_worker is not None
+
+    def cancel_loading(self):
+        """Interrompt un chargement en cours ; ses lots restants seront ignorés."""
+        if self.load_worker:
+            self.load_worker.cancel()
+            self._cancelled_loads.append((self.load_thread, self.load_worker))
+            self.load_worker = None
+            self.load_thread = None
+            # Le fichier à moitié lu est oublié : il sera relu s'il est rouvert.
+            del self.sessions[self.loading_session.path]
+            self.loading_session = None
 
     def add_row(self):
         """Ajoute une ligne vide au modèle et met à jour l'état des modifications."""
         if self.model.insert_row():
-            self.session_adds += 1
             self._update_modifications()
             self.status_message_changed.emit("Nouvelle ligne ajoutée.")
 
     def delete_row(self, row_index):
         """Supprime une ligne du modèle et met à jour l'état des modifications."""
-        if 0 <= row_index < self.model.rowCount():
-            self.model.remove_rows([row_index])
-            self.session_deletes += 1
+        if 0 <= row_index < self.model.rowCount() and self.model.remove_rows([row_index]):
             self._update_modifications()
             self.status_message_changed.emit(f"Ligne {row_index + 1} supprimée.")
 
+    def delete_rows(self, row_indexes):
+        """Supprime d'un coup plusieurs lignes (sélection multiple)."""
+        row_indexes = [row for row in row_indexes if 0 <= row < self.model.rowCount()]
+        if len(row_indexes) == 1: return self.delete_row(row_indexes[0])
+        if row_indexes and self.model.remove_rows(row_indexes):
+            self._update_modifications()
+            self.status_message_changed.emit(f"{len(row_indexes)} lignes supprimées.")
+
+    def duplicate_rows(self, row_indexes):
+        """Ajoute en fin de tableau une copie des lignes sélectionnées."""
+        if self.model.duplicate_rows(row_indexes):
+            self._update_modifications()
+            self.status_message_changed.emit(f"{len(set(row_indexes))} ligne(s) dupliquée(s) en fin de tableau.")
+
+    def commit_form_edits(self, model, row_id, values):
+        """Applique en une fois les saisies du formulaire sur une ligne, repérée par son identifiant stable."""
+        row = model.row_of(row_id)
+        if row >= 0: model.set_values(row, values)
+
     def revert_changes(self):
-        """Restaure les données du modèle en ré-appliquant les filtres et types."""
-        data_to_load = copy.deepcopy(self.original_geojson_data) if self.original_geojson_data else {}
-        
-        visible_cols = self.current_file_info.get('columns', None) if self.current_file_info else None
-        types = self.current_file_info.get('types', {}) if self.current_file_info else {}
-        self.model.load_data(data_to_load, visible_headers=visible_cols, column_types=types)
-        
-        self.reset_modification_counters()
+        """Annule les modifications de la session à partir du journal du modèle."""
+        if self.is_publishing(): return
+        self.model.revert_changes()
+        self._update_modifications()
         self.status_message_changed.emit("Modifications annulées.")
         
-    def publish_changes(self):
-        """Sauvegarde le fichier, commit et pousse les changements sur GitHub."""
+    def publish_changes(self, prefer=None, validate=True):
+        """
+        Lance en arrière-plan la publication de tous les fichiers modifiés : contrôle des valeurs
+        ('validate', voir validation_problems), écriture en parallèle, un seul commit et un seul
+        push. Un fichier modifié entre-temps sur le dépôt distant est fusionné feature par feature ;
+        'prefer' ('ours' ou 'theirs') tranche les conflits de cette fusion, qui sinon interrompent
+        la publication (voir merge_conflicts).
+        """
+        if self.is_publishing() or self.is_loading(): return
+        self.merge_conflicts = {}
+        self.validation_problems = {}
         if not self.has_changes():
             self.status_message_changed.emit("Aucune modification à publier.")
             self.publish_finished.emit(True, "") 
             return
-        if not self.git_handler or not self.current_file_info:
+        if not self.git_handler:
             self.publish_finished.emit(False, "Erreur : Git ou les informations du fichier sont manquantes.")
             return
 
+        sessions = self.modified_sessions()
         self.status_message_changed.emit("Publication en cours...")
-        
-        file_path_relative = self.current_file_info['path']
-        absolute_path = os.path.join(self.config["LOCAL_REPO_PATH"], file_path_relative)
-        
-        try:
-            with open(absolute_path, 'w', encoding='utf-8') as f:
-                json.dump(self.model.get_geojson_data(), f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.publish_finished.emit(False, f"Erreur d'écriture du fichier : {e}")
+        # Les modèles restent consultables mais ne sont plus modifiables jusqu'à la fin de la publication.
+        for session in sessions: session.model.set_read_only(True)
+        self._publish_started = time.perf_counter()
+        self.publish_started.emit()
+
+        self.publish_thread = QThread(self)
+        self.publish_worker = GitPublishWorker(self.git_handler, [(session.path, session.model) for session in sessions],
+                                               self.commit_message(sessions),
+                                               fast=self.config.get("PUBLISH_MODE", "fast") == "fast",
+                                               merge_keys={session.path: session.merge_key for session in sessions}, prefer=prefer,
+                                               validate=validate)
+        self.publish_worker.moveToThread(self.publish_thread)
+        self.publish_thread.started.connect(self.publish_worker.run)
+        self.publish_worker.progress.connect(self.publish_progress)
+        self.publish_worker.finished.connect(self.on_publish_worker_finished)
+        self.publish_worker.finished.connect(self.publish_thread.quit)
+        self.publish_worker.finished.connect(self.publish_worker.deleteLater)
+        self.publish_thread.finished.connect(self.publish_thread.deleteLater)
+        self.publish_thread.start()
+
+    def describe_validation(self, problems_by_path, max_lines=12):
+        """
+        Texte, limité à 'max_lines' lignes, d'un rapport de validation :
+        {chemin: [(propriété, gravité, message, lignes)]} (voir validation_problems).
+        """
+        lines = []
+        for path, problems in problems_by_path.items():
+            session = self.sessions[path]
+            for prop_name, severity, message, rows in problems:
+                shown = ", ".join(str(row + 1) for row in rows[:5]) + (" ..." if len(rows) > 5 else "")
+                prefix = "Avertissement" if severity == 'warning' else "Erreur"
+                lines.append(f"{prefix} - {session.name}, « {prop_name} » : {message} (ligne(s) {shown})")
+        if len(lines) > max_lines: lines = lines[:max_lines] + [f"... et {len(lines) - max_lines} autre(s) problème(s)."]
+        return "\n".join(lines)
+
+    def commit_message(self, sessions):
+        """Message du commit de publication : les fichiers modifiés, puis le détail des lignes changées par fichier."""
+        subject = f"Mise à jour de {', '.join(session.path for session in sessions)} via l'éditeur"
+        details = [f"- {session.name} : {describe_changes(session.change_summary())}" for session in sessions]
+        return subject + "\n\n" + "\n".join(details)
+
+    def change_summary(self):
+        """Résumé des modifications non publiées, tous fichiers confondus (voir ChangeJournal.summary)."""
+        total = {"added": 0, "modified": 0, "deleted": 0, "properties": {}}
+        for session in self.modified_sessions():
+            summary = session.change_summary()
+            for key in ("added", "modified", "deleted"): total[key] += summary[key]
+            for prop_name, count in summary["properties"].items():
+                total["properties"][prop_name] = total["properties"].get(prop_name, 0) + count
+        total["properties"] = dict(sorted(total["properties"].items(), key=lambda item: (-item[1], item[0])))
+        return total
+
+    def on_publish_worker_finished(self, success, message):
+        """Gère la fin du thread de publication."""
+        profiling.record('controller.publish', self._publish_started, time.perf_counter() - self._publish_started)
+        published_paths = self.publish_worker.file_paths
+        sources = self.publish_worker.sources
+        merged_paths = self.publish_worker.merged
+        self.merge_conflicts = self.publish_worker.conflicts
+        self.validation_problems = self.publish_worker.problems
+        # Commit créé mais push en échec : les fichiers commités deviennent la référence (base des
+        # fusions suivantes) et le commit sera poussé à la prochaine publication.
+        accepted = success or self.publish_worker.committed
+        self.unpushed = not success and (self.unpushed or self.publish_worker.committed)
+        self.publish_thread = None
+        self.publish_worker = None
+        for path in published_paths:
+            model = self.sessions[path].model
+            model.set_read_only(False)
+            if accepted:
+                model.accept_changes()
+                model.source = sources.get(path)
+        if accepted: self._invalidate_relations() # La synchronisation a pu modifier les fichiers non ouverts
+        self._update_modifications()
+        self.publish_finished.emit(success, message)
+        if accepted: self._reload_sessions(merged_paths)
+
+    def _reload_sessions(self, paths):
+        """
+        Relit des fichiers publiés après fusion : leur contenu sur disque comprend aussi les
+        modifications distantes. Le fichier affiché est relu aussitôt, les autres à leur réouverture.
+        """
+        for path in paths:
+            session = self.sessions.pop(path, None)
+            if session is self.current_session: self.select_data_source(session.file_info)
+
+    def is_publishing(self):
+        return self.publish_worker is not None
+
+    def cancel_publish(self):
+        """Demande l'annulation de la publication, tant que le push n'a pas commencé."""
+        logger.warning("Demande d'annulation de la publication...")
+        if self.publish_worker:
+            self.publish_worker.cancel()
+
+    # --- Requêtes spatiales (points lon/lat des features, voir spatial.FeatureSpatialIndex) ---
+
+    def spatial_index(self, file_path=None):
+        """Index spatial d'un fichier chargé (le fichier affiché par défaut), ou None."""
+        session = self.sessions.get(file_path) if file_path else self.current_session
+        return session.spatial_index if session and session.loaded else None
+
+    def feature_point(self, row, file_path=None):
+        """Point (x, y) d'une ligne, pour s'en servir comme centre d'une requête."""
+        index = self.spatial_index(file_path)
+        return index.point(row) if index else None
+
+    def features_in_bbox(self, xmin, ymin, xmax, ymax, file_path=None):
+        """Lignes dont le point est dans l'emprise (emprise de la carte, filtre spatial)."""
+        index = self.spatial_index(file_path)
+        return index.in_bbox(xmin, ymin, xmax, ymax) if index else []
+
+    def features_within_distance(self, x, y, meters, file_path=None):
+        """
+        Couples (distance en mètres, ligne) à moins de 'meters' de (x, y), du plus proche au plus
+        lointain. Par exemple les cantines à moins de 2 km d'une cuisine centrale (chemins des entrées de FILES) :
+        x, y = controller.feature_point(row, 'mviewer/apps/public/cantines/cuisine_centrale.geojson')
+        controller.features_within_distance(x, y, 2000, 'mviewer/apps/public/cantines/cantines_scolaires.geojson')
+        """
+        index = self.spatial_index(file_path)
+        return index.within_distance(x, y, meters) if index else []
+
+    def nearest_features(self, x, y, count=1, file_path=None):
+        """Couples (distance en mètres, ligne) des 'count' lignes les plus proches de (x, y)."""
+        index = self.spatial_index(file_path)
+        return index.nearest(x, y, count) if index else []
+
+    # --- Références entre fichiers (option 'references' des entrées de FILES) ---
+
+    def join_relations(self):
+        """
+        Relations déclarées dans la configuration, par exemple pour les cantines :
+        "references": {"cuisine_ratachement": {"path": ".../cuisine_centrale.geojson", "key": "nom"}}.
+        Chaque propriété n'est indexée qu'une fois : depuis son modèle si le fichier est ouvert
+        (l'index suit alors les éditions), sinon depuis le fichier du dépôt local, lu en arrière-plan.
+        Liste vide tant que cette lecture n'est pas terminée (voir build_relations, relations_ready).
+        """
+        if self._relations is None: self.build_relations()
+        return self._relations or []
+
+    def has_relations(self):
+        return self._relations is not None
+
+    def _relation_keys(self):
+        """Propriétés à indexer : (chemin, propriété) de chaque côté de chaque relation."""
+        keys = []
+        for file_info in self.config.get("FILES", []):
+            for prop_name, reference in file_info.get('references', {}).items():
+                keys += [(file_info['path'], prop_name), (reference['path'], reference['key'])]
+        return list(dict.fromkeys(keys))
+
+    def build_relations(self):
+        """
+        Construit les relations. Les propriétés des fichiers ouverts sont indexées aussitôt depuis
+        leur modèle ; les fichiers non ouverts sont lus par un worker, hors du thread de l'interface.
+        relations_ready est émis quand les relations sont prêtes.
+        """
+        if self._relations is not None or self.relations_worker: return
+        pending = []
+        for file_path, prop_name in self._relation_keys():
+            if (file_path, prop_name) in self._value_indexes: continue
+            session = self.sessions.get(file_path)
+            if session and session.loaded: self._value_indexes[(file_path, prop_name)] = ValueIndex(prop_name).bind(session.model)
+            else: pending.append((file_path, prop_name))
+        if not pending:
+            self._set_relations()
             return
-        
-        result = self.git_handler.commit_and_push(file_path_relative, f"Mise à jour de {file_path_relative} via l'éditeur")
-        
-        if result is True:
-            self.original_geojson_data = copy.deepcopy(self.model.get_geojson_data())
-            self.reset_modification_counters()
-            self.publish_finished.emit(True, "Modifications poussées sur GitHub !")
-        else:
-            self.publish_finished.emit(False, str(result))
+        self.status_message_changed.emit("Lecture des fichiers référencés...")
+        self.relations_thread = QThread(self)
+        self.relations_worker = ValueIndexWorker(self.config.get("LOCAL_REPO_PATH", ""), pending)
+        self.relations_worker.moveToThread(self.relations_thread)
+        self.relations_thread.started.connect(self.relations_worker.run)
+        self.relations_worker.finished.connect(self.on_relations_worker_finished)
+        self.relations_worker.finished.connect(self.relations_thread.quit)
+        self.relations_thread.finished.connect(self.relations_worker.deleteLater) # Après le traitement de 'finished' (sender())
+        self.relations_thread.finished.connect(self.relations_thread.deleteLater)
+        self.relations_thread.start()
+
+    def on_relations_worker_finished(self):
+        """Ajoute les index lus par le worker et termine les relations."""
+        if self.sender() is not self.relations_worker: # Lecture abandonnée (voir _invalidate_relations)
+            self._abandoned_relations = [(t, w) for t, w in self._abandoned_relations if w is not self.sender()]
+            return
+        indexes = self.relations_worker.indexes
+        self.relations_thread = None
+        self.relations_worker = None
+        for (file_path, prop_name), index in indexes.items():
+            # Fichier ouvert pendant la lecture : son modèle remplace la lecture sur disque.
+            session = self.sessions.get(file_path)
+            self._value_indexes[(file_path, prop_name)] = ValueIndex(prop_name).bind(session.model) if session and session.loaded else index
+        self._set_relations()
+        self.status_message_changed.emit("Références prêtes.")
+
+    def _set_relations(self):
+        self._relations = []
+        for file_info in self.config.get("FILES", []):
+            for prop_name, reference in file_info.get('references', {}).items():
+                self._relations.append(Relation(file_info['path'], prop_name, reference['path'], reference['key'],
+                                                self._value_indexes[(file_info['path'], prop_name)],
+                                                self._value_indexes[(reference['path'], reference['key'])]))
+        self.relations_ready.emit()
+
+    def _invalidate_relations(self):
+        for index in self._value_indexes.values(): index.unbind()
+        self._value_indexes = {}
+        self._relations = None
+        if self.relations_worker: # Lecture en cours devenue obsolète : son résultat sera ignoré, on en relance une
+            self._abandoned_relations.append((self.relations_thread, self.relations_worker))
+            self.relations_thread = None
+            self.relations_worker = None
+            self.build_relations()
+
+    def relation(self, file_path, prop_name):
+        """Relation déclarée pour une propriété d'un fichier, ou None."""
+        return next((r for r in self.join_relations() if r.source_path == file_path and r.prop_name == prop_name), None)
+
+    def referenced_rows(self, file_path, prop_name, value):
+        """Lignes du fichier cible désignées par 'value' (ex. la cuisine centrale d'une cantine)."""
+        relation = self.relation(file_path, prop_name)
+        return relation.referenced_rows(value) if relation else []
+
+    def referencing_rows(self, file_path, key_name, value):
+        """{fichier source: lignes} des lignes qui font référence à 'value' (ex. les cantines d'une cuisine)."""
+        return {relation.source_path: relation.referencing_rows(value) for relation in self.join_relations()
+                if relation.target_path == file_path and relation.key_name == key_name}
+
+    def check_references(self):
+        """
+        Contrôle d'intégrité de toutes les relations : références sans cible, nombre de
+        références par cible et clés en double dans le fichier cible. Vide tant que les
+        relations ne sont pas prêtes (voir build_relations).
+        """
+        names = {file_info['path']: file_info['name'] for file_info in self.config.get("FILES", [])}
+        return [{"file": names.get(relation.source_path, relation.source_path), "property": relation.prop_name,
+                 "target": names.get(relation.target_path, relation.target_path), "key": relation.key_name,
+                 "dangling": relation.dangling(), "counts": relation.counts(), "duplicates": relation.duplicate_keys()}
+                for relation in self.join_relations()]
 
     def get_column_type(self, column_name):
         """Permet à la vue de connaître le type d'une colonne."""
         return self.current_column_types.get(column_name, 'string') # 'string' par défaut
 
-    def on_data_changed_in_model(self, top_left, bottom_right, roles):
-        """Réagit aux éditions dans le modèle pour suivre les changements."""
-        for row in range(top_left.row(), bottom_right.row() + 1):
-            self.session_edits.add(row)
+    def on_validation_failed(self, row, prop_name, message):
+        """Saisie refusée par le modèle : elle ne convient pas au type de la colonne."""
+        logger.warning(f"Saisie refusée (ligne {row + 1}, {prop_name}) : {message}")
+        self.status_message_changed.emit(f"Saisie refusée pour « {prop_name} » (ligne {row + 1}) : {message}")
+
+    def on_undo_index_changed(self, index):
+        """Réagit à chaque opération faite, annulée ou refaite : le journal est déjà à jour, on notifie la vue."""
         self._update_modifications()
         
     def reset_modification_counters(self):
-        """Réinitialise tous les compteurs de modification."""
-        self.session_adds, self.session_deletes, self.session_edits = 0, 0, set()
+        """Oublie toutes les modifications en cours du fichier affiché."""
+        self.model.journal.clear()
+        self.model.undo_stack.clear()
         self._update_modifications()
+
+    def modified_sessions(self):
+        return [session for session in self.sessions.values() if session.has_changes()]
         
     def has_changes(self):
-        """Vérifie s'il y a des modifications non publiées."""
-        return bool(self.session_adds or self.session_deletes or self.session_edits)
+        """Vérifie s'il y a des modifications non publiées, tous fichiers confondus (y compris un commit pas encore poussé)."""
+        return self.unpushed or any(session.has_changes() for session in self.sessions.values())
+
+    def current_has_changes(self):
+        """Vérifie s'il y a des modifications non publiées dans le fichier affiché."""
+        return self.model.journal.has_changes()
+
+    def session_has_changes(self, file_path):
+        session = self.sessions.get(file_path)
+        return bool(session and session.has_changes())
+
+    def change_count(self):
+        """Total des modifications non publiées, tous fichiers confondus."""
+        return sum(session.change_count() for session in self.sessions.values())
 
     def _update_modifications(self):
-        """Calcule le total des modifications et notifie la vue."""
-        total = self.session_adds + self.session_deletes + len(self.session_edits)
-        self.modifications_updated.emit(total, self.has_changes())
+        """Calcule le total des modifications (tous fichiers) et notifie la vue."""
+        self.modifications_updated.emit(self.change_count(), self.has_changes())
 
     def _start_clone_process(self):
         """Gère la création du thread et du worker pour le clonage."""
         self.clone_started.emit()
-        self.thread = QThread()
+        self.thread = QThread(self)
         self.worker = GitCloneWorker(self.config)
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
@@ -0,0 +1,437 @@
+# src/feature_store.py
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import compress
+
+from journal import MISSING
+
+# Membres d'une feature conservés dans des colonnes dédiées (les autres vont dans 'extras').
+_CORE_MEMBERS = ('type', 'properties', 'geometry')
+
+
+class DictFeatureStore:
+    """
+    Stockage historique : une liste de features GeoJSON sous forme de dictionnaires.
+    Sert de référence pour l'interface commune aux stockages du modèle.
+    """
+    def __init__(self, column_types=None):
+        self._features = []
+
+    def __len__(self): return len(self._features)
+
+    def get(self, row, key, default=None):
+        properties = self._features[row].get('properties')
+        return properties.get(key, default) if isinstance(properties, dict) else default
+
+    def set(self, row, key, value):
+        """Modifie une propriété et renvoie l'ancienne valeur (MISSING si elle était absente)."""
+        feature = self._features[row]
+        if not isinstance(feature.get('properties'), dict): feature['properties'] = {}
+        old_value = feature['properties'].get(key, MISSING)
+        feature['properties'][key] = value
+        return old_value
+
+    def discard(self, row, key):
+        properties = self._features[row].get('properties')
+        if isinstance(properties, dict): properties.pop(key, None)
+
+    def feature(self, row): return self._features[row]
+    def geometry(self, row): return self._features[row].get('geometry')
+    def point(self, row): return None # Pas de points compactés : voir geometry()
+    def features(self): return list(self._features)
+    def column(self, key): return [self.get(row, key) for row in range(len(self._features))]
+    def column_chunks(self, keys): yield {key: self.column(key) for key in keys}
+
+    def extend(self, features): self._features.extend(features)
+    def insert(self, row, feature): self._features.insert(row, feature)
+    def delete(self, row): del self._features[row]
+    def delete_range(self, start, stop): del self._features[start:stop]
+
+    def retain(self, keep):
+        """Ne garde que les lignes dont l'octet de 'keep' est non nul, en un seul parcours."""
+        self._features = list(compress(self._features, keep))
+
+
+class _ObjectColumn:
+    """Colonne générique : une liste de valeurs, chaînes internées."""
+    __slots__ = ('values',)
+
+    def __init__(self, values=None):
+        self.values = values if values is not None else []
+
+    def get(self, row): return self.values[row]
+
+    def set(self, row, value):
+        self.values[row] = sys.intern(value) if type(value) is str else value
+        return True
+
+    def insert(self, row, value):
+        self.values.insert(row, sys.intern(value) if type(value) is str else value)
+        return True
+
+    def delete(self, row): del self.values[row]
+    def delete_range(self, start, stop): del self.values[start:stop]
+    def retain(self, keep): self.values = list(compress(self.values, keep))
+    def to_list(self): return list(self.values)
+
+
+class _IntColumn:
+    """
+    Colonne typée 'int' : entiers dans un tableau compact, plus un octet d'état par ligne
+    (0 = entier, 1 = null, 2 = absent). Toute autre valeur est refusée (set/insert renvoient
+    False) et la colonne est alors convertie en _ObjectColumn par le stockage.
+    """
+    __slots__ = ('values', 'states')
+    _MIN, _MAX = -(1 << 63), (1 << 63) - 1
+
+    def __init__(self):
+        self.values = array('q')
+        self.states = bytearray()
+
+    def _encode(self, value):
+        if value is MISSING: return 0, 2
+        if value is None: return 0, 1
+        if type(value) is int and self._MIN <= value <= self._MAX: return value, 0
+        return None
+
+    def get(self, row):
+        state = self.states[row]
+        if state == 0: return self.values[row]
+        return None if state == 1 else MISSING
+
+    def set(self, row, value):
+        encoded = self._encode(value)
+        if encoded is None: return False
+        self.values[row], self.states[row] = encoded
+        return True
+
+    def insert(self, row, value):
+        encoded = self._encode(value)
+        if encoded is None: return False
+        self.values.insert(row, encoded[0])
+        self.states.insert(row, encoded[1])
+        return True
+
+    def delete(self, row):
+        del self.values[row]
+        del self.states[row]
+
+    def delete_range(self, start, stop):
+        del self.values[start:stop]
+        del self.states[start:stop]
+
+    def retain(self, keep):
+        self.values = array('q', compress(self.values, keep))
+        self.states = bytearray(compress(self.states, keep))
+
+    def to_list(self): return [self.get(row) for row in range(len(self.states))]
+
+
+class _GeometryColumn:
+    """
+    Géométries conservées à part des propriétés. Les points 2D (cas courant des couches
+    mviewer) sont stockés dans deux tableaux de flottants ; les autres géométries restent
+    des objets Python dans 'others' (None pour les points compactés).
+    """
+    __slots__ = ('x', 'y', 'others')
+
+    def __init__(self):
+        self.x, self.y, self.others = array('d'), array('d'), []
+
+    @staticmethod
+    def _is_compact_point(geometry):
+        if type(geometry) is not dict or tuple(geometry) != ('type', 'coordinates'): return False
+        coordinates = geometry['coordinates']
+        return (geometry['type'] == 'Point' and type(coordinates) is list and len(coordinates) == 2
+                and type(coordinates[0]) is float and type(coordinates[1]) is float)
+
+    def get(self, row):
+        other = self.others[row]
+        if other is not None: return None if other is MISSING else other
+        return {"type": "Point", "coordinates": [self.x[row], self.y[row]]}
+
+    def point(self, row):
+        """Renvoie (x, y) d'un point compacté, ou None."""
+        return (self.x[row], self.y[row]) if self.others[row] is None else None
+
+    def insert(self, row, geometry):
+        if self._is_compact_point(geometry):
+            x, y = geometry['coordinates']
+            other = None
+        else:
+            x = y = 0.0
+            other = MISSING if geometry is None else geometry
+        self.x.insert(row, x)
+        self.y.insert(row, y)
+        self.others.insert(row, other)
+
+    def delete(self, row):
+        del self.x[row]
+        del self.y[row]
+        del self.others[row]
+
+    def delete_range(self, start, stop):
+        del self.x[start:stop]
+        del self.y[start:stop]
+        del self.others[start:stop]
+
+    def retain(self, keep):
+        self.x = array('d', compress(self.x, keep))
+        self.y = array('d', compress(self.y, keep))
+        self.others = list(compress(self.others, keep))
+
+
+class ColumnarFeatureStore:
+    """
+    Stockage en colonnes : une colonne compacte par propriété (tableau d'entiers pour les
+    colonnes déclarées 'int' dans 'types', liste de chaînes internées pour les autres),
+    géométries à part. L'ordre des clés de chaque feature est mémorisé sous forme de tuples
+    partagés, ce qui permet de reconstruire à l'identique le GeoJSON d'origine.
+    """
+    def __init__(self, column_types=None):
+        self._column_types = column_types or {}
+        self._columns = {}
+        self._geometries = _GeometryColumn()
+        self._key_orders = []   # tuple des clés de 'properties' (None si 'properties' n'est pas un objet)
+        self._layouts = []      # tuple des membres de la feature, dans l'ordre du fichier
+        self._extras = []       # membres supplémentaires (id, bbox...) ou None
+        self._shared = {}       # tuples partagés entre les lignes
+
+    def __len__(self): return len(self._key_orders)
+
+    def _share(self, value):
+        return self._shared.setdefault(value, value)
+
+    def _add_column(self, key):
+        column = _IntColumn() if self._column_types.get(key) == 'int' else _ObjectColumn()
+        for row in range(len(self)): column.insert(row, MISSING)
+        self._columns[sys.intern(key)] = column
+        return column
+
+    def _demote(self, key):
+        """Convertit une colonne 'int' qui reçoit une autre valeur en colonne générique."""
+        column = self._columns[key] = _ObjectColumn(self._columns[key].to_list())
+        return column
+
+    def get(self, row, key, default=None):
+        column = self._columns.get(key)
+        if column is None: return default
+        value = column.get(row)
+        return default if value is MISSING else value
+
+    def set(self, row, key, value):
+        """Modifie une propriété et renvoie l'ancienne valeur (MISSING si elle était absente)."""
+        column = self._columns.get(key) or self._add_column(key)
+        old_value = column.get(row)
+        if not column.set(row, value): self._demote(key).set(row, value)
+        if old_value is MISSING:
+            self._key_orders[row] = self._share((self._key_orders[row] or ()) + (key,))
+            if 'properties' not in self._layouts[row]:
+                self._layouts[row] = self._share(self._layouts[row] + ('properties',))
+        return old_value
+
+    def discard(self, row, key):
+        column = self._columns.get(key)
+        if column is None or column.get(row) is MISSING: return
+        column.set(row, MISSING)
+        self._key_orders[row] = self._share(tuple(k for k in self._key_orders[row] if k != key))
+
+    def feature(self, row):
+        """Reconstruit la feature GeoJSON d'une ligne."""
+        key_orders = self._key_orders[row]
+        extras = self._extras[row] or {}
+        feature = {}
+        for member in self._layouts[row]:
+            if member == 'properties':
+                feature[member] = None if key_orders is None else {key: self._columns[key].get(row) for key in key_orders}
+            elif member == 'geometry': feature[member] = self._geometries.get(row)
+            elif member == 'type' and member not in extras: feature[member] = "Feature"
+            else: feature[member] = extras[member]
+        return feature
+
+    def features(self): return [self.feature(row) for row in range(len(self))]
+
+    def column(self, key):
+        """Valeurs d'une propriété pour toutes les lignes (None si absente), pour le tri."""
+        column = self._columns.get(key)
+        if column is None: return [None] * len(self)
+        return [None if value is MISSING else value for value in column.to_list()]
+
+    def column_chunks(self, keys):
+        """Valeurs de plusieurs propriétés, en un seul lot ({propriété: valeurs}) : voir LazyFeatureStore."""
+        yield {key: self.column(key) for key in keys}
+
+    def geometry(self, row): return self._geometries.get(row)
+    def point(self, row): return self._geometries.point(row)
+
+    def extend(self, features):
+        for feature in features: self.insert(len(self), feature)
+
+    def insert(self, row, feature):
+        properties = feature.get('properties')
+        if isinstance(properties, dict):
+            for key in properties:
+                if key not in self._columns: self._add_column(key)
+            key_order = self._share(tuple(properties))
+        else:
+            properties, key_order = {}, None
+        for key, column in self._columns.items():
+            value = properties.get(key, MISSING)
+            if not column.insert(row, value): self._demote(key).insert(row, value)
+
+        extras = {k: v for k, v in feature.items() if k not in _CORE_MEMBERS}
+        if feature.get('type', "Feature") != "Feature": extras['type'] = feature['type']
+        self._key_orders.insert(row, key_order)
+        self._layouts.insert(row, self._share(tuple(feature)))
+        self._extras.insert(row, extras or None)
+        self._geometries.insert(row, feature.get('geometry'))
+
+    def delete(self, row):
+        for column in self._columns.values(): column.delete(row)
+        del self._key_orders[row]
+        del self._layouts[row]
+        del self._extras[row]
+        self._geometries.delete(row)
+
+    def delete_range(self, start, stop):
+        """Supprime les lignes start à stop - 1 (un seul décalage par colonne)."""
+        for column in self._columns.values(): column.delete_range(start, stop)
+        del self._key_orders[start:stop]
+        del self._layouts[start:stop]
+        del self._extras[start:stop]
+        self._geometries.delete_range(start, stop)
+
+    def retain(self, keep):
+        """Ne garde que les lignes dont l'octet de 'keep' est non nul, en un seul parcours par colonne."""
+        for column in self._columns.values(): column.retain(keep)
+        self._key_orders = list(compress(self._key_orders, keep))
+        self._layouts = list(compress(self._layouts, keep))
+        self._extras = list(compress(self._extras, keep))
+        self._geometries.retain(keep)
+
+
+class LazyFeatureStore:
+    """
+    Stockage paresseux pour les très gros fichiers : pour chaque ligne lue, seule la position
+    de la feature dans une copie projetée en mémoire du fichier (geojson_io.MappedFile) est
+    conservée. Une feature n'est décodée qu'à la demande (cellules affichées), et les dernières
+    décodées sont gardées dans un cache LRU de CACHE_SIZE features. Les lignes éditées, ajoutées
+    ou réinsérées deviennent des dictionnaires conservés en mémoire, comme dans DictFeatureStore.
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self, column_types=None):
+        self._mapped = None
+        self._spans = array('q')   # début et fin de chaque feature du fichier, par numéro dans le fichier
+        self._numbers = array('q') # numéro dans le fichier de chaque ligne (-1 : feature en mémoire)
+        self._owned = []           # feature en mémoire de chaque ligne, ou None
+        self._cache = OrderedDict() # numéro dans le fichier -> feature décodée
+
+    def __len__(self): return len(self._numbers)
+
+    def _decode(self, number):
+        return self._mapped.decode(self._spans[2 * number], self._spans[2 * number + 1])
+
+    def _cached(self, number):
+        cache = self._cache
+        feature = cache.get(number)
+        if feature is None:
+            feature = cache[number] = self._decode(number)
+            if len(cache) > self.CACHE_SIZE: cache.popitem(last=False)
+        else:
+            cache.move_to_end(number)
+        return feature
+
+    def _own(self, row):
+        """Garde en mémoire la feature d'une ligne avant de la modifier."""
+        feature = self._owned[row]
+        if feature is None:
+            number = self._numbers[row]
+            feature = self._owned[row] = self._cache.pop(number, None) or self._decode(number)
+            self._numbers[row] = -1
+        return feature
+
+    def get(self, row, key, default=None):
+        properties = self.feature(row).get('properties')
+        return properties.get(key, default) if isinstance(properties, dict) else default
+
+    def set(self, row, key, value):
+        """Modifie une propriété et renvoie l'ancienne valeur (MISSING si elle était absente)."""
+        feature = self._own(row)
+        if not isinstance(feature.get('properties'), dict): feature['properties'] = {}
+        old_value = feature['properties'].get(key, MISSING)
+        feature['properties'][key] = value
+        return old_value
+
+    def discard(self, row, key):
+        properties = self._own(row).get('properties')
+        if isinstance(properties, dict): properties.pop(key, None)
+
+    def feature(self, row):
+        feature = self._owned[row]
+        return feature if feature is not None else self._cached(self._numbers[row])
+
+    def geometry(self, row): return self.feature(row).get('geometry')
+    def point(self, row): return None # Pas de points compactés : voir geometry()
+
+    def features(self):
+        # Parcours complet : décodé sans passer par le cache, pour ne pas le vider.
+        return [feature if feature is not None else self._decode(number) for number, feature in zip(self._numbers, self._owned)]
+
+    def column(self, key):
+        """Valeurs d'une propriété pour toutes les lignes : décode tout le fichier, sans le garder en mémoire."""
+        values = []
+        for number, feature in zip(self._numbers, self._owned):
+            properties = (feature if feature is not None else self._decode(number)).get('properties')
+            values.append(properties.get(key) if isinstance(properties, dict) else None)
+        return values
+
+    def column_chunks(self, keys, chunk_size=CACHE_SIZE):
+        """
+        Valeurs de plusieurs propriétés ({propriété: valeurs}) par lots de 'chunk_size' lignes :
+        le fichier n'est décodé qu'une fois pour toutes les colonnes, sans être gardé en mémoire.
+        """
+        for start in range(0, len(self._numbers), chunk_size):
+            chunk = {key: [] for key in keys}
+            for number, feature in zip(self._numbers[start:start + chunk_size], self._owned[start:start + chunk_size]):
+                properties = (feature if feature is not None else self._decode(number)).get('properties')
+                if not isinstance(properties, dict): properties = {}
+                for key, values in chunk.items(): values.append(properties.get(key))
+            yield chunk
+
+    def extend_mapped(self, mapped, spans):
+        """Ajoute en fin de tableau les features du fichier projeté situées aux positions 'spans' (début, fin...)."""
+        self._mapped = mapped
+        first = len(self._spans) // 2
+        self._spans.extend(spans)
+        count = len(spans) // 2
+        self._numbers.extend(range(first, first + count))
+        self._owned.extend([None] * count)
+
+    def extend(self, features):
+        for feature in features: self.insert(len(self), feature)
+
+    def insert(self, row, feature):
+        self._numbers.insert(row, -1)
+        self._owned.insert(row, feature)
+
+    def delete(self, row):
+        del self._numbers[row]
+        del self._owned[row]
+
+    def delete_range(self, start, stop):
+        del self._numbers[start:stop]
+        del self._owned[start:stop]
+
+    def retain(self, keep):
+        self._numbers = array('q', compress(self._numbers, keep))
+        self._owned = list(compress(self._owned, keep))
+
+
+STORAGE_BACKENDS = {'columnar': ColumnarFeatureStore, 'dict': DictFeatureStore, 'lazy': LazyFeatureStore}
+
+
+def create_store(storage='columnar', column_types=None):
+    """Crée le stockage demandé par l'option 'storage' d'un fichier de la configuration."""
+    return STORAGE_BACKENDS.get(storage, ColumnarFeatureStore)(column_types)
@@ -0,0 +1,113 @@
+# src/form_view.py
+from PySide6.QtCore import Signal, QTimer
+from PySide6.QtGui import QIntValidator
+from PySide6.QtWidgets import QScrollArea, QWidget, QFormLayout, QLabel, QLineEdit
+
+
+class FeatureForm(QScrollArea):
+    """
+    Vue fiche : un champ par propriété. Les champs sont créés une seule fois par schéma
+    (liste des colonnes et types) et seules leurs valeurs changent quand on passe d'une fiche
+    à l'autre. Les champs situés hors de la zone visible ne sont créés qu'à l'approche du
+    défilement (une hauteur de fenêtre d'avance).
+    Les saisies sont gardées en attente et transmises ensemble (edits_committed) après une
+    pause de COMMIT_DELAY_MS, à la validation d'un champ (Entrée, perte du focus) ou au
+    changement de fiche : le modèle reçoit une modification par lot, pas par touche.
+    """
+    edits_committed = Signal(object, dict) # clé de la fiche (voir bind), {propriété: texte}
+    COMMIT_DELAY_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWidgetResizable(True)
+        self._container = QWidget()
+        self._layout = QFormLayout(self._container)
+        self.setWidget(self._container)
+        self._int_validator = QIntValidator(self)
+        self._schema = None
+        self._headers = []
+        self._column_types = {}
+        self._editors = []
+        self._value_of = None
+        self._key = None
+        self._pending = {}
+        self._commit_timer = QTimer(self)
+        self._commit_timer.setSingleShot(True)
+        self._commit_timer.setInterval(self.COMMIT_DELAY_MS)
+        self._commit_timer.timeout.connect(self.commit_pending)
+        self._row_height = 0
+        self.verticalScrollBar().valueChanged.connect(self._create_visible_fields)
+
+    def set_schema(self, headers, column_types):
+        """Recrée les champs si les colonnes ont changé (autre fichier, colonnes ajoutées au chargement)."""
+        schema = (tuple(headers), tuple(sorted(column_types.items())))
+        if schema == self._schema: return
+        self.commit_pending()
+        self._schema = schema
+        self._headers, self._column_types = list(headers), dict(column_types)
+        while self._layout.rowCount(): self._layout.removeRow(0)
+        self._editors = []
+        self._create_visible_fields()
+
+    def bind(self, value_of, key=None):
+        """
+        Affiche une fiche : 'value_of(propriété)' renvoie la valeur d'une cellule, 'key' identifie
+        la fiche dans edits_committed. None vide et désactive les champs (aucune fiche sélectionnée).
+        Les saisies en attente sur la fiche précédente sont d'abord transmises.
+        """
+        self.commit_pending()
+        self._value_of, self._key = value_of, key
+        for header, editor in zip(self._headers, self._editors):
+            self._show_value(header, editor)
+
+    def commit_pending(self):
+        """Transmet immédiatement les saisies en attente."""
+        self._commit_timer.stop()
+        if not self._pending: return
+        edits, self._pending = self._pending, {}
+        self.edits_committed.emit(self._key, edits)
+
+    def editor(self, prop_name):
+        """Champ d'une propriété, ou None s'il n'est pas encore créé."""
+        try:
+            position = self._headers.index(prop_name)
+        except ValueError:
+            return None
+        return self._editors[position] if position < len(self._editors) else None
+
+    def _show_value(self, header, editor):
+        if self._value_of is None:
+            editor.clear()
+            editor.setEnabled(False)
+            return
+        value = self._value_of(header)
+        text = "" if value is None else str(value)
+        if editor.text() != text: editor.setText(text) # setText n'émet pas textEdited
+        editor.setEnabled(True)
+
+    def _create_fields(self, count):
+        for header in self._headers[len(self._editors):len(self._editors) + count]:
+            editor = QLineEdit()
+            # Applique un validateur pour les champs de type entier
+            if self._column_types.get(header) == 'int': editor.setValidator(self._int_validator)
+            editor.textEdited.connect(lambda text, header=header: self._on_text_edited(header, text))
+            editor.editingFinished.connect(self.commit_pending)
+            self._show_value(header, editor)
+            self._layout.addRow(QLabel(header.replace('_', ' ').capitalize()), editor)
+            self._editors.append(editor)
+            if not self._row_height: self._row_height = editor.sizeHint().height() + max(self._layout.verticalSpacing(), 0)
+
+    def _on_text_edited(self, header, text):
+        self._pending[header] = text
+        self._commit_timer.start() # Relancé à chaque frappe
+
+    def _create_visible_fields(self, *args):
+        """Crée les champs jusqu'à une hauteur de fenêtre sous la zone visible."""
+        if len(self._editors) >= len(self._headers): return
+        if not self._row_height: self._create_fields(1)
+        needed = (self.verticalScrollBar().value() + 2 * self.viewport().height()) // max(self._row_height, 1) + 1
+        if needed > len(self._editors): self._create_fields(needed - len(self._editors))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._create_visible_fields()
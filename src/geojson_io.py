@@ -0,0 +1,388 @@
+# src/geojson_io.py
+import codecs
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import weakref
+from array import array
+
+# Espaces autorisés entre deux jetons JSON (même définition que le module json).
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _byte_length(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def blob_digest(content):
+    """Identifiant d'objet git (comme 'git hash-object') d'un contenu en octets."""
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+class GeoJsonSource:
+    """
+    Disposition d'un fichier GeoJSON sur disque, relevée à la lecture : empreinte du contenu
+    et position en octets de chaque feature, indexée par l'identifiant stable de la ligne
+    (voir GeoJsonTableModel._row_ids). Permet de réécrire uniquement les features modifiées.
+    L'empreinte est l'identifiant git du contenu : la version lue reste retrouvable dans le
+    dépôt, comme base d'une fusion (voir merge.py).
+    """
+    def __init__(self, digest, offsets, ensure_ascii=False):
+        self.digest = digest
+        # offsets[2 * id] et offsets[2 * id + 1] : début et fin de la feature (-1 si absente du fichier).
+        self.offsets = offsets
+        self.ensure_ascii = ensure_ascii
+
+    def span(self, row_id):
+        if 2 * row_id + 1 >= len(self.offsets) or self.offsets[2 * row_id] < 0: return None
+        return self.offsets[2 * row_id], self.offsets[2 * row_id + 1]
+
+    def spans(self):
+        """Positions des features présentes, dans l'ordre du fichier (qui est celui des identifiants)."""
+        offsets = self.offsets
+        return [(offsets[i], offsets[i + 1]) for i in range(0, len(offsets), 2) if offsets[i] >= 0]
+
+    def matches(self, content):
+        """Vérifie que le fichier n'a pas changé depuis la lecture (pull, édition externe...)."""
+        return blob_digest(content) == self.digest
+
+
+class GeoJsonStreamReader:
+    """
+    Lit une FeatureCollection GeoJSON de manière incrémentale.
+    Les membres de premier niveau (type, name, crs...) sont décodés normalement,
+    tandis que le tableau 'features' est parcouru élément par élément et renvoyé
+    par lots : le document complet n'est jamais chargé d'un seul bloc.
+    La position en octets de chaque feature est relevée au passage (voir self.source).
+    """
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        # Membres de premier niveau, dans l'ordre du fichier. La clé 'features'
+        # est conservée (valeur None) pour mémoriser sa position.
+        self.metadata = {}
+        self.source = None
+        self._decoder = json.JSONDecoder()
+        self._file = None
+        self._text_decoder = None
+        self._hash = None
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        # Correspondance caractère/octet : self._mark (indice dans le tampon) est à l'octet self._mark_byte.
+        self._mark = 0
+        self._mark_byte = 0
+        self._offsets = array('q')
+        self._non_ascii = False
+        self._escapes = False
+
+    @property
+    def offsets(self):
+        """Positions en octets (début, fin) des features déjà lues, à la suite les unes des autres."""
+        return self._offsets
+
+    def iter_batches(self, batch_size=5000, first_batch_size=200):
+        """
+        Générateur de listes de features. Le premier lot est volontairement petit
+        pour que la vue puisse afficher les premières lignes sans attendre.
+        """
+        self.metadata = {}
+        self._offsets = array('q')
+        # Lecture binaire : les positions en octets restent exactes, y compris avec des fins de ligne CRLF.
+        with open(self.path, 'rb') as f:
+            self._file, self._buf, self._pos, self._eof = f, '', 0, False
+            self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+            self._hash = hashlib.sha1(b'blob %d\0' % os.fstat(f.fileno()).st_size)
+            self._mark = self._mark_byte = 0
+            self._expect('{')
+            if self._skip_ws() != '}':
+                while True:
+                    key = self._decode_value()
+                    if not isinstance(key, str):
+                        raise ValueError("GeoJSON invalide : clé de premier niveau attendue.")
+                    self._expect(':')
+                    if key == 'features':
+                        self.metadata['features'] = None
+                        yield from self._iter_features(batch_size, first_batch_size)
+                    else:
+                        self.metadata[key] = self._decode_value()
+                    separator = self._skip_ws()
+                    self._pos += 1
+                    if separator == ',': continue
+                    if separator == '}': break
+                    raise ValueError("GeoJSON invalide : ',' ou '}' attendu après un membre.")
+            while self._fill(): pass # Fin du fichier, pour l'empreinte complète
+        self._file = None
+        # Un fichier purement ASCII contenant des séquences \uXXXX a été écrit avec ensure_ascii.
+        ensure_ascii = self._escapes and not self._non_ascii
+        self.source = GeoJsonSource(self._hash.hexdigest(), self._offsets, ensure_ascii)
+
+    def _iter_features(self, batch_size, first_batch_size):
+        if self._skip_ws() != '[':
+            # 'features' n'est pas un tableau (null...) : on le décode tel quel.
+            value = self._decode_value()
+            if isinstance(value, list) and value:
+                yield value
+            return
+        self._pos += 1
+        if self._skip_ws() == ']':
+            self._pos += 1
+            return
+
+        batch, limit = [], first_batch_size or batch_size
+        while True:
+            self._skip_ws()
+            self._offsets.append(self._byte_offset(self._pos))
+            batch.append(self._decode_value())
+            self._offsets.append(self._byte_offset(self._pos))
+            if len(batch) >= limit:
+                yield batch
+                batch, limit = [], batch_size
+            separator = self._skip_ws()
+            self._pos += 1
+            if separator == ',': continue
+            if separator == ']': break
+            raise ValueError("GeoJSON invalide : ',' ou ']' attendu dans 'features'.")
+        if batch:
+            yield batch
+
+    # --- Gestion du tampon de lecture ---
+
+    def _byte_offset(self, index):
+        """Position en octets du caractère 'index' du tampon (index croissant d'un appel à l'autre)."""
+        self._mark_byte += _byte_length(self._buf[self._mark:index])
+        self._mark = index
+        return self._mark_byte
+
+    def _fill(self, min_size=0):
+        """Ajoute un bloc au tampon. Renvoie False en fin de fichier."""
+        if self._eof:
+            return False
+        raw = self._file.read(max(self.chunk_size, min_size))
+        self._hash.update(raw)
+        if not self._non_ascii and not raw.isascii(): self._non_ascii = True
+        if not self._escapes and b'\\u' in raw: self._escapes = True
+        chunk = self._text_decoder.decode(raw, final=not raw)
+        if not raw:
+            self._eof = True
+            if not chunk: return False
+        self._byte_offset(self._pos)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = self._mark = 0
+        return True
+
+    def _skip_ws(self):
+        """Avance jusqu'au prochain caractère significatif et le renvoie ('' en fin de fichier)."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self._skip_ws() != char:
+            raise ValueError(f"GeoJSON invalide : '{char}' attendu.")
+        self._pos += 1
+
+    def _decode_value(self):
+        """Décode la valeur JSON suivante, en relisant le fichier si elle est incomplète."""
+        while True:
+            self._skip_ws()
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Valeur coupée par la fin du tampon : on double la lecture suivante
+                # pour éviter de re-décoder indéfiniment une très grosse valeur.
+                if self._fill(len(self._buf) - self._pos):
+                    continue
+                raise
+            # Un nombre ou un littéral en fin de tampon peut être tronqué.
+            if end == len(self._buf) and self._buf[end - 1] not in '}]"' and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+class MappedFile:
+    """
+    Copie privée d'un fichier, projetée en mémoire (mmap) pour en décoder des morceaux à la
+    demande. La copie laisse le fichier du dépôt libre pour git et pour l'écriture (un fichier
+    projeté ne peut pas être remplacé sous Windows) ; elle est supprimée avec cet objet.
+    """
+    def __init__(self, path):
+        fd, self.path = tempfile.mkstemp(prefix='geojson-', suffix='.map')
+        os.close(fd)
+        shutil.copyfile(path, self.path)
+        self._file = open(self.path, 'rb')
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.path) else b''
+        self._finalizer = weakref.finalize(self, MappedFile._release, self.data, self._file, self.path)
+
+    @staticmethod
+    def _release(data, file, path):
+        if isinstance(data, mmap.mmap): data.close()
+        file.close()
+        try: os.remove(path)
+        except OSError: pass
+
+    def decode(self, start, end):
+        """Décode la valeur JSON située entre les octets start et end."""
+        return json.loads(self.data[start:end])
+
+    def close(self): self._finalizer()
+
+
+def index_geojson(path):
+    """Relit un fichier uniquement pour relever sa disposition (GeoJsonSource)."""
+    reader = GeoJsonStreamReader(path)
+    for _ in reader.iter_batches(): pass
+    return reader.source
+
+
+# --- Écriture ---
+
+def _dumps_spaced(value, ensure_ascii):
+    """Sérialisation sur une ligne avec espaces intérieurs, comme ogr2ogr : { "a": [ 1, 2 ] }."""
+    if isinstance(value, dict):
+        if not value: return '{ }'
+        items = ', '.join(f"{json.dumps(key, ensure_ascii=ensure_ascii)}: {_dumps_spaced(item, ensure_ascii)}"
+                          for key, item in value.items())
+        return '{ ' + items + ' }'
+    if isinstance(value, list):
+        if not value: return '[ ]'
+        return '[ ' + ', '.join(_dumps_spaced(item, ensure_ascii) for item in value) + ' ]'
+    return json.dumps(value, ensure_ascii=ensure_ascii)
+
+
+def _dumps_indented(value, indent, ensure_ascii, level=0):
+    """Sérialisation indentée où les tableaux de valeurs simples restent sur une ligne : [-17.2, 14.6]."""
+    if isinstance(value, dict) and value:
+        inner, outer = indent * (level + 1), indent * level
+        items = (f"{inner}{json.dumps(key, ensure_ascii=ensure_ascii)}: {_dumps_indented(item, indent, ensure_ascii, level + 1)}"
+                 for key, item in value.items())
+        return '{\n' + ',\n'.join(items) + '\n' + outer + '}'
+    if isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        inner, outer = indent * (level + 1), indent * level
+        items = (inner + _dumps_indented(item, indent, ensure_ascii, level + 1) for item in value)
+        return '[\n' + ',\n'.join(items) + '\n' + outer + ']'
+    return json.dumps(value, ensure_ascii=ensure_ascii)
+
+
+# Tableau de valeurs simples écrit sur une seule ligne.
+_INLINE_ARRAY = re.compile(r'\[[^\[\]{}\n]+\]')
+
+
+def _leading_whitespace(line):
+    return line[:len(line) - len(line.lstrip(' \t'))]
+
+
+def _feature_formatter(sample, ensure_ascii):
+    """Renvoie une fonction qui sérialise une feature dans le même style que 'sample' (texte d'origine)."""
+    if '\n' not in sample.strip():
+        if sample.startswith('{ '):
+            return lambda feature: _dumps_spaced(feature, ensure_ascii)
+        return lambda feature: json.dumps(feature, ensure_ascii=ensure_ascii)
+    lines = sample.rstrip('\r\n').splitlines()
+    newline = '\r\n' if '\r\n' in sample else '\n'
+    base = _leading_whitespace(lines[-1])
+    indent = _leading_whitespace(lines[1])[len(base):] or '  '
+
+    inline_arrays = _INLINE_ARRAY.search(sample) is not None
+
+    def format_feature(feature):
+        if inline_arrays: text = _dumps_indented(feature, indent, ensure_ascii)
+        else: text = json.dumps(feature, indent=indent, ensure_ascii=ensure_ascii)
+        return text.replace('\n', newline + base)
+    return format_feature
+
+
+def write_atomic(path, content):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(content)
+    os.replace(temporary_path, path)
+
+
+def write_geojson(path, model):
+    """
+    Enregistre le modèle dans 'path' et renvoie la nouvelle GeoJsonSource.
+    Si le fichier est toujours celui qui a été lu, seules les features modifiées ou ajoutées
+    sont re-sérialisées (dans le style du fichier) ; les autres sont recopiées octet pour octet
+    et les features supprimées sont simplement omises. Sinon, le fichier est entièrement réécrit.
+    """
+    source = model.source
+    try:
+        with open(path, 'rb') as f:
+            original = f.read()
+    except FileNotFoundError:
+        original = None
+    spans = source.spans() if source is not None else []
+    if not spans or original is None or not source.matches(original):
+        return _write_full(path, model)
+
+    journal = model.journal
+    changed_ids = journal.edits.keys() | journal.inserted
+    items = []
+    for row in range(model.rowCount()):
+        span = None if model.row_id(row) in changed_ids else source.span(model.row_id(row))
+        items.append(span or model.get_feature(row))
+    content, positions = splice_features(original, spans, items, source.ensure_ascii)
+    write_atomic(path, content)
+    return rows_source(model, content, positions, source.ensure_ascii)
+
+
+def rows_source(model, content, positions, ensure_ascii):
+    """GeoJsonSource d'un contenu écrit d'après le modèle : 'positions' donne la place de chaque ligne, dans l'ordre du tableau."""
+    offsets = array('q', [-1]) * (2 * model.next_row_id())
+    for row, (start, end) in enumerate(positions):
+        row_id = model.row_id(row)
+        offsets[2 * row_id], offsets[2 * row_id + 1] = start, end
+    return GeoJsonSource(blob_digest(content), offsets, ensure_ascii)
+
+
+def splice_features(original, spans, items, ensure_ascii):
+    """
+    Contenu de 'original' (fichier de disposition 'spans', non vide) dont les features sont
+    remplacées par 'items' : une position (début, fin) est recopiée octet pour octet, une feature
+    (dictionnaire) est sérialisée dans le style du fichier. Renvoie le contenu et la position de
+    chaque élément dans ce contenu.
+    """
+    first_start, last_end = spans[0][0], spans[-1][1]
+    # Texte entre deux features consécutives (',\n' par défaut si le fichier n'en a qu'une).
+    separator = original[spans[0][1]:spans[1][0]] if len(spans) > 1 else b',\n'
+    format_feature = None
+
+    parts, position, positions = [original[:first_start]], first_start, []
+    for index, item in enumerate(items):
+        if index:
+            parts.append(separator)
+            position += len(separator)
+        if isinstance(item, tuple):
+            chunk = original[item[0]:item[1]]
+        else:
+            if format_feature is None:
+                sample_start, sample_end = spans[0]
+                format_feature = _feature_formatter(original[sample_start:sample_end].decode('utf-8'), ensure_ascii)
+            chunk = format_feature(item).encode('utf-8')
+        positions.append((position, position + len(chunk)))
+        position += len(chunk)
+        parts.append(chunk)
+    parts.append(original[last_end:])
+    return b''.join(parts), positions
+
+
+def _write_full(path, model):
+    content = json.dumps(model.get_geojson_data(), indent=2, ensure_ascii=False).encode('utf-8')
+    write_atomic(path, content)
+    source = index_geojson(path)
+    # Les features réécrites sont dans l'ordre des lignes : on ré-indexe leurs positions par identifiant.
+    offsets = array('q', [-1]) * (2 * model.next_row_id())
+    for row in range(model.rowCount()):
+        row_id = model.row_id(row)
+        offsets[2 * row_id], offsets[2 * row_id + 1] = source.offsets[2 * row], source.offsets[2 * row + 1]
+    source.offsets = offsets
+    return source
@@ -1,8 +1,15 @@
 # src/git_handler.py
 import os
-from git import Repo, GitCommandError, remote
+import sys
+import time
+from contextlib import contextmanager
+from git import Actor, Repo, GitCommandError, remote
 from urllib.parse import urlparse, urlunparse
 
+import profiling
+from logging_setup import logger
+from settings import DEFAULT_GIT_TIMEOUT as DEFAULT_TIMEOUT
+
 class CloneProgressHandler(remote.RemoteProgress):
     """
     Classe pour intercepter les signaux de progression de GitPython
@@ -35,6 +42,8 @@ class CloneProgressHandler(remote.RemoteProgress):
 
 
 class GitHandler:
+    NOTHING_TO_COMMIT = "Aucun changement détecté à commiter."
+
     def __init__(self, local_path):
         """
         Initialise le gestionnaire avec le chemin local du dépôt.
@@ -42,31 +51,47 @@ class GitHandler:
         """
         self.local_path = local_path
         self.repo = None
+        self.timings = {} # Durée (en secondes) de chaque étape de la dernière publication
         # Vérifie si un dépôt git existe déjà à cet endroit
         if os.path.exists(os.path.join(self.local_path, '.git')):
             self.repo = Repo(self.local_path)
 
-    def test_connection(self):
+    def test_connection(self, timeout=DEFAULT_TIMEOUT):
         """
         Tente de contacter le dépôt distant pour vérifier la connexion et l'authentification.
-        Renvoie True en cas de succès, ou un message d'erreur en cas d'échec.
+        Utilise 'git ls-remote' (liste des branches, sans téléchargement d'objets) et abandonne
+        après 'timeout' secondes. Renvoie True en cas de succès, ou un message d'erreur en cas d'échec.
+        Le délai est imposé par git lui-même (transfert HTTP bloqué, toutes plateformes) et, hors
+        Windows où GitPython ne le permet pas, par l'arrêt du processus (kill_after_timeout). Sous
+        Windows, un git qui ne répond pas (résolution DNS, connexion) peut donc dépasser le délai :
+        l'appelant doit alors abandonner l'attente (voir AppController.on_connection_timeout).
         """
         if not self.repo:
             return "Dépôt local non initialisé."
+        env = {'GIT_TERMINAL_PROMPT': '0', 'GIT_HTTP_LOW_SPEED_LIMIT': '1', 'GIT_HTTP_LOW_SPEED_TIME': str(timeout)}
+        kwargs = {} if sys.platform == 'win32' else {'kill_after_timeout': timeout}
         try:
-            self.repo.remotes.origin.fetch()
+            with profiling.timed('git.ls_remote'):
+                self.repo.git.ls_remote('--heads', 'origin', env=env, **kwargs)
             return True
         except GitCommandError as e:
-            error_msg = str(e)
-            if 'Authentication failed' in error_msg:
+            error_msg = str(e).lower()
+            if 'authentication failed' in error_msg:
                 return "Échec de l'authentification. Vérifiez le nom d'utilisateur et le Personal Access Token."
             elif 'could not resolve host' in error_msg:
                 return "Impossible de contacter le serveur. Vérifiez l'URL du dépôt et votre connexion internet."
+            elif 'timeout:' in error_msg or 'too slow' in error_msg: # kill_after_timeout, ou délai HTTP de git
+                return f"Le dépôt distant ne répond pas (délai de {timeout} s dépassé). Vérifiez votre connexion internet."
             else:
                 return f"Erreur Git inattendue : {e}"
 
-    def clone(self, repo_url, username, token, progress_callback=None):
-        """ Clone un dépôt distant avec un suivi de progression optionnel. """
+    def clone(self, repo_url, username, token, progress_callback=None, sparse_paths=None):
+        """
+        Clone un dépôt distant avec un suivi de progression optionnel.
+        Si 'sparse_paths' est fourni, le clone est léger : historique limité au dernier
+        commit, contenus des fichiers téléchargés à la demande (filtre blob:none, si le
+        serveur le permet) et copie de travail limitée à ces chemins (sparse checkout).
+        """
         parsed_url = urlparse(repo_url)
         netloc_with_auth = f"{username}:{token}@{parsed_url.netloc}"
         remote_url_with_auth = urlunparse(parsed_url._replace(scheme="https", netloc=netloc_with_auth))
@@ -76,11 +101,25 @@ class GitHandler:
             progress_handler = CloneProgressHandler(progress_callback)
 
         try:
-            self.repo = Repo.clone_from(
-                remote_url_with_auth,
-                self.local_path,
-                progress=progress_handler
-            )
+            if sparse_paths:
+                self.repo = Repo.clone_from(
+                    remote_url_with_auth,
+                    self.local_path,
+                    progress=progress_handler,
+                    depth=1,
+                    filter='blob:none',
+                    sparse=True,
+                    no_checkout=True
+                )
+                # Motifs ancrés à la racine du dépôt (syntaxe .gitignore du mode non-cone).
+                self.repo.git.sparse_checkout('set', '--no-cone', *(f"/{path}" for path in sparse_paths))
+                self.repo.git.checkout(self.repo.active_branch.name)
+            else:
+                self.repo = Repo.clone_from(
+                    remote_url_with_auth,
+                    self.local_path,
+                    progress=progress_handler
+                )
             return True
         except GitCommandError as e:
             error_message = (f"Échec du clonage. Vérifiez que :\n"
@@ -90,32 +129,152 @@ class GitHandler:
                              f"Détail de l'erreur Git : {e}")
             return error_message
 
+    def is_sparse(self):
+        """ Indique si la copie de travail est limitée à certains chemins (clone léger). """
+        return bool(self.repo) and self.repo.config_reader().get_value('core', 'sparseCheckout', False) is True
+
+    def add_sparse_path(self, file_path):
+        """ Ajoute un chemin à la copie de travail d'un clone léger (fichier ajouté à la configuration). """
+        if not self.is_sparse():
+            return True
+        try:
+            self.repo.git.sparse_checkout('add', f"/{file_path}")
+            return True
+        except GitCommandError as e:
+            return f"Impossible de récupérer {file_path} : {e}"
+
+    @contextmanager
+    def timed(self, stage):
+        """ Mesure la durée d'une étape et l'ajoute à self.timings. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + duration
+            profiling.record(f"git.{stage}", start, duration)
+
+    def format_timings(self):
+        return ", ".join(f"{stage} {duration:.2f} s" for stage, duration in self.timings.items())
+
     def pull(self):
         """ Récupère les derniers changements. """
         if self.repo:
             try:
-                self.repo.remotes.origin.pull()
+                with self.timed('pull'):
+                    self.repo.remotes.origin.pull()
                 return True
             except GitCommandError as e:
                 return f"Échec du pull : {e}"
         return "Dépôt non initialisé."
 
-    def commit_and_push(self, file_path, commit_message):
-        """ Commit et pousse un fichier. """
+    def sync(self):
+        """
+        Variante rapide de pull() : ne récupère que la branche suivie, puis avance par
+        fast-forward. Un merge classique n'est fait que si les historiques ont divergé.
+        """
+        if not self.repo:
+            return "Dépôt non initialisé."
+        try:
+            branch = self.repo.active_branch.name
+            with self.timed('fetch'):
+                self.repo.git.fetch('origin', branch)
+            with self.timed('merge'):
+                if self.repo.is_ancestor('FETCH_HEAD', 'HEAD'):
+                    return True # Rien de nouveau sur le dépôt distant
+                try:
+                    self.repo.git.merge('--ff-only', 'FETCH_HEAD')
+                except GitCommandError:
+                    try:
+                        self.repo.git.merge('--no-edit', 'FETCH_HEAD')
+                    except GitCommandError:
+                        self.repo.git.merge('--abort')
+                        raise
+            return True
+        except GitCommandError as e:
+            return f"Échec de la synchronisation : {e}"
+
+    def commit(self, file_paths, commit_message):
+        """
+        Ajoute un ou plusieurs fichiers et crée un seul commit. Seuls ces chemins sont
+        comparés à HEAD, sans parcourir tout l'index du dépôt.
+        """
         if not self.repo:
             return "Dépôt non initialisé."
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
         try:
-            pull_result = self.pull()
-            if pull_result is not True:
-                return f"Impossible de pousser les changements car le pull a échoué : {pull_result}"
+            with self.timed('add'):
+                self.repo.git.add('--', *file_paths)
+            with self.timed('diff'):
+                changed = self.repo.git.diff('--cached', '--name-only', '--', *file_paths)
+            if not changed:
+                return self.NOTHING_TO_COMMIT
+            # Identité de GitPython (avec ses valeurs par défaut) si git n'est pas configuré sur le poste.
+            reader = self.repo.config_reader()
+            author, committer = Actor.author(reader), Actor.committer(reader)
+            env = {'GIT_AUTHOR_NAME': author.name, 'GIT_AUTHOR_EMAIL': author.email,
+                   'GIT_COMMITTER_NAME': committer.name, 'GIT_COMMITTER_EMAIL': committer.email}
+            with self.timed('commit'):
+                self.repo.git.commit('-m', commit_message, '--', *file_paths, env=env)
+            return True
+        except GitCommandError as e:
+            return f"Erreur Git : {e}"
 
-            self.repo.index.add([os.path.join(self.local_path, file_path)])
+    def is_ahead(self):
+        """ Indique si la branche courante a des commits locaux pas encore poussés (publication interrompue). """
+        if not self.repo:
+            return False
+        try:
+            return int(self.repo.git.rev_list('--count', '@{upstream}..HEAD')) > 0
+        except (GitCommandError, ValueError):
+            return False # Pas de branche distante suivie
 
-            if self.repo.is_dirty(index=True, working_tree=False):
-                self.repo.index.commit(commit_message)
-                self.repo.remotes.origin.push()
-                return True
-            else:
-                return "Aucun changement détecté à commiter."
+    def push(self):
+        """ Pousse la branche courante vers le dépôt distant. """
+        if not self.repo:
+            return "Dépôt non initialisé."
+        try:
+            # Un push refusé ne lève pas d'exception par défaut dans GitPython.
+            with self.timed('push'):
+                self.repo.remotes.origin.push(self.repo.active_branch.name).raise_if_error()
+            return True
         except GitCommandError as e:
-            return f"Erreur Git : {e}"
\ No newline at end of file
+            return f"Échec du push : {e}"
+
+    def read_blob(self, blob_id):
+        """ Contenu (octets) d'un objet git, par exemple la version d'un fichier lue avant synchronisation ; None s'il est introuvable. """
+        if not self.repo:
+            return None
+        try:
+            return self.repo.git.cat_file('blob', blob_id, stdout_as_string=False, strip_newline_in_stdout=False)
+        except GitCommandError:
+            return None
+
+    def undo_last_commit(self):
+        """ Annule le dernier commit local (non poussé) en gardant les fichiers modifiés. """
+        if self.repo:
+            self.repo.head.reset('HEAD~1', index=True, working_tree=False)
+
+    def restore_file(self, file_path):
+        """ Remet un fichier dans son état du dernier commit. """
+        if self.repo:
+            self.repo.git.checkout('HEAD', '--', file_path)
+
+    def commit_and_push(self, file_paths, commit_message, fast=True):
+        """
+        Commit et pousse un ou plusieurs fichiers en un seul commit.
+        En mode rapide, la synchronisation se limite à la branche suivie (voir sync).
+        """
+        if not self.repo:
+            return "Dépôt non initialisé."
+        self.timings = {}
+        sync_result = self.sync() if fast else self.pull()
+        if sync_result is not True:
+            return f"Impossible de pousser les changements car le pull a échoué : {sync_result}"
+        commit_result = self.commit(file_paths, commit_message)
+        if commit_result is not True:
+            return commit_result
+        result = self.push()
+        logger.info(f"Publication terminée ({self.format_timings()}).")
+        return result
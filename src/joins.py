@@ -0,0 +1,138 @@
+# src/joins.py
+from geojson_io import GeoJsonStreamReader
+from proxy import normalize
+
+
+def join_key(value):
+    """
+    Clé de jointure d'une valeur saisie librement : sans casse, accents ni espaces superflus
+    ('Cuisine  centrale Yène ' et 'cuisine centrale yene' désignent la même cuisine). None si vide.
+    """
+    if value is None or isinstance(value, (dict, list)): return None
+    key = ' '.join(normalize(value).split())
+    return key or None
+
+
+class ValueIndex:
+    """
+    Index d'une propriété : clé de jointure -> identifiants des lignes qui portent cette valeur.
+    Lié à un modèle (bind), il suit ses signaux : cellules éditées, lignes ajoutées ou supprimées,
+    réinitialisation. Sinon c'est un instantané d'un fichier non ouvert (from_file).
+    """
+    def __init__(self, prop_name):
+        self.prop_name = prop_name
+        self.model = None
+        self._rows = {}   # clé -> ensemble d'identifiants
+        self._keys = {}   # identifiant -> clé
+        self._labels = {} # clé -> valeur telle que saisie (première rencontrée)
+
+    @classmethod
+    def from_file(cls, path, prop_name):
+        """Instantané d'un fichier du dépôt : les identifiants sont les numéros de ligne."""
+        index = cls(prop_name)
+        row = 0
+        for batch in GeoJsonStreamReader(path).iter_batches():
+            for feature in batch:
+                properties = feature.get('properties')
+                index._add(row, properties.get(prop_name) if isinstance(properties, dict) else None)
+                row += 1
+        return index
+
+    def bind(self, model):
+        self.model = model
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.modelReset.connect(self._rebuild)
+        self._rebuild()
+        return self
+
+    def unbind(self):
+        if self.model is None: return
+        for signal, slot in ((self.model.dataChanged, self._on_data_changed), (self.model.rowsInserted, self._on_rows_inserted),
+                             (self.model.rowsAboutToBeRemoved, self._on_rows_about_to_be_removed), (self.model.modelReset, self._rebuild)):
+            signal.disconnect(slot)
+        self.model = None
+
+    def _add(self, row_id, value):
+        key = join_key(value)
+        if key is None: return
+        self._keys[row_id] = key
+        self._rows.setdefault(key, set()).add(row_id)
+        self._labels.setdefault(key, str(value).strip())
+
+    def _remove(self, row_id):
+        key = self._keys.pop(row_id, None)
+        if key is None: return
+        row_ids = self._rows[key]
+        row_ids.discard(row_id)
+        if not row_ids:
+            del self._rows[key]
+            del self._labels[key]
+
+    def _rebuild(self):
+        self._rows, self._keys, self._labels = {}, {}, {}
+        model = self.model
+        for row in range(model.rowCount()): self._add(model.row_id(row), model.get_value(row, self.prop_name, None))
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        headers = self.model.get_headers()
+        if self.prop_name not in headers: return
+        if not top_left.column() <= headers.index(self.prop_name) + 1 <= bottom_right.column(): return
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            row_id = self.model.row_id(row)
+            self._remove(row_id)
+            self._add(row_id, self.model.get_value(row, self.prop_name, None))
+
+    def _on_rows_inserted(self, parent, first, last):
+        for row in range(first, last + 1): self._add(self.model.row_id(row), self.model.get_value(row, self.prop_name, None))
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        for row in range(first, last + 1): self._remove(self.model.row_id(row))
+
+    def __contains__(self, key): return key in self._rows
+
+    def keys(self): return self._rows.keys()
+    def label(self, key): return self._labels.get(key, key)
+    def count(self, key): return len(self._rows.get(key, ()))
+
+    def rows(self, key):
+        """Numéros de ligne (dans l'ordre du tableau) des lignes portant cette clé."""
+        row_ids = self._rows.get(key, ())
+        return sorted(map(self.model.row_of, row_ids) if self.model is not None else row_ids)
+
+
+class Relation:
+    """
+    Référence d'une propriété d'un fichier (ex. cantines.cuisine_ratachement) vers la propriété
+    clé d'un autre fichier (ex. cuisine_centrale.nom). Les deux côtés sont des ValueIndex :
+    une recherche dans un sens ou dans l'autre est une lecture de dictionnaire.
+    """
+    def __init__(self, source_path, prop_name, target_path, key_name, source, target):
+        self.source_path, self.prop_name = source_path, prop_name
+        self.target_path, self.key_name = target_path, key_name
+        self.source, self.target = source, target
+
+    def referenced_rows(self, value):
+        """Lignes du fichier cible désignées par une valeur de la propriété."""
+        return self.target.rows(join_key(value))
+
+    def referencing_rows(self, value):
+        """Lignes du fichier source qui font référence à une valeur de la clé."""
+        return self.source.rows(join_key(value))
+
+    def is_dangling(self, value):
+        key = join_key(value)
+        return key is not None and key not in self.target
+
+    def dangling(self):
+        """{valeur saisie: lignes du fichier source} pour les références sans cible."""
+        return {self.source.label(key): self.source.rows(key) for key in self.source.keys() if key not in self.target}
+
+    def counts(self):
+        """{valeur de la clé: nombre de lignes qui y font référence}, y compris les cibles sans référence."""
+        return {self.target.label(key): self.source.count(key) for key in self.target.keys()}
+
+    def duplicate_keys(self):
+        """Valeurs de la clé portées par plusieurs lignes du fichier cible (référence ambiguë)."""
+        return [self.target.label(key) for key in self.target.keys() if self.target.count(key) > 1]
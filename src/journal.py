@@ -0,0 +1,102 @@
+# src/journal.py
+
+class _Missing:
+    """Marque une propriété absente de la feature d'origine (différent de None)."""
+    __slots__ = ()
+    def __repr__(self): return 'MISSING'
+    # Relu depuis le cache de lecture (pickle), c'est toujours le même objet : les tests 'is MISSING' restent valides.
+    def __reduce__(self): return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+class ChangeJournal:
+    """
+    Journal des modifications d'une session d'édition.
+    Seules les différences avec le fichier chargé sont conservées, indexées par
+    l'identifiant stable de la ligne (voir GeoJsonTableModel._row_ids) :
+    - edits : {row_id: {propriété: valeur d'origine}}, enregistrée à la première modification ;
+    - inserted : identifiants des lignes ajoutées pendant la session ;
+    - deleted : {row_id: feature d'origine} pour les lignes supprimées.
+    Le coût de chaque opération est proportionnel au nombre de changements, pas à la taille du fichier.
+    """
+    def __init__(self):
+        self.edits = {}
+        self.inserted = set()
+        self.deleted = {}
+
+    def record_edit(self, row_id, prop_name, old_value, new_value):
+        """Mémorise la valeur d'origine d'une cellule avant sa première modification."""
+        if row_id in self.inserted: return
+        row_edits = self.edits.setdefault(row_id, {})
+        original = row_edits.setdefault(prop_name, old_value)
+        # Retour à la valeur d'origine : la cellule n'est plus considérée comme modifiée.
+        if original is not MISSING and original == new_value and type(original) is type(new_value):
+            del row_edits[prop_name]
+            if not row_edits: del self.edits[row_id]
+
+    def record_insert(self, row_id):
+        self.inserted.add(row_id)
+
+    def record_delete(self, row_id, feature):
+        """Mémorise la feature supprimée dans son état d'origine (sans les éditions de la session)."""
+        if row_id in self.inserted:
+            self.inserted.discard(row_id)
+            return
+        row_edits = self.edits.pop(row_id, None)
+        if row_edits:
+            properties = dict(feature.get('properties') or {})
+            for prop_name, original in row_edits.items():
+                if original is MISSING: properties.pop(prop_name, None)
+                else: properties[prop_name] = original
+            feature = {**feature, 'properties': properties}
+        self.deleted[row_id] = feature
+
+    def row_state(self, row_id):
+        """État du journal pour une ligne : (éditions, ajoutée, feature supprimée). Voir undo.py."""
+        row_edits = self.edits.get(row_id)
+        return (dict(row_edits) if row_edits else None, row_id in self.inserted, self.deleted.get(row_id))
+
+    def set_row_states(self, states):
+        """Rétablit l'état de lignes relevé par row_state ({row_id: état})."""
+        for row_id, (row_edits, inserted, deleted) in states.items():
+            if row_edits: self.edits[row_id] = dict(row_edits)
+            else: self.edits.pop(row_id, None)
+            if inserted: self.inserted.add(row_id)
+            else: self.inserted.discard(row_id)
+            if deleted is not None: self.deleted[row_id] = deleted
+            else: self.deleted.pop(row_id, None)
+
+    def summary(self):
+        """
+        Résumé exact des différences avec le fichier chargé : nombre de lignes ajoutées, modifiées
+        et supprimées, et nombre de lignes modifiées par propriété (les plus touchées d'abord).
+        """
+        properties = {}
+        for row_edits in self.edits.values():
+            for prop_name in row_edits: properties[prop_name] = properties.get(prop_name, 0) + 1
+        return {"added": len(self.inserted), "modified": len(self.edits), "deleted": len(self.deleted),
+                "properties": dict(sorted(properties.items(), key=lambda item: (-item[1], item[0])))}
+
+    def count(self):
+        """Nombre de lignes ajoutées, supprimées ou modifiées."""
+        return len(self.edits) + len(self.inserted) + len(self.deleted)
+
+    def has_changes(self):
+        return bool(self.edits or self.inserted or self.deleted)
+
+    def clear(self):
+        self.edits, self.inserted, self.deleted = {}, set(), {}
+
+
+def describe_changes(summary, max_properties=5):
+    """Texte d'un résumé (ChangeJournal.summary) : '2 ajoutée(s), 5 modifiée(s) (nom, adresse), 1 supprimée(s)'."""
+    parts = []
+    if summary["added"]: parts.append(f"{summary['added']} ajoutée(s)")
+    if summary["modified"]:
+        names = list(summary["properties"])
+        detail = ", ".join(names[:max_properties]) + (", ..." if len(names) > max_properties else "")
+        parts.append(f"{summary['modified']} modifiée(s) ({detail})")
+    if summary["deleted"]: parts.append(f"{summary['deleted']} supprimée(s)")
+    return ", ".join(parts) or "aucune modification"
@@ -1,14 +1,21 @@
 # src/logging_setup.py
 import logging
+import os
 import sys
 
+# Exécutable PyInstaller : seuls les avertissements et erreurs sont traités (les messages de niveau
+# inférieur ne sont alors ni formatés ni écrits). EDITEUR_LOG_LEVEL (DEBUG, INFO...) change ce niveau.
+FROZEN = getattr(sys, 'frozen', False)
+LOG_LEVEL = os.environ.get('EDITEUR_LOG_LEVEL', 'WARNING' if FROZEN else 'DEBUG').upper()
+
 # Créer un logger
 logger = logging.getLogger('GeoJSONEditor')
-logger.setLevel(logging.DEBUG)  # On capture tous les niveaux de messages
+logger.setLevel(LOG_LEVEL)
 
-# Créer un gestionnaire qui écrit les logs dans la console
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
+# Créer un gestionnaire qui écrit les logs dans la console.
+# L'exécutable fenêtré (--windowed) n'a pas de console : sys.stdout vaut None, rien n'est écrit.
+handler = logging.StreamHandler(sys.stdout) if sys.stdout is not None else logging.NullHandler()
+handler.setLevel(LOG_LEVEL)
 
 # Créer un formateur pour rendre les logs lisibles
 formatter = logging.Formatter(
@@ -19,4 +26,4 @@ handler.setFormatter(formatter)
 # Ajouter le gestionnaire au logger
 # (Vérifier pour ne pas en ajouter plusieurs si ce module est importé plusieurs fois)
 if not logger.handlers:
-    logger.addHandler(handler)
\ No newline at end of file
+    logger.addHandler(handler)
@@ -2,17 +2,23 @@ import sys
 import os
 from functools import partial
 
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QActionGroup, QCursor, QIcon, QIntValidator
-from PySide6.QtWidgets import (QApplication, QMainWindow, QHeaderView, QMessageBox,
-                               QPushButton, QLineEdit, QLabel, QProgressDialog,
-                               QHBoxLayout, QSpacerItem, QSizePolicy, QWidget)
-
-from logging_setup import logger
-from ui_main_window import Ui_MainWindow
-from widgets import ButtonDelegate
-from config_dialog import ConfigDialog
-from controller import AppController
+from startup import phase, report as report_startup
+
+# GitPython, la fiche et la fenêtre de configuration ne sont importés qu'au premier besoin.
+with phase("imports Qt"):
+    from PySide6.QtCore import Qt, QSize, QTimer
+    from PySide6.QtGui import QAction, QActionGroup, QCursor, QIcon, QKeySequence, QShortcut, QUndoGroup
+    from PySide6.QtWidgets import (QApplication, QMainWindow, QHeaderView, QMessageBox, QAbstractItemView,
+                                   QPushButton, QLineEdit, QLabel, QProgressDialog, QComboBox,
+                                   QHBoxLayout, QSpacerItem, QSizePolicy, QFileDialog)
+
+with phase("imports application"):
+    from ui_main_window import Ui_MainWindow
+    import profiling
+    from widgets import ButtonDelegate, PerformanceOverlay
+    from controller import AppController, PUBLISH_PUSH
+    from proxy import FeatureProxyModel
+    from journal import describe_changes
 
 def get_icon_path(icon_name):
     """ Trouve le chemin d'une icône, compatible dev et PyInstaller. """
@@ -36,19 +42,64 @@ class MainWindow(QMainWindow):
 
         self.base_title = self.windowTitle()
         self.current_feature_index = -1
-        self.button_delegate = ButtonDelegate(self)
-        
-        self.ui.table_view.setModel(self.controller.model)
-        self.ui.table_view.setItemDelegateForColumn(0, self.button_delegate)
-        
-        self.reorganize_editor_layout()
+        self.current_feature_key = None # (modèle, identifiant stable) de la fiche affichée
+        # Chaque fichier ouvert a sa pile d'annulation ; le groupe suit celle du fichier affiché.
+        self.undo_group = QUndoGroup(self)
+        # Le tableau affiche le modèle courant à travers un proxy de tri et de filtre.
+        self.proxy_model = FeatureProxyModel(self)
+        self.proxy_model.column_preparing.connect(self.on_column_preparing)
+        # La page d'édition et la fiche sont construites à leur premier affichage (voir ensure_editor, ensure_form_view).
+        self.editor_ready = False
+        self.form_view = None
+        self.reference_report_requested = False # Rapport affiché dès que les relations sont prêtes (voir show_reference_report)
+
+        self.bind_model()
         self.setup_view_switcher()
+        self.setup_undo_actions()
+        self.setup_profiling_actions()
         self.connect_signals()
         self.connect_controller_signals()
         
         self.show_welcome_view()
+        # La vérification de connexion part en arrière-plan : la fenêtre s'affiche sans attendre le réseau.
         self.controller.load_configuration()
         
+    def ensure_editor(self):
+        """Construit la page d'édition à la première ouverture d'un fichier."""
+        if self.editor_ready: return
+        self.editor_ready = True
+        self.ui.setupEditorUi(self)
+        self.button_delegate = ButtonDelegate(self)
+        self.ui.table_view.setModel(self.proxy_model)
+        self.ui.table_view.setSortingEnabled(True)
+        self.ui.table_view.selectionModel().selectionChanged.connect(self.on_table_selection_changed)
+        self.ui.table_view.setItemDelegateForColumn(0, self.button_delegate)
+        # Sélection de lignes entières (Maj/Ctrl pour en sélectionner plusieurs).
+        self.ui.table_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.ui.table_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.performance_overlay.watch_paints(self.ui.table_view.viewport())
+        self.reorganize_editor_layout()
+        self.connect_editor_signals()
+        # Les notifications reçues avant la construction de la page n'ont pas pu être affichées.
+        self.update_modifications_label(self.controller.change_count(), self.controller.has_changes())
+
+    def ensure_form_view(self):
+        """Construit la fiche à son premier affichage ; ses champs sont ensuite réutilisés d'une fiche à l'autre."""
+        if self.form_view is None:
+            from form_view import FeatureForm
+            # La fiche remplace le conteneur créé par setupEditorUi.
+            form_page_layout = self.ui.form_view_page.layout()
+            form_page_layout.removeWidget(self.ui.form_scroll_area)
+            self.ui.form_scroll_area.deleteLater()
+            self.form_view = FeatureForm()
+            form_page_layout.insertWidget(0, self.form_view)
+            self.form_view.edits_committed.connect(self.on_form_edits_committed)
+        return self.form_view
+
+    def commit_pending_edits(self):
+        """Transmet les saisies en attente de la fiche, si elle a été construite."""
+        if self.form_view is not None: self.form_view.commit_pending()
+
     def reorganize_editor_layout(self):
         """Modifie la disposition de la page d'édition après sa création par setupUi."""
         self.ui.editor_page.layout().removeWidget(self.ui.editor_title_label)
@@ -58,49 +109,88 @@ class MainWindow(QMainWindow):
         top_layout = QHBoxLayout()
         top_layout.addWidget(self.ui.editor_title_label)
         top_layout.addSpacerItem(QSpacerItem(40, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum))
+        self.search_column_combo = QComboBox(); self.search_column_combo.setToolTip("Colonne dans laquelle rechercher."); top_layout.addWidget(self.search_column_combo)
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("Rechercher..."); self.search_edit.setClearButtonEnabled(True); self.search_edit.setMinimumWidth(200); top_layout.addWidget(self.search_edit)
         self.add_row_button = QPushButton(" Ajouter une ligne"); self.add_row_button.setIcon(QIcon(get_icon_path('add.png'))); self.add_row_button.setIconSize(QSize(20, 20)); self.add_row_button.setStyleSheet("padding: 5px;"); top_layout.addWidget(self.add_row_button)
+        self.duplicate_rows_button = QPushButton(" Dupliquer"); self.duplicate_rows_button.setIcon(QIcon(get_icon_path('add.png'))); self.duplicate_rows_button.setIconSize(QSize(20, 20)); self.duplicate_rows_button.setStyleSheet("padding: 5px;"); self.duplicate_rows_button.setToolTip("Copie les lignes sélectionnées en fin de tableau."); top_layout.addWidget(self.duplicate_rows_button)
+        self.check_references_button = QPushButton(" Vérifier les références"); self.check_references_button.setStyleSheet("padding: 5px;"); self.check_references_button.setToolTip("Contrôle les liens entre fichiers (cuisine de rattachement...)."); top_layout.addWidget(self.check_references_button)
+        self.delete_rows_button = QPushButton(" Supprimer la sélection"); self.delete_rows_button.setIcon(QIcon(get_icon_path('delete.png'))); self.delete_rows_button.setIconSize(QSize(20, 20)); self.delete_rows_button.setStyleSheet("padding: 5px;"); self.delete_rows_button.setToolTip("Supprime les lignes sélectionnées (touche Suppr)."); top_layout.addWidget(self.delete_rows_button)
         self.ui.editor_page.layout().insertLayout(0, top_layout)
-        
+
         bottom_layout = QHBoxLayout()
         self.modifications_label = QLabel("Aucune modification."); self.modifications_label.setStyleSheet("font-style: italic; color: grey;"); bottom_layout.addWidget(self.modifications_label)
         bottom_layout.addSpacerItem(QSpacerItem(40, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum))
         self.revert_button = QPushButton(" Annuler"); self.revert_button.setIcon(QIcon(get_icon_path('undo.png'))); self.revert_button.setIconSize(QSize(20, 20)); self.revert_button.setStyleSheet("padding: 5px;"); bottom_layout.addWidget(self.revert_button)
-        self.publish_button = QPushButton(" Publier sur GitHub"); self.publish_button.setIcon(QIcon(get_icon_path('git.png'))); self.publish_button.setIconSize(QSize(24, 24)); self.publish_button.setMinimumHeight(40); self.publish_button.setStyleSheet("font-size: 14px; font-weight: bold; padding: 5px;"); bottom_layout.addWidget(self.publish_button)
+        self.publish_button = QPushButton(" Publier sur GitHub"); self.publish_button.setIcon(QIcon(get_icon_path('git.png'))); self.publish_button.setIconSize(QSize(24, 24)); self.publish_button.setMinimumHeight(40); self.publish_button.setStyleSheet("font-size: 14px; font-weight: bold; padding: 5px;"); self.publish_button.setToolTip("Publie en un seul commit les modifications de tous les fichiers ouverts."); bottom_layout.addWidget(self.publish_button)
         self.ui.editor_page.layout().addLayout(bottom_layout)
 
     def connect_signals(self):
         """Connecte les signaux de l'UI aux slots qui notifieront le contrôleur."""
         self.ui.welcome_config_button.clicked.connect(self.open_config_dialog)
+        self.view_action_group.triggered.connect(self.on_view_mode_changed)
+        self.ui.actionAccueil.triggered.connect(self.on_home_action)
+        self.ui.actionEnregistrer.triggered.connect(self.publish_changes)
+        self.ui.actionQuitter.triggered.connect(self.close)
+        self.ui.actionConfigurer.triggered.connect(self.open_config_dialog)
+        self.ui.actionAPropos.triggered.connect(self.show_about_dialog)
+        self.profiling_action.toggled.connect(self.performance_overlay.set_active)
+        self.export_trace_action.triggered.connect(self.export_profiling_trace)
+        self.undo_action.triggered.connect(self.undo)
+        self.redo_action.triggered.connect(self.redo)
+        self.undo_group.canUndoChanged.connect(self.undo_action.setEnabled)
+        self.undo_group.canRedoChanged.connect(self.redo_action.setEnabled)
+        self.undo_group.undoTextChanged.connect(lambda text: self.undo_action.setText(f"Défaire {text}".strip()))
+        self.undo_group.redoTextChanged.connect(lambda text: self.redo_action.setText(f"Rétablir {text}".strip()))
+        self.undo_group.indexChanged.connect(self.on_undo_index_changed)
+
+    def connect_editor_signals(self):
+        """Connecte les signaux de la page d'édition, à sa construction."""
         self.add_row_button.clicked.connect(self.on_add_row_requested)
+        self.search_edit.textChanged.connect(self.apply_search_filter)
+        self.search_column_combo.currentIndexChanged.connect(self.apply_search_filter)
+        self.duplicate_rows_button.clicked.connect(self.on_duplicate_rows_requested)
+        self.delete_rows_button.clicked.connect(self.handle_delete_selection_request)
+        self.check_references_button.clicked.connect(self.show_reference_report)
+        delete_shortcut = QShortcut(QKeySequence.StandardKey.Delete, self.ui.table_view)
+        delete_shortcut.setContext(Qt.ShortcutContext.WidgetShortcut) # Pas dans les champs du formulaire
+        delete_shortcut.activated.connect(self.handle_delete_selection_request)
         self.publish_button.clicked.connect(self.publish_changes)
         self.revert_button.clicked.connect(self.revert_changes)
         
         self.ui.table_view.clicked.connect(self.on_table_clicked)
-        self.ui.table_view.selectionModel().selectionChanged.connect(self.on_table_selection_changed)
         self.ui.form_prev_button.clicked.connect(self.show_previous_feature)
         self.ui.form_next_button.clicked.connect(self.show_next_feature)
-        self.view_action_group.triggered.connect(self.on_view_mode_changed)
-        self.ui.actionAccueil.triggered.connect(self.on_home_action)
-        self.ui.actionEnregistrer.triggered.connect(self.publish_changes)
-        self.ui.actionQuitter.triggered.connect(self.close)
-        self.ui.actionConfigurer.triggered.connect(self.open_config_dialog)
-        self.ui.actionAPropos.triggered.connect(self.show_about_dialog)
 
     def connect_controller_signals(self):
         """Connecte les signaux du contrôleur aux slots de la Vue pour mettre à jour l'UI."""
         self.controller.config_state_changed.connect(self.on_config_state_changed)
+        self.controller.connection_check_started.connect(self.on_connection_check_started)
         self.controller.connection_status_changed.connect(self.on_connection_status_changed)
         self.controller.clone_started.connect(self.on_clone_started)
         self.controller.clone_progress.connect(self.on_clone_progress)
         self.controller.clone_finished.connect(self.on_clone_finished)
+        self.controller.publish_started.connect(self.on_publish_started)
+        self.controller.publish_progress.connect(self.on_publish_progress)
         self.controller.publish_finished.connect(self.on_publish_finished)
+        self.controller.current_model_changed.connect(self.bind_model)
+        self.controller.data_loading_started.connect(self.on_data_loading_started)
         self.controller.data_loaded_and_ready.connect(self.on_data_loaded)
         self.controller.modifications_updated.connect(self.update_modifications_label)
         self.controller.status_message_changed.connect(self.ui.status_label.setText)
         self.controller.view_change_requested.connect(self.on_view_change_requested)
+        self.controller.relations_ready.connect(self.on_relations_ready)
 
     # --- SLOTS RÉPONDANT AUX SIGNAUX DU CONTRÔLEUR ---
 
+    def bind_model(self):
+        """Affiche le modèle du fichier courant (chaque fichier ouvert a son propre modèle)."""
+        self.commit_pending_edits() # Saisies en attente sur le fichier précédent
+        if self.editor_ready: self.search_edit.clear()
+        self.proxy_model.setSourceModel(self.controller.model)
+        undo_stack = self.controller.model.undo_stack
+        if undo_stack not in self.undo_group.stacks(): self.undo_group.addStack(undo_stack)
+        if not self.controller.is_publishing(): self.undo_group.setActiveStack(undo_stack)
+
     def on_config_state_changed(self, repo_exists, reason):
         if self.controller.config and repo_exists:
             self.setup_welcome_for_selection()
@@ -108,6 +198,9 @@ class MainWindow(QMainWindow):
             self.setup_welcome_for_config(reason)
         self.ui.status_label.setText(reason)
 
+    def on_connection_check_started(self):
+        self.ui.connection_status_label.setText("⏳  Vérification de la connexion…"); self.ui.connection_status_label.setStyleSheet("color: grey; font-size: 14px; font-weight: bold;")
+
     def on_connection_status_changed(self, success, message):
         if success:
             self.ui.connection_status_label.setText("✅  Connecté au dépôt"); self.ui.connection_status_label.setStyleSheet("color: green; font-size: 14px; font-weight: bold;")
@@ -131,33 +224,89 @@ class MainWindow(QMainWindow):
         if success and message: QMessageBox.information(self, "Succès", message)
         elif not success: QMessageBox.critical(self, "Échec", message)
 
+    def on_publish_started(self):
+        self.ensure_editor()
+        # Fenêtre non modale : le tableau reste consultable pendant la publication.
+        self.publish_dialog = QProgressDialog("Préparation de la publication...", "Annuler", 0, PUBLISH_PUSH + 1, self)
+        self.publish_dialog.setWindowModality(Qt.WindowModality.NonModal)
+        self.publish_dialog.setMinimumDuration(0)
+        self.publish_dialog.canceled.connect(self.controller.cancel_publish)
+        self.publish_dialog.show()
+        self.add_row_button.setEnabled(False)
+        self.duplicate_rows_button.setEnabled(False)
+        self.delete_rows_button.setEnabled(False)
+        self.revert_button.setEnabled(False)
+        self.undo_group.setActiveStack(None) # Le fichier publié ne doit pas changer sous l'écriture
+
+    def on_publish_progress(self, stage, message):
+        if hasattr(self, 'publish_dialog'):
+            self.publish_dialog.setValue(stage); self.publish_dialog.setLabelText(message)
+            if stage == PUBLISH_PUSH: self.publish_dialog.setCancelButton(None)
+
     def on_publish_finished(self, success, message):
+        self.ensure_editor()
+        if hasattr(self, 'publish_dialog'):
+            self.publish_dialog.canceled.disconnect(self.controller.cancel_publish)
+            self.publish_dialog.close()
+            del self.publish_dialog
+        self.add_row_button.setEnabled(True)
+        self.duplicate_rows_button.setEnabled(True)
+        self.delete_rows_button.setEnabled(True)
+        self.revert_button.setEnabled(self.controller.current_has_changes())
+        self.undo_group.setActiveStack(self.controller.model.undo_stack)
         self.ui.status_label.setText(message)
+        self.publish_button.setEnabled(True)
         if success and message:
             QMessageBox.information(self, "Succès", message)
+        elif not success and self.controller.validation_problems:
+            self.confirm_validation()
+        elif not success and self.controller.merge_conflicts:
+            self.resolve_merge_conflicts(message)
         elif not success:
             QMessageBox.critical(self, "Erreur Git", message)
-        self.publish_button.setEnabled(True)
+
+    def resolve_merge_conflicts(self, message):
+        """Conflits avec des modifications distantes : l'utilisateur choisit les valeurs à garder, ou renonce."""
+        box = QMessageBox(QMessageBox.Icon.Warning, "Conflits de modification", message, parent=self)
+        box.setInformativeText("Les autres modifications, locales et distantes, sont fusionnées automatiquement. "
+                               "Pour les données en conflit, quelles valeurs faut-il garder ?")
+        ours = box.addButton("Garder mes valeurs", QMessageBox.ButtonRole.AcceptRole)
+        theirs = box.addButton("Garder les valeurs distantes", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton("Ne pas publier", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        # Les valeurs ont déjà été contrôlées (ou acceptées) avant cette publication.
+        if box.clickedButton() is ours: self.start_publish('ours', validate=False)
+        elif box.clickedButton() is theirs: self.start_publish('theirs', validate=False)
+
+    def on_data_loading_started(self, file_name):
+        self.ensure_editor()
+        self.ui.editor_title_label.setText(f"<h2>{file_name}</h2>")
+        self.update_form_view(-1)
 
     def on_data_loaded(self, file_name):
+        self.ensure_editor()
         self.ui.editor_title_label.setText(f"<h2>{file_name}</h2>")
         self.ui.table_view.setColumnWidth(0, 80)
         self.ui.table_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         model = self.controller.model
         for i in range(1, model.columnCount()):
             self.ui.table_view.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
+        self.populate_search_columns()
         
-        if model.rowCount() > 0: self.ui.table_view.selectRow(0)
+        if self.proxy_model.rowCount() > 0: self.ui.table_view.selectRow(0)
         else: self.update_form_view(-1)
 
     def update_modifications_label(self, total, has_changes):
-        self.publish_button.setEnabled(has_changes)
-        self.revert_button.setEnabled(has_changes)
         self.setWindowTitle(self.base_title + (" *" if has_changes else ""))
+        if not self.editor_ready: return # Affiché à la construction de la page (voir ensure_editor)
+        self.publish_button.setEnabled(has_changes)
+        self.revert_button.setEnabled(self.controller.current_has_changes())
         
         if not has_changes: self.modifications_label.setText("Aucune modification non publiée."); self.modifications_label.setStyleSheet("font-style: italic; color: grey;")
+        elif total == 0: self.modifications_label.setText("Modifications enregistrées localement, à envoyer sur GitHub."); self.modifications_label.setStyleSheet("font-weight: bold; color: #d35400;")
         elif total == 1: self.modifications_label.setText("1 modification non publiée."); self.modifications_label.setStyleSheet("font-weight: bold; color: #d35400;")
         else: self.modifications_label.setText(f"{total} modifications non publiées."); self.modifications_label.setStyleSheet("font-weight: bold; color: #d35400;")
+        self.modifications_label.setToolTip(f"Lignes {describe_changes(self.controller.change_summary())}." if has_changes else "")
 
     def on_view_change_requested(self, view_name):
         if view_name == 'editor': self.show_editor_view()
@@ -166,6 +315,7 @@ class MainWindow(QMainWindow):
     # --- SLOTS RÉPONDANT AUX ACTIONS DE L'UTILISATEUR ---
 
     def open_config_dialog(self):
+        from config_dialog import ConfigDialog
         dialog = ConfigDialog(self, self.controller.config)
         if dialog.exec():
             config = dialog.get_config()
@@ -173,29 +323,126 @@ class MainWindow(QMainWindow):
             self.controller.save_configuration_and_clone(config)
     
     def on_home_action(self):
+        self.commit_pending_edits()
         self.show_welcome_view()
         self.controller.load_configuration()
         
     def publish_changes(self):
+        self.commit_pending_edits()
+        self.start_publish()
+
+    def confirm_validation(self):
+        """Valeurs refusées par le contrôle d'avant publication (voir schema.py) : publier quand même ?"""
+        reply = QMessageBox.question(self, "Valeurs à vérifier",
+                                     "Certaines valeurs ne correspondent pas au type de leur colonne :\n\n"
+                                     f"{self.controller.describe_validation(self.controller.validation_problems)}\n\nPublier quand même ?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes: self.start_publish(validate=False)
+
+    def start_publish(self, prefer=None, validate=True):
         self.publish_button.setEnabled(False)
-        self.controller.publish_changes()
+        self.controller.publish_changes(prefer, validate)
 
     def revert_changes(self):
-        reply = QMessageBox.question(self, "Annuler", "Voulez-vous vraiment annuler toutes les modifications ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        self.commit_pending_edits()
+        reply = QMessageBox.question(self, "Annuler", "Voulez-vous vraiment annuler toutes les modifications de ce fichier ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes: self.controller.revert_changes()
         
     def handle_delete_request(self, row):
+        self.commit_pending_edits()
         reply = QMessageBox.question(self, 'Suppression', f"Supprimer la ligne {row + 1} ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             self.controller.delete_row(row)
-            self.update_form_view(self.ui.table_view.currentIndex().row())
+            self.update_form_view(self.current_source_row())
             
+    def handle_delete_selection_request(self):
+        self.commit_pending_edits()
+        rows = self.selected_rows()
+        if not rows: return
+        if len(rows) == 1: return self.handle_delete_request(rows[0])
+        reply = QMessageBox.question(self, 'Suppression', f"Supprimer les {len(rows)} lignes sélectionnées ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.controller.delete_rows(rows)
+            self.update_form_view(self.current_source_row())
+
+    def on_duplicate_rows_requested(self):
+        rows = self.selected_rows()
+        if rows:
+            self.controller.duplicate_rows(rows)
+            self.ui.table_view.scrollToBottom()
+
+    def show_reference_report(self):
+        """Affiche le contrôle des références entre fichiers (valeurs sans correspondance, nombre de liens)."""
+        self.commit_pending_edits()
+        if not self.controller.has_relations():
+            # Les fichiers non ouverts sont lus en arrière-plan : le rapport suivra (on_relations_ready).
+            self.reference_report_requested = True
+            self.controller.build_relations()
+            return
+        reports = self.controller.check_references()
+        if not reports:
+            QMessageBox.information(self, "Références", "Aucune référence entre fichiers n'est déclarée dans la configuration.")
+            return
+        lines, problems = [], False
+        for report in reports:
+            lines.append(f"<b>{report['file']}</b> : {report['property']} → {report['target']} ({report['key']})")
+            for value, rows in sorted(report['dangling'].items()):
+                problems = True
+                lines.append(f"&nbsp;&nbsp;⚠ « {value} » introuvable (ligne(s) {', '.join(str(row + 1) for row in rows[:20])}{'...' if len(rows) > 20 else ''})")
+            for value in report['duplicates']:
+                problems = True
+                lines.append(f"&nbsp;&nbsp;⚠ « {value} » présent plusieurs fois dans {report['target']}")
+            for value, count in sorted(report['counts'].items()):
+                lines.append(f"&nbsp;&nbsp;{value} : {count}")
+        box = QMessageBox.warning if problems else QMessageBox.information
+        box(self, "Références", "<br>".join(lines))
+
+    def on_relations_ready(self):
+        if self.reference_report_requested:
+            self.reference_report_requested = False
+            self.show_reference_report()
+
     def on_add_row_requested(self):
         self.controller.add_row()
         self.ui.table_view.scrollToBottom()
         self.on_edit_request(self.controller.model.rowCount() - 1)
 
     # --- MÉTHODES DE GESTION PURE DE L'UI ---
+
+    def selected_rows(self):
+        """Lignes du modèle sélectionnées, lues plage par plage (sans créer un index par cellule)."""
+        rows = set()
+        for selection_range in self.ui.table_view.selectionModel().selection():
+            rows.update(map(self.proxy_model.source_row, range(selection_range.top(), selection_range.bottom() + 1)))
+        return sorted(rows)
+
+    def current_source_row(self):
+        index = self.ui.table_view.currentIndex()
+        return self.proxy_model.source_row(index.row()) if index.isValid() else -1
+
+    def select_source_row(self, row):
+        """Sélectionne dans le tableau une ligne du modèle (sans effet si elle est masquée par la recherche)."""
+        position = self.proxy_model.proxy_row(row)
+        if position >= 0: self.ui.table_view.selectRow(position)
+
+    def populate_search_columns(self):
+        """Liste les colonnes du fichier dans le choix de la colonne de recherche."""
+        current = self.search_column_combo.currentText()
+        headers = self.controller.model.get_headers()
+        self.search_column_combo.blockSignals(True)
+        self.search_column_combo.clear()
+        for header in headers: self.search_column_combo.addItem(header.replace('_', ' ').capitalize(), header)
+        self.search_column_combo.setCurrentIndex(max(self.search_column_combo.findText(current), 0))
+        self.search_column_combo.blockSignals(False)
+        self.apply_search_filter()
+
+    def apply_search_filter(self, *args):
+        self.proxy_model.set_filter(self.search_column_combo.currentData(), self.search_edit.text())
+
+    def on_column_preparing(self, prop_name, preparing):
+        # Stockage 'lazy' : le tri et la recherche attendent la lecture de la colonne dans tout le fichier.
+        if preparing: self.ui.status_label.setText(f"Lecture de la colonne « {prop_name} » pour le tri et la recherche...")
+        else: self.ui.status_label.setText(f"Colonne « {prop_name} » prête pour le tri et la recherche.")
     
     def setup_welcome_for_config(self, reason):
         self.ui.connection_status_label.setText("⚪️  Non configuré"); self.ui.connection_status_label.setStyleSheet("color: grey; font-size: 14px; font-weight: bold;")
@@ -210,83 +457,131 @@ class MainWindow(QMainWindow):
             child = layout.takeAt(0)
             if child.widget(): child.widget().deleteLater()
         for file_info in self.controller.config.get("FILES", []):
-            button = QPushButton(f"Modifier : {file_info['name']}"); button.setMinimumHeight(40); button.setStyleSheet("font-size: 16px;"); button.clicked.connect(partial(self.controller.select_data_source, file_info)); layout.addWidget(button)
+            modified_marker = " *" if self.controller.session_has_changes(file_info['path']) else ""
+            button = QPushButton(f"Modifier : {file_info['name']}{modified_marker}"); button.setMinimumHeight(40); button.setStyleSheet("font-size: 16px;"); button.clicked.connect(partial(self.controller.select_data_source, file_info)); layout.addWidget(button)
 
     def show_welcome_view(self):
         self.ui.main_stacked_widget.setCurrentIndex(0); self.ui.actionEnregistrer.setEnabled(False); self.ui.viewToolBar.setVisible(False)
 
     def show_editor_view(self):
+        self.ensure_editor()
         self.ui.main_stacked_widget.setCurrentIndex(1); self.ui.actionEnregistrer.setEnabled(True); self.ui.viewToolBar.setVisible(True)
         
     def setup_view_switcher(self):
         self.view_action_group = QActionGroup(self); self.view_action_group.addAction(self.ui.actionViewTable); self.view_action_group.addAction(self.ui.actionViewForm); self.view_action_group.setExclusive(True); self.ui.actionViewTable.setChecked(True)
 
+    def setup_undo_actions(self):
+        self.undo_action = QAction("Défaire", self); self.undo_action.setShortcut(QKeySequence.StandardKey.Undo); self.undo_action.setEnabled(False)
+        self.redo_action = QAction("Rétablir", self); self.redo_action.setShortcut(QKeySequence.StandardKey.Redo); self.redo_action.setEnabled(False)
+        first_action = self.ui.menuEdition.actions()[0]
+        self.ui.menuEdition.insertAction(first_action, self.undo_action); self.ui.menuEdition.insertAction(first_action, self.redo_action); self.ui.menuEdition.insertSeparator(first_action)
+
+    def setup_profiling_actions(self):
+        self.performance_overlay = PerformanceOverlay(self)
+        self.profiling_action = QAction("Mesures de performance", self); self.profiling_action.setCheckable(True); self.profiling_action.setShortcut("Ctrl+Shift+P")
+        self.export_trace_action = QAction("Exporter la trace des mesures...", self)
+        first_action = self.ui.menuAide.actions()[0]
+        self.ui.menuAide.insertAction(first_action, self.profiling_action); self.ui.menuAide.insertAction(first_action, self.export_trace_action); self.ui.menuAide.insertSeparator(first_action)
+        if profiling.ENABLED: # Mesures demandées au lancement (EDITEUR_PROFILE)
+            self.profiling_action.setChecked(True); self.performance_overlay.set_active(True)
+
+    def export_profiling_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter la trace des mesures", "trace.json", "Trace JSON (*.json)")
+        if not path: return
+        try:
+            count = profiling.export_trace(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Mesures de performance", f"Impossible d'écrire la trace : {e}")
+            return
+        self.ui.status_label.setText(f"Trace exportée ({count} mesures) : {path}")
+
+    def undo(self):
+        self.commit_pending_edits() # Une saisie en attente est la dernière opération à défaire
+        self.undo_group.undo()
+
+    def redo(self):
+        self.commit_pending_edits()
+        self.undo_group.redo()
+
+    def on_undo_index_changed(self, index):
+        """Réaffiche la fiche courante : ses valeurs ou sa position ont pu changer."""
+        if self.current_feature_key is None: return
+        model, row_id = self.current_feature_key
+        if model is self.controller.model: self.update_form_view(model.row_of(row_id))
+
     def on_table_clicked(self, index):
         if index.column() == 0:
             rect = self.ui.table_view.visualRect(index); pos = self.ui.table_view.viewport().mapFromGlobal(QCursor.pos()); relative_pos = pos - rect.topLeft()
-            if relative_pos.x() < rect.width() / 2: self.on_edit_request(index.row())
-            else: self.handle_delete_request(index.row())
+            row = self.proxy_model.source_row(index.row())
+            if relative_pos.x() < rect.width() / 2: self.on_edit_request(row)
+            else: self.handle_delete_request(row)
             
     def on_edit_request(self, row):
-        self.ui.table_view.selectRow(row); self.ui.actionViewForm.setChecked(True); self.ui.editor_stacked_widget.setCurrentIndex(1)
+        self.select_source_row(row)
+        self.ui.actionViewForm.setChecked(True); self.ui.editor_stacked_widget.setCurrentIndex(1)
+        self.update_form_view(row) # Fiche éventuellement construite à ce moment
         
     def on_view_mode_changed(self, action):
         if action == self.ui.actionViewTable: self.ui.editor_stacked_widget.setCurrentIndex(0)
         else: self.ui.editor_stacked_widget.setCurrentIndex(1); self.update_form_view(self.current_feature_index)
         
     def on_table_selection_changed(self, selected, deselected):
-        if selected.indexes(): self.update_form_view(selected.indexes()[0].row())
+        if not selected.isEmpty(): self.update_form_view(self.proxy_model.source_row(selected[0].top()))
         
     def update_form_view(self, row_index):
         self.current_feature_index = row_index
-        while self.ui.form_layout.count():
-            item = self.ui.form_layout.takeAt(0)
-            if item.widget(): item.widget().deleteLater()
-        
+        if not self.editor_ready: return
         model = self.controller.model
-        if not (0 <= row_index < model.rowCount()):
+        has_row = 0 <= row_index < model.rowCount()
+        self.current_feature_key = (model, model.row_id(row_index)) if has_row else None
+        # Tant que la fiche n'a jamais été affichée, seule la ligne courante est retenue.
+        if self.form_view is not None or self.ui.editor_stacked_widget.currentIndex() == 1:
+            form_view = self.ensure_form_view()
+            form_view.set_schema(model.get_headers(), model.get_field_types())
+            form_view.bind(partial(model.get_value, row_index) if has_row else None, key=self.current_feature_key)
+        if not has_row:
             self.ui.form_nav_label.setText("Aucune fiche sélectionnée")
             self.ui.form_prev_button.setEnabled(False)
             self.ui.form_next_button.setEnabled(False)
             return
 
-        properties = model.get_all_features()[row_index].get('properties', {})
-        for col_idx, key in enumerate(model.get_headers()):
-            value = properties.get(key, "") 
-            label_text = key.replace('_', ' ').capitalize()
-            label, editor = QLabel(label_text), QLineEdit(str(value))
-
-            # Applique un validateur pour les champs de type entier
-            column_type = self.controller.get_column_type(key)
-            if column_type == 'int':
-                editor.setValidator(QIntValidator())
-
-            editor.textChanged.connect(partial(self.on_form_field_changed, row_index, col_idx))
-            self.ui.form_layout.addRow(label, editor)
-            
-        total = model.rowCount()
-        self.ui.form_nav_label.setText(f"Fiche {row_index + 1} / {total}")
-        self.ui.form_prev_button.setEnabled(row_index > 0)
-        self.ui.form_next_button.setEnabled(row_index < total - 1)
+        # Navigation dans l'ordre du tableau (tri et recherche compris).
+        position, total = self.proxy_model.proxy_row(row_index), self.proxy_model.rowCount()
+        self.ui.form_nav_label.setText(f"Fiche {position + 1} / {total}" if position >= 0 else "Fiche masquée par la recherche")
+        self.ui.form_prev_button.setEnabled(position > 0)
+        self.ui.form_next_button.setEnabled(0 <= position < total - 1)
 
-    def on_form_field_changed(self, row, col_idx, text):
-        model = self.controller.model
-        model_col_index = col_idx + 1
-        model.setData(model.index(row, model_col_index), text, Qt.ItemDataRole.EditRole)
+    def on_form_edits_committed(self, key, edits):
+        model, row_id = key
+        self.controller.commit_form_edits(model, row_id, edits)
         
     def show_previous_feature(self):
-        if self.current_feature_index > 0:
-            self.ui.table_view.selectRow(self.current_feature_index - 1)
+        position = self.proxy_model.proxy_row(self.current_feature_index)
+        if position > 0:
+            self.ui.table_view.selectRow(position - 1)
         
     def show_next_feature(self):
-        if self.current_feature_index < self.controller.model.rowCount() - 1:
-            self.ui.table_view.selectRow(self.current_feature_index + 1)
+        position = self.proxy_model.proxy_row(self.current_feature_index)
+        if 0 <= position < self.proxy_model.rowCount() - 1:
+            self.ui.table_view.selectRow(position + 1)
         
+    def closeEvent(self, event):
+        self.commit_pending_edits()
+        if self.controller.is_publishing():
+            QMessageBox.warning(self, "Publication en cours", "Veuillez attendre la fin de la publication avant de quitter.")
+            event.ignore()
+        else:
+            event.accept()
+
     def show_about_dialog(self):
         QMessageBox.about(self, "À propos", "<b>Éditeur GeoJSON</b> v1.6")
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
+    with phase("QApplication"):
+        app = QApplication(sys.argv)
+    with phase("fenêtre principale"):
+        window = MainWindow()
+    with phase("affichage"):
+        window.show()
+    QTimer.singleShot(0, report_startup) # Après le premier passage de la boucle d'événements
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,193 @@
+# src/merge.py
+import json
+
+from geojson_io import GeoJsonStreamReader, rows_source, splice_features, write_atomic, write_geojson
+from journal import MISSING
+
+# Propriété qui identifie une feature d'une version à l'autre du fichier (identifiant de
+# soumission KoboToolbox). Remplacée par l'option 'key' d'un fichier de la configuration.
+DEFAULT_KEY = '_uuid'
+
+
+def _same(a, b):
+    return a == b and type(a) is type(b)
+
+
+def _normalize(value):
+    return None if value is None or value is MISSING else str(value).strip() or None
+
+
+def feature_key(feature, key):
+    """Valeur de la clé d'une feature (texte), ou None si elle n'en a pas."""
+    properties = feature.get('properties') if isinstance(feature, dict) else None
+    return _normalize(properties.get(key)) if isinstance(properties, dict) else None
+
+
+def index_by_key(features, key):
+    """{clé: feature} ; seule la première feature d'une clé en double est retenue."""
+    index = {}
+    for feature in features:
+        value = feature_key(feature, key)
+        if value is not None: index.setdefault(value, feature)
+    return index
+
+
+def local_changes(model, key=DEFAULT_KEY):
+    """
+    Modifications du modèle depuis sa lecture, d'après son journal, repérées par la clé :
+    - edits : {clé: ({propriété: nouvelle valeur ou MISSING}, feature courante)} ;
+    - deleted : clés des features supprimées ;
+    - added : features ajoutées, dans l'ordre du tableau ;
+    - unmatched : nombre de lignes modifiées ou supprimées sans clé (impossibles à retrouver).
+    La clé d'une ligne est celle du fichier lu, même si elle a été modifiée depuis.
+    """
+    journal = model.journal
+    edits, deleted, unmatched = {}, set(), 0
+    for row_id, row_edits in journal.edits.items():
+        row = model.row_of(row_id)
+        value = _normalize(row_edits[key] if key in row_edits else model.get_value(row, key, None))
+        if value is None:
+            unmatched += 1
+            continue
+        edits[value] = ({prop_name: model.get_value(row, prop_name, MISSING) for prop_name in row_edits}, model.get_feature(row))
+    for feature in journal.deleted.values():
+        value = feature_key(feature, key)
+        if value is None: unmatched += 1
+        else: deleted.add(value)
+    added = [model.get_feature(row) for row in sorted(model.row_of(row_id) for row_id in journal.inserted)]
+    return edits, deleted, added, unmatched
+
+
+def _show(value):
+    if value is MISSING: return "(absente)"
+    return "(vide)" if value in (None, "") else str(value)
+
+
+def merge_features(base, theirs, edits, deleted, prefer=None):
+    """
+    Fusion à trois au niveau des features : 'base' et 'theirs' ({clé: feature}) sont la version
+    lue et la version distante du fichier, 'edits' et 'deleted' les modifications locales (voir
+    local_changes). Une propriété modifiée d'un seul côté prend la nouvelle valeur ; modifiée des
+    deux côtés avec des valeurs différentes, c'est un conflit, comme une feature modifiée d'un
+    côté et supprimée de l'autre. 'prefer' ('ours' ou 'theirs') tranche les conflits au lieu de
+    les signaler.
+    Renvoie (features distantes remplacées {clé: feature}, clés supprimées, features rétablies,
+    conflits [(clé, propriété ou None, message)]).
+    """
+    replaced, removed, restored, conflicts = {}, set(), [], []
+    for value, (values, local_feature) in edits.items():
+        their_feature = theirs.get(value)
+        if their_feature is None:
+            if prefer == 'ours': restored.append(local_feature)
+            elif prefer is None: conflicts.append((value, None, "modifiée localement, supprimée sur le dépôt distant"))
+            continue
+        base_properties = (base.get(value) or {}).get('properties') or {}
+        their_properties = their_feature.get('properties') or {}
+        merged = None
+        for prop_name, new_value in values.items():
+            their_value = their_properties.get(prop_name, MISSING)
+            if _same(their_value, new_value): continue
+            if not _same(their_value, base_properties.get(prop_name, MISSING)): # Modifiée des deux côtés
+                if prefer == 'theirs': continue
+                if prefer is None:
+                    conflicts.append((value, prop_name, f"« {_show(new_value)} » localement, « {_show(their_value)} » sur le dépôt distant"))
+                    continue
+            if merged is None: merged = dict(their_properties)
+            if new_value is MISSING: merged.pop(prop_name, None)
+            else: merged[prop_name] = new_value
+        if merged is not None: replaced[value] = {**their_feature, 'properties': merged}
+    for value in deleted:
+        their_feature = theirs.get(value)
+        if their_feature is None: continue # Supprimée des deux côtés
+        if prefer == 'ours' or their_feature == base.get(value): removed.add(value)
+        elif prefer is None: conflicts.append((value, None, "supprimée localement, modifiée sur le dépôt distant"))
+    return replaced, removed, restored, conflicts
+
+
+def merge_file(path, base_content, model, key=DEFAULT_KEY, prefer=None):
+    """
+    Reporte les modifications du modèle sur la version distante du fichier ('path', après
+    synchronisation), d'après la version lue ('base_content', en octets). Sans conflit, le fichier
+    est réécrit : seules les features fusionnées sont re-sérialisées, dans le style du fichier
+    distant, et les features ajoutées localement vont en fin de tableau.
+    Des lignes modifiées ou supprimées sans clé ne peuvent pas être retrouvées dans la version
+    distante : 'prefer' porte alors sur le fichier entier ('ours' le remplace par le modèle, voir
+    _replace_with_model, 'theirs' garde la version distante) ; sans 'prefer', c'est un conflit.
+    Renvoie (conflits [(clé, propriété, message)], fichier modifié, disposition) ; le fichier n'est
+    pas modifié s'il y a des conflits, ni si la version distante l'emporte partout. La disposition
+    (GeoJsonSource) n'est donnée que si le fichier écrit est exactement le contenu du modèle.
+    """
+    edits, deleted, added, unmatched = local_changes(model, key)
+    if unmatched:
+        if prefer == 'theirs': return [], False, None
+        if prefer == 'ours': return _replace_with_model(path, model)
+        return [(None, None, f"{unmatched} ligne(s) modifiée(s) ou supprimée(s) sans « {key} » : fusion impossible, "
+                             "le choix portera sur le fichier entier (votre version ou la version distante)")], False, None
+    base = index_by_key(json.loads(base_content).get('features') or [], key)
+    reader = GeoJsonStreamReader(path)
+    their_features = [feature for batch in reader.iter_batches() for feature in batch]
+    theirs = index_by_key(their_features, key)
+    replaced, removed, restored, conflicts = merge_features(base, theirs, edits, deleted, prefer)
+    if conflicts: return conflicts, False, None
+
+    offsets = reader.offsets
+    items = []
+    for index, feature in enumerate(their_features):
+        value = feature_key(feature, key)
+        if value in removed: continue
+        if value in replaced and theirs[value] is feature: items.append(replaced[value])
+        else: items.append((offsets[2 * index], offsets[2 * index + 1]))
+    items.extend(restored)
+    # Une feature ajoutée des deux côtés à l'identique (même clé, même contenu) n'est gardée qu'une fois.
+    items.extend(feature for feature in added if theirs.get(feature_key(feature, key)) != feature)
+
+    with open(path, 'rb') as f: original = f.read()
+    if their_features:
+        content, _ = splice_features(original, reader.source.spans(), items, reader.source.ensure_ascii)
+    else:
+        data = {**reader.metadata, 'features': list(items)}
+        content = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    if content == original: return [], False, None
+    write_atomic(path, content)
+    return [], True, None
+
+
+def _canonical(feature):
+    # 1, 1.0 et True restent différents, contrairement à l'égalité des dictionnaires.
+    return json.dumps(feature, sort_keys=True, ensure_ascii=False)
+
+
+def _replace_with_model(path, model):
+    """
+    Remplace la version distante par les lignes du modèle, dans leur ordre, en partant de son
+    texte : une ligne identique à une feature distante en reprend les octets, les autres sont
+    sérialisées dans le style du fichier distant. Renvoie le résultat de merge_file.
+    """
+    reader = GeoJsonStreamReader(path)
+    their_features = [feature for batch in reader.iter_batches() for feature in batch]
+    if not their_features: # Rien à reprendre : réécriture complète
+        return [], True, write_geojson(path, model)
+    spans = reader.source.spans()
+    available = {}
+    for span, feature in zip(reversed(spans), reversed(their_features)):
+        available.setdefault(_canonical(feature), []).append(span)
+    items = []
+    for row in range(model.rowCount()):
+        feature = model.get_feature(row)
+        same = available.get(_canonical(feature))
+        items.append(same.pop() if same else feature)
+    with open(path, 'rb') as f: original = f.read()
+    content, positions = splice_features(original, spans, items, reader.source.ensure_ascii)
+    if content != original: write_atomic(path, content)
+    return [], content != original, rows_source(model, content, positions, reader.source.ensure_ascii)
+
+
+def describe_conflicts(conflicts, max_lines=12):
+    """Texte des conflits pour l'utilisateur, limité à 'max_lines' lignes."""
+    lines = []
+    for value, prop_name, message in conflicts:
+        target = f"« {value} »" if value is not None else ""
+        if prop_name is not None: target += f", {prop_name}"
+        lines.append(f"- {target} : {message}" if target else f"- {message}")
+    if len(lines) > max_lines: lines = lines[:max_lines] + [f"... et {len(lines) - max_lines} autre(s) conflit(s)."]
+    return "\n".join(lines)
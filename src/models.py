@@ -1,14 +1,60 @@
 # src/models.py
-from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
+import copy
+import uuid
+from bisect import bisect_left
+from itertools import compress
+
+from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, Signal
+from PySide6.QtGui import QUndoStack
+import profiling
 from logging_setup import logger
+from journal import ChangeJournal, MISSING
+from merge import DEFAULT_KEY
+from feature_store import LazyFeatureStore, create_store
+from spatial import representative_point
+from schema import infer_schema, validate_columns
+from undo import EditCommand, InsertCommand, RemoveCommand
+
+# Au-delà de ce nombre de plages de lignes à supprimer, le stockage est compacté en un seul
+# parcours et la vue est réinitialisée, plutôt que de décaler les colonnes plage par plage.
+MAX_REMOVE_RANGES = 16
+
+
+def contiguous_ranges(rows):
+    """Regroupe des lignes triées et sans doublon en plages [début, fin[."""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row: ranges[-1][1] = row + 1
+        else: ranges.append([row, row + 1])
+    return ranges
 
 class GeoJsonTableModel(QAbstractTableModel):
+    validation_failed = Signal(int, str, str) # ligne, propriété, message : saisie refusée
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._geojson_data = {}
-        self._features = []
+        self._store = create_store()
         self._headers = []
         self._column_types = {} # Pour stocker les types attendus
+        # Type de chaque colonne (schema.ColumnSchema), déduit une fois par version du fichier (voir get_schema).
+        self._schema = None
+        self._loading = False # Chargement par lots en cours : le schéma n'est pas encore déductible
+        self._fixed_headers = False
+        # Identifiant stable de chaque ligne. Les lignes ajoutées reçoivent toujours
+        # un identifiant supérieur et sont placées en fin de tableau : la liste reste
+        # triée, ce qui permet de retrouver une ligne par dichotomie (voir row_of).
+        self._row_ids = []
+        self._next_row_id = 0
+        self.journal = ChangeJournal()
+        # Annuler / refaire pas à pas (voir undo.py) ; vidé au chargement, à l'annulation globale et à la publication.
+        self.undo_stack = QUndoStack(self)
+        self._read_only = False
+        # Disposition du fichier lu (geojson_io.GeoJsonSource), pour l'écriture incrémentale.
+        self.source = None
+        # Propriété qui identifie une feature d'une version à l'autre (voir merge.py) : chaque ligne
+        # ajoutée ou dupliquée en reçoit une nouvelle valeur (voir EditSession.merge_key).
+        self.merge_key = DEFAULT_KEY
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
         if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
@@ -19,87 +65,386 @@ class GeoJsonTableModel(QAbstractTableModel):
             except IndexError: return None
         return None
 
-    def rowCount(self, parent=QModelIndex()): return len(self._features)
+    def rowCount(self, parent=QModelIndex()): return len(self._store)
     def columnCount(self, parent=QModelIndex()): return len(self._headers) + 1
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if profiling.ENABLED: profiling.count('model.data')
         if not index.isValid(): return None
         row, col = index.row(), index.column()
         if role == Qt.ItemDataRole.DisplayRole:
             if col == 0: return None
             try:
                 prop_name = self._headers[col - 1]
-                return self._features[row]['properties'].get(prop_name, "")
-            except (IndexError, KeyError): return None
+                return self._store.get(row, prop_name, "")
+            except IndexError: return None
         return None
     
+    @profiling.profiled('model.setData')
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
-        if not index.isValid() or role != Qt.ItemDataRole.EditRole: return False
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole or self._read_only: return False
         row, col = index.row(), index.column()
         if col == 0: return False
         try:
             prop_name = self._headers[col - 1]
-            final_value = value
-
-            # --- VALIDATION DE TYPE ICI ---
-            if prop_name in self._column_types:
-                if self._column_types[prop_name] == 'int':
-                    try:
-                        final_value = int(value) if value else 0
-                    except (ValueError, TypeError):
-                        logger.warning(f"Conversion en entier échouée pour '{value}'. Utilisation de 0.")
-                        final_value = 0 # Valeur par défaut en cas d'erreur
-            
-            if 'properties' not in self._features[row]: self._features[row]['properties'] = {}
-            self._features[row]['properties'][prop_name] = final_value
-            self.dataChanged.emit(index, index, [Qt.ItemDataRole.EditRole])
-            return True
         except IndexError: return False
+        try:
+            value = self._convert(prop_name, value)
+        except ValueError as e:
+            self.validation_failed.emit(row, prop_name, str(e))
+            return False
+        self.undo_stack.push(EditCommand(self, row, {prop_name: value}, f"Modification de « {prop_name} »"))
+        return True
+
+    @profiling.profiled('model.set_values')
+    def set_values(self, row, values):
+        """
+        Modifie plusieurs propriétés d'une ligne ({propriété: valeur}) avec un seul signal
+        dataChanged couvrant les colonnes concernées, et une seule étape d'annulation.
+        Les valeurs qui ne conviennent pas au type de leur colonne sont écartées (validation_failed).
+        """
+        if self._read_only or not 0 <= row < len(self._store): return False
+        accepted = {}
+        for prop_name, value in values.items():
+            if prop_name not in self._headers: continue
+            try:
+                accepted[prop_name] = self._convert(prop_name, value)
+            except ValueError as e:
+                self.validation_failed.emit(row, prop_name, str(e))
+        values = accepted
+        if not values: return False
+        text = f"Modification de « {next(iter(values))} »" if len(values) == 1 else "Modification de la fiche"
+        self.undo_stack.push(EditCommand(self, row, values, text))
+        return True
+
+    def begin_group(self, text):
+        """Regroupe les opérations suivantes en une seule étape d'annulation, jusqu'à end_group."""
+        self.undo_stack.beginMacro(text)
+
+    def end_group(self): self.undo_stack.endMacro()
+
+    def _write_values(self, row, values, record=False):
+        """
+        Écrit des valeurs ({propriété: valeur}, MISSING retire la propriété) avec un seul signal
+        dataChanged. Renvoie les anciennes valeurs ; 'record' les inscrit au journal.
+        """
+        old_values, columns = {}, []
+        for prop_name, value in values.items():
+            if value is MISSING:
+                old_values[prop_name] = self._store.get(row, prop_name, MISSING)
+                self._store.discard(row, prop_name)
+            else:
+                old_values[prop_name] = self._store.set(row, prop_name, value)
+            if record: self.journal.record_edit(self._row_ids[row], prop_name, old_values[prop_name], value)
+            if prop_name in self._headers: columns.append(self._headers.index(prop_name) + 1)
+        if columns:
+            self.dataChanged.emit(self.index(row, min(columns)), self.index(row, max(columns)), [Qt.ItemDataRole.EditRole])
+        return old_values
+
+    def _convert(self, prop_name, value):
+        """Saisie -> valeur typée selon le schéma de la colonne ; ValueError si elle ne convient pas."""
+        # Une colonne 'int' de la configuration vidée vaut 0, comme dans une ligne ajoutée (insert_rows).
+        if value in (None, "") and self._column_types.get(prop_name) == 'int': return 0
+        column = self.get_schema().get(prop_name)
+        return value if column is None else column.convert(value)
+
+    def get_schema(self):
+        """
+        Schéma du fichier ({propriété: schema.ColumnSchema}). Déduit pendant le chargement (voir
+        end_load) ou au premier besoin, en un passage sur les lignes, puis gardé jusqu'au prochain
+        chargement : il accompagne le fichier dans le cache de lecture (voir GeoJsonLoadWorker), et n'est
+        donc calculé qu'une fois par version.
+        """
+        if self._schema is None:
+            if self._loading: return {} # Fichier incomplet (le modèle est alors en lecture seule)
+            self._schema = infer_schema(self._headers, self._store.column_chunks, self._column_types)
+        return self._schema
+
+    def get_field_types(self):
+        """Type de chaque colonne ({propriété: type}), pour les champs de la fiche."""
+        if self._loading and self._schema is None: return dict(self._column_types)
+        return {name: column.type for name, column in self.get_schema().items()}
+
+    def validate(self, rows=None):
+        """
+        Contrôle de toutes les valeurs selon le schéma : [(propriété, gravité, message, lignes)].
+        'rows' limite le rapport à un ensemble de lignes (par exemple les lignes modifiées).
+        Parcourt tout le fichier : appelé hors du thread de l'interface (voir GitPublishWorker).
+        """
+        return validate_columns(self.get_schema(), self._store.column_chunks, None if rows is None else rows.__contains__)
 
     def flags(self, index):
         if not index.isValid(): return Qt.ItemFlag.NoItemFlags
-        if index.column() > 0: return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable
+        if index.column() > 0 and not self._read_only: return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable
         return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
 
-    def load_data(self, geojson_data, visible_headers=None, column_types=None):
+    @profiling.profiled('model.load_data')
+    def load_data(self, geojson_data, visible_headers=None, column_types=None, storage='columnar'):
         self.beginResetModel()
         self._geojson_data = geojson_data
-        self._features = self._geojson_data.get('features', [])
+        self.source = None
+        features = self._geojson_data.get('features', [])
         self._column_types = column_types or {}
+        self._schema = None
+        self._loading = False
+        self._fixed_headers = visible_headers is not None
+        self._store = create_store(storage, self._column_types)
+        self._store.extend(features)
         
         if visible_headers is not None: self._headers = visible_headers
         else:
             all_keys = set()
-            for feature in self._features:
+            for feature in features:
                 if 'properties' in feature and isinstance(feature['properties'], dict):
                     all_keys.update(feature['properties'].keys())
             self._headers = sorted(list(all_keys))
+        self._reset_row_ids()
         self.endResetModel()
-        logger.info(f"Données chargées. {len(self._features)} features, types: {self._column_types}")
-
-    def insert_row(self):
-        self.beginInsertRows(QModelIndex(), self.rowCount(), self.rowCount())
-        new_properties = {}
-        for header in self._headers:
-            if self._column_types.get(header) == 'int':
-                new_properties[header] = 0
-            else:
-                new_properties[header] = ""
-        new_feature = {"type": "Feature", "properties": new_properties, "geometry": None}
-        self._features.append(new_feature)
+        logger.info(f"Données chargées. {len(self._store)} features, types: {self._column_types}")
+
+    # --- Chargement incrémental (voir geojson_io.GeoJsonStreamReader) ---
+
+    def begin_load(self, visible_headers=None, column_types=None, storage='columnar'):
+        """Vide le modèle avant de recevoir les features par lots."""
+        self.beginResetModel()
+        self._geojson_data = {}
+        self.source = None
+        self._column_types = column_types or {}
+        self._schema = None
+        self._loading = True
+        self._store = create_store(storage, self._column_types)
+        self._reset_row_ids()
+        self._fixed_headers = visible_headers is not None
+        self._headers = list(visible_headers) if visible_headers is not None else []
+        self.endResetModel()
+
+    @profiling.profiled('model.append_features')
+    def append_features(self, features, mapped_spans=None):
+        """
+        Ajoute un lot de features en fin de tableau, avec un seul signal d'insertion.
+        En stockage 'lazy', 'mapped_spans' (fichier projeté, positions) remplace le contenu des
+        features, qui ne servent alors qu'à relever les colonnes.
+        """
+        if not features: return
+        if not self._fixed_headers: self._add_headers_from(features)
+        first = len(self._store)
+        self.beginInsertRows(QModelIndex(), first, first + len(features) - 1)
+        if mapped_spans is None: self._store.extend(features)
+        else: self._store.extend_mapped(*mapped_spans)
+        self._row_ids.extend(range(self._next_row_id, self._next_row_id + len(features)))
+        self._next_row_id += len(features)
         self.endInsertRows()
+
+    def end_load(self, metadata, source=None, inference=None):
+        """
+        Termine le chargement : conserve les membres de premier niveau (type, name, crs...) et la
+        disposition du fichier. 'inference' (schema.SchemaInference) donne le schéma déduit pendant
+        la lecture, sans nouveau parcours des lignes.
+        """
+        self._geojson_data = metadata
+        self.source = source
+        self._loading = False
+        if inference is not None and self._schema is None: self._schema = inference.schema(self._headers, self._column_types)
+        logger.info(f"Données chargées. {len(self._store)} features, types: {self._column_types}")
+
+    def load_cached(self, entry):
+        """Remplace le contenu par une entrée du cache de lecture, entre begin_load et end_load."""
+        self.beginResetModel()
+        self._store = entry['store']
+        self._headers = list(entry['headers'])
+        self._schema = entry.get('schema') # Absent des entrées écrites par une version précédente
+        self._reset_row_ids()
+        self.endResetModel()
+
+    def _add_headers_from(self, features):
+        """Insère à leur place (ordre alphabétique) les propriétés encore inconnues."""
+        new_keys = set()
+        for feature in features:
+            properties = feature.get('properties')
+            if isinstance(properties, dict): new_keys.update(properties.keys())
+        new_keys.difference_update(self._headers)
+        if new_keys: self._schema = None # À déduire de nouveau, avec les nouvelles colonnes
+        for key in sorted(new_keys):
+            position = bisect_left(self._headers, key)
+            self.beginInsertColumns(QModelIndex(), position + 1, position + 1)
+            self._headers.insert(position, key)
+            self.endInsertColumns()
+
+    def _reset_row_ids(self):
+        self._row_ids = list(range(len(self._store)))
+        self._next_row_id = len(self._store)
+        self.journal.clear()
+        self.undo_stack.clear()
+
+    def row_of(self, row_id):
+        """Renvoie la ligne courante d'un identifiant stable, ou -1 s'il n'est plus présent."""
+        row = bisect_left(self._row_ids, row_id)
+        return row if row < len(self._row_ids) and self._row_ids[row] == row_id else -1
+
+    def row_id(self, row): return self._row_ids[row]
+    def row_ids(self): return list(self._row_ids)
+    def next_row_id(self): return self._next_row_id
+
+    def revert_changes(self):
+        """
+        Annule les modifications enregistrées dans le journal : retire les lignes ajoutées,
+        réinsère les lignes supprimées à leur place et restaure les cellules éditées.
+        Seules les lignes et cellules concernées sont signalées à la vue.
+        """
+        journal = self.journal
+        self._take_rows(sorted(self.row_of(i) for i in journal.inserted))
+        self._insert_by_id(journal.deleted)
+        for row_id, row_edits in journal.edits.items():
+            row = self.row_of(row_id)
+            columns = []
+            for prop_name, original in row_edits.items():
+                if original is MISSING: self._store.discard(row, prop_name)
+                else: self._store.set(row, prop_name, original)
+                if prop_name in self._headers: columns.append(self._headers.index(prop_name) + 1)
+            if columns: # Un seul signal par ligne
+                self.dataChanged.emit(self.index(row, min(columns)), self.index(row, max(columns)), [Qt.ItemDataRole.EditRole])
+        journal.clear()
+        self.undo_stack.clear()
+
+    def accept_changes(self):
+        """Fait de l'état courant la nouvelle référence, après une publication réussie."""
+        self.journal.clear()
+        self.undo_stack.clear() # Les étapes annulables se rapportaient à l'ancienne référence
+
+    def set_read_only(self, read_only):
+        """Bloque l'édition (chargement ou publication en cours)."""
+        self._read_only = read_only
+
+    def is_read_only(self): return self._read_only
+
+    def insert_row(self): return self.insert_rows(1)
+
+    def insert_rows(self, count):
+        """
+        Ajoute 'count' lignes vides en fin de tableau, avec un seul signal d'insertion. Chacune
+        reçoit un nouvel identifiant (uuid4) dans la clé de fusion, si le fichier l'utilise.
+        """
+        if self._read_only or count <= 0: return False
+        new_features, keyed = [], self._has_merge_key()
+        for _ in range(count):
+            new_properties = {}
+            for header in self._headers:
+                if self._column_types.get(header) == 'int':
+                    new_properties[header] = 0
+                else:
+                    new_properties[header] = ""
+            if keyed: new_properties[self.merge_key] = str(uuid.uuid4())
+            new_features.append({"type": "Feature", "properties": new_properties, "geometry": None})
+        self.undo_stack.push(InsertCommand(self, new_features, f"Ajout de {count} ligne(s)"))
+        return True
+
+    def duplicate_rows(self, rows):
+        """
+        Ajoute en fin de tableau une copie de chaque ligne demandée. Une copie reçoit un
+        nouvel identifiant dans la clé de fusion ('_uuid', l'identifiant de soumission
+        KoboToolbox, par défaut) quand la ligne en a un.
+        """
+        if self._read_only: return False
+        rows = sorted({row for row in rows if 0 <= row < len(self._store)})
+        if not rows: return False
+        new_features = []
+        for row in rows:
+            feature = copy.deepcopy(self._store.feature(row))
+            properties = feature.get('properties')
+            if isinstance(properties, dict) and properties.get(self.merge_key):
+                properties[self.merge_key] = str(uuid.uuid4())
+            new_features.append(feature)
+        self.undo_stack.push(InsertCommand(self, new_features, f"Duplication de {len(rows)} ligne(s)"))
         return True
 
+    def _has_merge_key(self):
+        # Colonne affichée, ou masquée (option 'columns') mais présente dans les lignes du fichier.
+        return self.merge_key in self._headers or (len(self._store) > 0 and self._store.get(0, self.merge_key) is not None)
+
+    def _append_new_rows(self, features):
+        # Les nouvelles lignes vont en fin de tableau : les identifiants restent triés.
+        first = len(self._store)
+        self.beginInsertRows(QModelIndex(), first, first + len(features) - 1)
+        self._store.extend(features)
+        new_ids = range(self._next_row_id, self._next_row_id + len(features))
+        self._row_ids.extend(new_ids)
+        for row_id in new_ids: self.journal.record_insert(row_id)
+        self._next_row_id += len(features)
+        self.endInsertRows()
+        return new_ids
+
     def remove_rows(self, rows_to_remove):
-        rows_to_remove.sort(reverse=True)
-        for row in rows_to_remove:
-            self.beginRemoveRows(QModelIndex(), row, row)
-            if 0 <= row < len(self._features): del self._features[row]
-            self.endRemoveRows()
+        """Supprime un ensemble de lignes, regroupées en plages contiguës."""
+        if self._read_only: return False
+        rows = sorted({row for row in rows_to_remove if 0 <= row < len(self._store)})
+        if rows: self.undo_stack.push(RemoveCommand(self, rows, f"Suppression de {len(rows)} ligne(s)"))
         return True
+
+    def _take_ids(self, row_ids, record=False):
+        """Retire des lignes par identifiant et renvoie leurs features ; 'record' inscrit les suppressions au journal."""
+        rows = sorted(self.row_of(row_id) for row_id in row_ids)
+        features = {self._row_ids[row]: self._store.feature(row) for row in rows}
+        if record:
+            for row_id, feature in features.items(): self.journal.record_delete(row_id, feature)
+        self._take_rows(rows)
+        return features
+
+    def _insert_by_id(self, features):
+        """
+        Réinsère des features à la place de leur identifiant ({row_id: feature}). Les identifiants
+        consécutifs sans ligne présente entre eux sont réinsérés avec un seul signal.
+        """
+        row_ids = sorted(features)
+        start = 0
+        while start < len(row_ids):
+            row = bisect_left(self._row_ids, row_ids[start])
+            stop = start + 1
+            if row < len(self._row_ids):
+                while stop < len(row_ids) and row_ids[stop] < self._row_ids[row]: stop += 1
+            else:
+                stop = len(row_ids)
+            self.beginInsertRows(QModelIndex(), row, row + stop - start - 1)
+            for offset, row_id in enumerate(row_ids[start:stop]): self._store.insert(row + offset, features[row_id])
+            self._row_ids[row:row] = row_ids[start:stop]
+            self.endInsertRows()
+            start = stop
+
+    def _take_rows(self, rows):
+        """
+        Retire des lignes (triées, sans doublon) sans les journaliser. Un signal par plage
+        contiguë ; au-delà de MAX_REMOVE_RANGES plages, un seul compactage et une réinitialisation.
+        """
+        ranges = contiguous_ranges(rows)
+        if len(ranges) <= MAX_REMOVE_RANGES:
+            # De la fin vers le début : les plages suivantes gardent leurs numéros de ligne.
+            for start, stop in reversed(ranges):
+                self.beginRemoveRows(QModelIndex(), start, stop - 1)
+                self._store.delete_range(start, stop)
+                del self._row_ids[start:stop]
+                self.endRemoveRows()
+            return
+        keep = bytearray(b'\x01') * len(self._store)
+        for row in rows: keep[row] = 0
+        self.beginResetModel()
+        self._store.retain(keep)
+        self._row_ids = list(compress(self._row_ids, keep))
+        self.endResetModel()
     
-    def get_all_features(self): return self._features
+    def get_all_features(self): return self._store.features()
+    def get_feature(self, row): return self._store.feature(row)
+    def get_value(self, row, prop_name, default=""): return self._store.get(row, prop_name, default)
+    def get_geometry(self, row): return self._store.geometry(row)
+
+    def get_point(self, row):
+        """Point (x, y) représentatif de la géométrie d'une ligne, ou None (voir spatial.representative_point)."""
+        point = self._store.point(row)
+        return point if point is not None else representative_point(self._store.geometry(row))
+    def get_column_values(self, prop_name): return self._store.column(prop_name)
+    def column_chunks(self, prop_names): return self._store.column_chunks(prop_names)
+    # Stockage 'lazy' : lire une colonne entière décode tout le fichier (voir proxy.ColumnIndexWorker).
+    def is_lazy(self): return isinstance(self._store, LazyFeatureStore)
     def get_headers(self): return self._headers
+    def get_column_types(self): return self._column_types
     def get_geojson_data(self):
         data = self._geojson_data.copy()
         data['features'] = self.get_all_features()
@@ -0,0 +1,94 @@
+# src/parse_cache.py
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from settings import CONFIG_DIR
+from logging_setup import logger
+
+CACHE_DIR = os.path.join(CONFIG_DIR, "cache")
+# À incrémenter quand la structure des stockages (feature_store) ou des entrées change.
+CACHE_VERSION = 2
+DEFAULT_MAX_MB = 512
+_SUFFIX = '.pickle'
+
+
+def blob_id(path, chunk_size=1 << 20):
+    """Identifiant d'objet git d'un fichier (comme 'git hash-object'), calculé sans lancer git."""
+    digest = hashlib.sha1(b'blob %d\0' % os.path.getsize(path))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache disque des fichiers déjà lus : le stockage du modèle (colonnes compactes, tableaux
+    de coordonnées), ses colonnes, les membres de premier niveau et la disposition du fichier,
+    sérialisés avec pickle. Une entrée est identifiée par l'identifiant git du contenu et par
+    les options de chargement : rouvrir un fichier inchangé évite toute l'analyse du JSON.
+    La taille totale est bornée ; les entrées les moins récemment utilisées sont supprimées.
+    """
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(blob, storage, column_types, visible_headers):
+        options = json.dumps([CACHE_VERSION, storage, sorted((column_types or {}).items()), visible_headers])
+        return f"{blob}-{hashlib.sha1(options.encode('utf-8')).hexdigest()[:12]}"
+
+    def _path(self, key): return os.path.join(self.directory, key + _SUFFIX)
+
+    def load(self, key):
+        """Renvoie l'entrée mise en cache, ou None. Une entrée illisible est supprimée."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f: entry = pickle.load(f)
+            os.utime(path) # Date d'utilisation, pour l'éviction
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrée de cache illisible, ignorée : {e}")
+            try: os.remove(path)
+            except OSError: pass
+            return None
+
+    def store(self, key, entry):
+        """Écrit une entrée (fichier temporaire puis remplacement), puis applique la limite de taille."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f: pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._evict()
+            return True
+        except Exception as e:
+            logger.warning(f"Impossible d'écrire le cache de lecture : {e}")
+            return False
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(_SUFFIX) and item.is_file():
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries): # Les plus anciennes d'abord
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory): return
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX): os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,106 @@
+# src/profiling.py
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Mesures internes (durées et compteurs) des chemins chauds : chargement, data(), setData,
+# étapes de publication et opérations git. Désactivées par défaut : chaque point de mesure
+# se réduit alors à la lecture de ENABLED. EDITEUR_PROFILE=1 les active dès le lancement.
+ENABLED = bool(os.environ.get('EDITEUR_PROFILE'))
+MAX_EVENTS = 100000 # Événements gardés pour la trace (les plus anciens sont oubliés au-delà)
+
+_START = time.perf_counter()
+_lock = threading.Lock()
+_timers = {}   # nom -> [nombre, durée totale, durée maximale] en secondes
+_counters = {} # nom -> valeur
+_events = []   # (nom, début, durée, thread) pour la trace
+_NULL = nullcontext()
+
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+
+def reset():
+    with _lock:
+        _timers.clear(); _counters.clear(); _events.clear()
+
+
+def count(name, n=1):
+    if ENABLED: _counters[name] = _counters.get(name, 0) + n
+
+
+def record(name, start, duration):
+    """Ajoute une durée mesurée (début et durée en secondes, selon time.perf_counter)."""
+    if not ENABLED: return
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None: _timers[name] = [1, duration, duration]
+        else:
+            stats[0] += 1; stats[1] += duration
+            if duration > stats[2]: stats[2] = duration
+        if len(_events) >= MAX_EVENTS: del _events[:MAX_EVENTS // 10]
+        _events.append((name, start, duration, threading.get_ident()))
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+    def __init__(self, name): self.name = name
+    def __enter__(self): self.start = time.perf_counter()
+    def __exit__(self, *exc_info): record(self.name, self.start, time.perf_counter() - self.start)
+
+
+def timed(name):
+    """Bloc 'with' mesuré ; sans effet (contexte partagé) quand les mesures sont désactivées."""
+    return _Timer(name) if ENABLED else _NULL
+
+
+def profiled(name):
+    """Décorateur : mesure chaque appel de la fonction sous le nom donné (voir timed)."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED: return function(*args, **kwargs)
+            with _Timer(name): return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Copie des mesures : ({nom: (nombre, total, max)}, {nom: valeur})."""
+    with _lock:
+        return {name: tuple(stats) for name, stats in _timers.items()}, dict(_counters)
+
+
+def summary(previous_counters=None, interval=None):
+    """
+    Lignes de texte des mesures, pour l'affichage : durée moyenne et maximale de chaque mesure,
+    compteurs (et leur débit par seconde depuis 'previous_counters', relevé 'interval' secondes plus tôt).
+    """
+    timers, counters = snapshot()
+    lines = [f"{name} : {n} × {total / n * 1000:.1f} ms (max {peak * 1000:.1f} ms)" for name, (n, total, peak) in sorted(timers.items())]
+    for name, value in sorted(counters.items()):
+        line = f"{name} : {value}"
+        if previous_counters is not None and interval:
+            line += f" ({(value - previous_counters.get(name, 0)) / interval:.0f}/s)"
+        lines.append(line)
+    return lines
+
+
+def export_trace(path):
+    """
+    Écrit les mesures au format Trace Event (JSON, lisible par chrome://tracing ou Perfetto) :
+    un événement par durée mesurée, et les compteurs dans les métadonnées.
+    """
+    with _lock:
+        events, counters = list(_events), dict(_counters)
+    pid = os.getpid()
+    trace = [{"name": name, "ph": "X", "ts": round((start - _START) * 1e6, 1), "dur": round(duration * 1e6, 1), "pid": pid, "tid": tid}
+             for name, start, duration, tid in events]
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"counters": counters}}, f)
+    return len(trace)
@@ -0,0 +1,402 @@
+# src/proxy.py
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+from PySide6.QtCore import QAbstractProxyModel, QModelIndex, QObject, QThread, Qt, Signal
+
+from logging_setup import logger
+
+_WORD = re.compile(r'\w+')
+# Signes diacritiques séparés de leur lettre par la décomposition NFKD.
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+def normalize(text):
+    """Texte sans casse ni accents, pour la recherche et le tri ('École' -> 'ecole')."""
+    text = str(text).casefold()
+    if text.isascii(): return text
+    return _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+
+
+def words(value):
+    return frozenset(_WORD.findall(normalize(value))) if value not in (None, "") else frozenset()
+
+
+def sort_key(value, numeric=False):
+    """
+    Clé de tri d'une cellule : nombres, puis textes (sans casse ni accents), puis cellules vides.
+    Pour une colonne typée 'int', les textes contenant un entier sont triés comme des nombres.
+    """
+    if value is None or value == "": return (2, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool): return (0, value)
+    if numeric:
+        try: return (0, int(value))
+        except (TypeError, ValueError): pass
+    return (1, normalize(value))
+
+
+class PrefixIndex:
+    """
+    Index des mots d'une colonne : liste triée de (mot, identifiant de ligne).
+    Une recherche par préfixe est une dichotomie ; une édition ne met à jour que ses mots.
+    """
+    def __init__(self, row_ids, values):
+        self._row_words = {}
+        entries, known = [], {} # Les valeurs répétées (cuisine de rattachement...) ne sont analysées qu'une fois.
+        for row_id, value in zip(row_ids, values):
+            try:
+                row_words = known.get(value)
+                if row_words is None: row_words = known[value] = words(value)
+            except TypeError: # Valeur non hachable (liste, objet)
+                row_words = words(value)
+            if row_words:
+                self._row_words[row_id] = row_words
+                entries.extend((word, row_id) for word in row_words)
+        entries.sort()
+        self._entries = entries
+
+    def search(self, prefix):
+        """Identifiants des lignes contenant un mot commençant par 'prefix' (normalisé)."""
+        start = bisect_left(self._entries, (prefix,))
+        stop = bisect_left(self._entries, (prefix + '\uffff',), start)
+        return {row_id for _, row_id in self._entries[start:stop]}
+
+    def matches(self, row_id, prefixes):
+        row_words = self._row_words.get(row_id, ())
+        return all(any(word.startswith(prefix) for word in row_words) for prefix in prefixes)
+
+    def update(self, row_id, value):
+        self.remove(row_id)
+        row_words = words(value)
+        if row_words:
+            self._row_words[row_id] = row_words
+            for word in row_words: insort(self._entries, (word, row_id))
+
+    def remove(self, row_id):
+        for word in self._row_words.pop(row_id, ()):
+            del self._entries[bisect_left(self._entries, (word, row_id))]
+
+
+class ColumnIndexWorker(QObject):
+    """
+    Clés de tri et index de mots d'une colonne en stockage 'lazy' : lire la colonne décode tout
+    le fichier, ce qui est fait ici, hors du thread de l'interface, en un seul passage pour le tri
+    et la recherche. 'generation' permet au proxy d'écarter un résultat devenu périmé.
+    """
+    finished = Signal(str, object, object, int)
+
+    def __init__(self, model, prop_name, row_ids, generation):
+        super().__init__()
+        self.model = model
+        self.prop_name = prop_name
+        self.row_ids = row_ids # Lues dans le thread de l'interface
+        self.generation = generation
+
+    def run(self):
+        keys = index = None
+        try:
+            numeric = self.model.get_column_types().get(self.prop_name) == 'int'
+            values = [value for chunk in self.model.column_chunks([self.prop_name]) for value in chunk[self.prop_name]]
+            if len(values) == len(self.row_ids): # Sinon, des lignes ont été ajoutées ou supprimées entre-temps
+                keys = [sort_key(value, numeric) for value in values]
+                index = PrefixIndex(self.row_ids, values)
+        except Exception as e:
+            logger.error(f"Erreur de préparation de la colonne {self.prop_name} : {e}", exc_info=True)
+        self.finished.emit(self.prop_name, keys, index, self.generation)
+
+
+class FeatureProxyModel(QAbstractProxyModel):
+    """
+    Tri et filtre du tableau, au-dessus d'un GeoJsonTableModel.
+    L'ordre affiché est une simple liste de lignes du modèle source, calculée avec des clés
+    de tri précalculées par colonne (numériques pour les colonnes 'int') et un index de mots
+    par colonne filtrée (voir PrefixIndex) : ni le tri ni le filtre ne rappellent Python
+    pour chaque comparaison ou chaque ligne. Les éditions mettent ces structures à jour
+    cellule par cellule. En stockage 'lazy', elles sont calculées en arrière-plan (voir
+    ColumnIndexWorker) : le tri ou le filtre s'applique quand elles sont prêtes.
+    """
+    column_preparing = Signal(str, bool) # Propriété, calcul en cours (True) ou terminé (False)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = None          # Lignes source dans l'ordre affiché (None : ordre du fichier, sans filtre)
+        self._positions = None     # Position affichée de chaque ligne source (calculée à la demande)
+        self._sort_prop = None
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._filter_prop = None
+        self._filter_prefixes = []
+        self._sort_keys = {}       # {propriété: clé de tri de chaque ligne source}
+        self._indexes = {}         # {propriété: PrefixIndex}
+        self._preparing = {}       # {propriété: (QThread, ColumnIndexWorker)} en stockage 'lazy'
+        self._generation = 0       # Incrémenté à chaque changement du modèle source (résultats en cours périmés)
+        self._pending_reset = False
+        self._removed_positions = []
+        self._connections = []
+
+    # --- Branchement sur le modèle source ---
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        for signal, slot in self._connections: signal.disconnect(slot)
+        super().setSourceModel(model)
+        self._connections = [
+            (model.dataChanged, self._on_data_changed),
+            (model.headerDataChanged, self.headerDataChanged),
+            (model.rowsAboutToBeInserted, self._on_rows_about_to_be_inserted),
+            (model.rowsInserted, self._on_rows_inserted),
+            (model.rowsAboutToBeRemoved, self._on_rows_about_to_be_removed),
+            (model.rowsRemoved, self._on_rows_removed),
+            (model.columnsAboutToBeInserted, self._on_columns_about_to_be_inserted),
+            (model.columnsInserted, self._on_columns_inserted),
+            (model.modelAboutToBeReset, self.beginResetModel),
+            (model.modelReset, self._on_model_reset),
+        ]
+        for signal, slot in self._connections: signal.connect(slot)
+        self._sort_keys, self._indexes = {}, {}
+        self._generation += 1
+        self._apply()
+        self.endResetModel()
+
+    # --- Interface QAbstractProxyModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None: return 0
+        return len(self._rows) if self._rows is not None else self.sourceModel().rowCount()
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None: return 0
+        return self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount() and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None: return QObject.parent(self)
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None: return QModelIndex()
+        return self.sourceModel().index(self.source_row(proxy_index.row()), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid(): return QModelIndex()
+        row = self.proxy_row(source_index.row())
+        return self.index(row, source_index.column()) if row >= 0 else QModelIndex()
+
+    def source_row(self, row):
+        """Ligne du modèle source affichée à la position 'row'."""
+        return self._rows[row] if self._rows is not None else row
+
+    def proxy_row(self, source_row):
+        """Position affichée d'une ligne source, ou -1 si elle est masquée par le filtre."""
+        if self._rows is None: return source_row
+        if self._positions is None:
+            self._positions = [-1] * self.sourceModel().rowCount()
+            for position, row in enumerate(self._rows): self._positions[row] = position
+        return self._positions[source_row] if 0 <= source_row < len(self._positions) else -1
+
+    # --- Tri et filtre ---
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Trie sur une colonne ; la colonne 0 (actions) rétablit l'ordre du fichier."""
+        headers = self.sourceModel().get_headers() if self.sourceModel() else []
+        self._sort_prop = headers[column - 1] if 0 < column <= len(headers) else None
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        persistent = [(index, self.mapToSource(index)) for index in self.persistentIndexList()]
+        self._apply()
+        self.changePersistentIndexList([index for index, _ in persistent],
+                                       [self.mapFromSource(source) for _, source in persistent])
+        self.layoutChanged.emit()
+
+    def set_filter(self, prop_name, text):
+        """N'affiche que les lignes dont la propriété contient des mots commençant par chaque mot de 'text'."""
+        prefixes = _WORD.findall(normalize(text)) if prop_name else []
+        if (prop_name, prefixes) == (self._filter_prop, self._filter_prefixes): return
+        self.beginResetModel()
+        self._filter_prop, self._filter_prefixes = prop_name, prefixes
+        self._apply()
+        self.endResetModel()
+
+    def is_filtered(self): return bool(self._filter_prefixes)
+
+    def _apply(self):
+        """Recalcule l'ordre affiché à partir des index."""
+        model, rows = self.sourceModel(), None
+        self._positions = None
+        if model is None:
+            self._rows = None
+            return
+        index = self._index(self._filter_prop) if self._filter_prefixes else None
+        if index is not None:
+            row_ids = index.search(self._filter_prefixes[0])
+            for prefix in self._filter_prefixes[1:]:
+                row_ids &= index.search(prefix)
+            rows = sorted(model.row_of(row_id) for row_id in row_ids)
+        keys = self._keys(self._sort_prop) if self._sort_prop is not None else None
+        if keys is not None:
+            rows = sorted(rows if rows is not None else range(model.rowCount()), key=keys.__getitem__,
+                          reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+        self._rows = rows
+
+    def _keys(self, prop_name):
+        """Clés de tri d'une colonne, ou None tant qu'elles sont calculées en arrière-plan."""
+        keys = self._sort_keys.get(prop_name)
+        if keys is None and self.sourceModel().is_lazy(): self._prepare(prop_name)
+        elif keys is None:
+            numeric = self.sourceModel().get_column_types().get(prop_name) == 'int'
+            keys = self._sort_keys[prop_name] = [sort_key(value, numeric) for value in self.sourceModel().get_column_values(prop_name)]
+        return keys
+
+    def _index(self, prop_name):
+        # Construit une seule fois par colonne, à la première recherche, puis tenu à jour.
+        index = self._indexes.get(prop_name)
+        if index is None and self.sourceModel().is_lazy(): self._prepare(prop_name)
+        elif index is None:
+            model = self.sourceModel()
+            row_ids = [model.row_id(row) for row in range(model.rowCount())]
+            index = self._indexes[prop_name] = PrefixIndex(row_ids, model.get_column_values(prop_name))
+        return index
+
+    def _prepare(self, prop_name):
+        """Lance en arrière-plan le calcul des clés de tri et de l'index d'une colonne 'lazy'."""
+        if prop_name in self._preparing: return
+        model = self.sourceModel()
+        thread = QThread(self) # Enfant du proxy : _on_column_prepared l'oublie avant la fin du thread
+        worker = ColumnIndexWorker(model, prop_name, model.row_ids(), self._generation)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self._on_column_prepared)
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._preparing[prop_name] = (thread, worker)
+        self.column_preparing.emit(prop_name, True)
+        thread.start()
+
+    def _on_column_prepared(self, prop_name, keys, index, generation):
+        self._preparing.pop(prop_name, None)
+        if prop_name not in (self._sort_prop, self._filter_prop if self._filter_prefixes else None):
+            self.column_preparing.emit(prop_name, False) # Plus demandée entre-temps
+            return
+        if generation != self._generation: # Modèle changé pendant le calcul : on recommence
+            self._prepare(prop_name)
+            return
+        self.column_preparing.emit(prop_name, False)
+        if keys is None: return # Erreur (journalisée par le worker) : ni tri ni filtre sur cette colonne
+        self._sort_keys[prop_name], self._indexes[prop_name] = keys, index
+        self.beginResetModel()
+        self._apply()
+        self.endResetModel()
+
+    def _matches(self, source_row):
+        if not self._filter_prefixes: return True
+        index = self._index(self._filter_prop)
+        return index is None or index.matches(self.sourceModel().row_id(source_row), self._filter_prefixes)
+
+    # --- Suivi des changements du modèle source ---
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        self._generation += 1
+        model = self.sourceModel()
+        headers = model.get_headers()
+        props = [headers[column - 1] for column in range(max(top_left.column(), 1), bottom_right.column() + 1)
+                 if column - 1 < len(headers)]
+        rows = range(top_left.row(), bottom_right.row() + 1)
+        types = model.get_column_types()
+        for prop_name in props:
+            keys, index = self._sort_keys.get(prop_name), self._indexes.get(prop_name)
+            for row in rows:
+                value = model.get_value(row, prop_name, None)
+                if keys is not None: keys[row] = sort_key(value, types.get(prop_name) == 'int')
+                if index is not None: index.update(model.row_id(row), value)
+        # La ligne reste à sa place jusqu'au prochain tri ou filtre, comme dans un tableur.
+        if self._rows is None:
+            self.dataChanged.emit(self.mapFromSource(top_left), self.mapFromSource(bottom_right), roles)
+            return
+        for row in rows:
+            position = self.proxy_row(row)
+            if position >= 0:
+                self.dataChanged.emit(self.index(position, top_left.column()), self.index(position, bottom_right.column()), roles)
+
+    def _on_rows_about_to_be_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+        elif first < self.sourceModel().rowCount():
+            # Réinsertion au milieu (annulation) : l'ordre affiché est recalculé.
+            self._pending_reset = True
+            self.beginResetModel()
+
+    def _on_rows_inserted(self, parent, first, last):
+        self._generation += 1
+        model = self.sourceModel()
+        appended = last == model.rowCount() - 1
+        for prop_name, keys in list(self._sort_keys.items()):
+            if appended:
+                numeric = model.get_column_types().get(prop_name) == 'int'
+                keys.extend(sort_key(model.get_value(row, prop_name, None), numeric) for row in range(first, last + 1))
+            else: del self._sort_keys[prop_name]
+        for prop_name, index in self._indexes.items():
+            for row in range(first, last + 1):
+                index.update(model.row_id(row), model.get_value(row, prop_name, None))
+        if self._rows is None:
+            self.endInsertRows()
+        elif self._pending_reset:
+            self._pending_reset = False
+            self._apply()
+            self.endResetModel()
+        else:
+            # Lignes ajoutées en fin de tableau : affichées en bas, sans retrier.
+            new_rows = [row for row in range(first, last + 1) if self._matches(row)]
+            if new_rows:
+                self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(new_rows) - 1)
+                self._rows.extend(new_rows)
+                self._positions = None
+                self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        model = self.sourceModel()
+        for index in self._indexes.values():
+            for row in range(first, last + 1): index.remove(model.row_id(row))
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        positions = sorted(position for position in map(self.proxy_row, range(first, last + 1)) if position >= 0)
+        if positions and positions[-1] - positions[0] + 1 == len(positions):
+            self.beginRemoveRows(QModelIndex(), positions[0], positions[-1])
+            self._pending_reset = False
+        elif positions:
+            self._pending_reset = True
+            self.beginResetModel()
+        self._removed_positions = positions
+
+    def _on_rows_removed(self, parent, first, last):
+        self._generation += 1
+        for keys in self._sort_keys.values(): del keys[first:last + 1]
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+        count = last - first + 1
+        self._rows = [row - count if row > last else row for row in self._rows if not first <= row <= last]
+        self._positions = None
+        if not self._removed_positions: return
+        if self._pending_reset:
+            self._pending_reset = False
+            self.endResetModel()
+        else:
+            self.endRemoveRows()
+
+    def _on_columns_about_to_be_inserted(self, parent, first, last):
+        self.beginInsertColumns(QModelIndex(), first, last)
+
+    def _on_columns_inserted(self, parent, first, last):
+        self.endInsertColumns()
+
+    def _on_model_reset(self):
+        self._sort_keys, self._indexes = {}, {}
+        self._generation += 1
+        self._apply()
+        self.endResetModel()
@@ -0,0 +1,227 @@
+# src/schema.py
+import re
+from datetime import date
+
+# Types de colonne reconnus. 'string' n'impose rien.
+TYPES = ('int', 'float', 'bool', 'date', 'url', 'enum', 'string')
+ENUM_MAX_VALUES = 12  # Au-delà, une colonne de texte n'est pas considérée comme une liste de choix
+ENUM_MIN_REPEAT = 3   # Chaque valeur d'une liste de choix apparaît en moyenne au moins autant de fois
+
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?$')
+_URL = re.compile(r'^https?://\S+$', re.IGNORECASE)
+_TRUE = {'true', 'vrai', 'oui', '1'}
+_FALSE = {'false', 'faux', 'non', '0'}
+_NUMBER_TYPES = ('int', 'float', 'bool')
+
+
+def _is_date(text):
+    if not _DATE.match(text): return False
+    try:
+        date.fromisoformat(text[:10])
+        return True
+    except ValueError:
+        return False
+
+
+class ColumnSchema:
+    """
+    Type d'une colonne, déduit des valeurs du fichier ou imposé par la configuration ('types'
+    de FILES). convert transforme une saisie en valeur typée ; problem signale une valeur qui
+    ne convient pas. Les deux se font en temps constant (expression régulière, ensemble).
+    """
+    __slots__ = ('name', 'type', 'choices', 'explicit')
+
+    def __init__(self, name, type_='string', choices=None, explicit=False):
+        self.name = name
+        self.type = type_
+        self.choices = frozenset(choices) if choices else frozenset() # Valeurs d'une colonne 'enum'
+        self.explicit = explicit
+
+    def __repr__(self): return f"ColumnSchema({self.name!r}, {self.type!r})"
+
+    def convert(self, value):
+        """
+        Valeur saisie (texte du tableau ou de la fiche, ou valeur déjà typée) -> valeur à écrire.
+        Une saisie vide efface la valeur (None) dans une colonne numérique ou booléenne.
+        Lève ValueError avec un message pour l'utilisateur si la valeur ne convient pas au type.
+        """
+        kind = self.type
+        if value is None or kind in ('string', 'enum'): return value
+        if isinstance(value, str):
+            text = value.strip()
+            if not text: return None if kind in _NUMBER_TYPES else value
+            if kind == 'int':
+                try: return int(text)
+                except ValueError: raise ValueError(f"« {value} » n'est pas un nombre entier.")
+            if kind == 'float':
+                text = text.replace(',', '.').replace(' ', '')
+                try: return int(text)
+                except ValueError: pass
+                try: return float(text)
+                except ValueError: raise ValueError(f"« {value} » n'est pas un nombre.")
+            if kind == 'bool':
+                if text.lower() in _TRUE: return True
+                if text.lower() in _FALSE: return False
+                raise ValueError(f"« {value} » n'est pas une valeur oui/non.")
+            if kind == 'date' and not _is_date(text): raise ValueError(f"« {value} » n'est pas une date (AAAA-MM-JJ).")
+            if kind == 'url' and not _URL.match(text): raise ValueError(f"« {value} » n'est pas une adresse web (http:// ou https://).")
+            return value
+        message = self.problem(value)
+        if message: raise ValueError(message)
+        return value
+
+    def problem(self, value):
+        """Message décrivant pourquoi une valeur du fichier ne convient pas, ou None."""
+        kind = self.type
+        if value is None or value == "" or kind == 'string': return None
+        if kind == 'int':
+            if type(value) is int: return None
+            return f"« {value} » n'est pas un nombre entier."
+        if kind == 'float':
+            if type(value) in (int, float): return None
+            return f"« {value} » n'est pas un nombre."
+        if kind == 'bool':
+            return None if type(value) is bool else f"« {value} » n'est pas une valeur oui/non."
+        if not isinstance(value, str): return f"« {value} » n'est pas du texte."
+        if kind == 'date': return None if _is_date(value.strip()) else f"« {value} » n'est pas une date (AAAA-MM-JJ)."
+        if kind == 'url': return None if _URL.match(value.strip()) else f"« {value} » n'est pas une adresse web."
+        if kind == 'enum': return None if value in self.choices else f"« {value} » ne fait pas partie des valeurs habituelles."
+        return None
+
+
+class ColumnInference:
+    """
+    Déduction du type d'une colonne lot par lot (voir infer_column), en mémoire bornée : les
+    types Python présents, et pour le texte, les valeurs distinctes tant qu'elles peuvent encore
+    former une liste de choix ; au-delà, seulement si toutes sont des dates ou des adresses web.
+    """
+    __slots__ = ('name', 'kinds', 'texts', 'filled', 'distinct', 'dates', 'urls')
+
+    def __init__(self, name):
+        self.name = name
+        self.kinds = set()
+        self.texts = False # Au moins un texte non vide
+        self.filled = 0    # Nombre de textes non vides
+        self.distinct = set() # Textes non vides distincts, None au-delà de ENUM_MAX_VALUES
+        self.dates = self.urls = True
+
+    def add(self, values):
+        """Ajoute un lot de valeurs de la colonne (None et lignes absentes sont ignorés)."""
+        kinds = set(map(type, values))
+        self.kinds |= kinds
+        if str not in kinds: return
+        texts = [value for value in values if type(value) is str and value]
+        if not texts: return
+        self.texts = True
+        self.filled += len(texts)
+        new = set(texts) if self.distinct is None else set(texts) - self.distinct
+        if self.dates: self.dates = all(map(_is_date, new))
+        if self.urls: self.urls = all(map(_URL.match, new))
+        if self.distinct is not None:
+            self.distinct |= new
+            if len(self.distinct) > ENUM_MAX_VALUES: self.distinct = None
+
+    def result(self):
+        kinds = self.kinds - {type(None)}
+        # Chaînes vides d'une colonne numérique ou booléenne (lignes ajoutées, voir insert_rows) : sans valeur.
+        if str in kinds and len(kinds) > 1 and not self.texts: kinds.discard(str)
+        name = self.name
+        if not kinds: return ColumnSchema(name)
+        if kinds == {int}: return ColumnSchema(name, 'int')
+        if kinds <= {int, float}: return ColumnSchema(name, 'float')
+        if kinds == {bool}: return ColumnSchema(name, 'bool')
+        if kinds != {str} or not self.texts: return ColumnSchema(name) # Valeurs mélangées ou composées (listes, objets)
+        if self.dates: return ColumnSchema(name, 'date')
+        if self.urls: return ColumnSchema(name, 'url')
+        if self.distinct is not None and self.filled >= ENUM_MIN_REPEAT * len(self.distinct):
+            return ColumnSchema(name, 'enum', self.distinct)
+        return ColumnSchema(name)
+
+
+def infer_column(name, values):
+    """Déduit le type d'une colonne d'après toutes ses valeurs."""
+    inference = ColumnInference(name)
+    inference.add(values)
+    return inference.result()
+
+
+class SchemaInference:
+    """
+    Déduction du schéma d'un fichier au fil de sa lecture : lots de colonnes ({propriété: valeurs})
+    ou lots de features. Permet de le déduire dans le thread de chargement.
+    """
+    def __init__(self):
+        self._columns = {}
+
+    def add(self, column_values):
+        for name, values in column_values.items():
+            inference = self._columns.get(name)
+            if inference is None: inference = self._columns[name] = ColumnInference(name)
+            inference.add(values)
+
+    def add_features(self, features):
+        column_values = {}
+        for feature in features:
+            properties = feature.get('properties')
+            if isinstance(properties, dict):
+                for name, value in properties.items(): column_values.setdefault(name, []).append(value)
+        self.add(column_values)
+
+    def schema(self, headers, column_types=None):
+        """{propriété: ColumnSchema} ; les types imposés par la configuration ('types') priment."""
+        column_types = column_types or {}
+        schema = {}
+        for name in headers:
+            if column_types.get(name) in TYPES: schema[name] = ColumnSchema(name, column_types[name], explicit=True)
+            else: schema[name] = self._columns[name].result() if name in self._columns else ColumnSchema(name)
+        return schema
+
+
+def infer_schema(headers, column_chunks, column_types=None):
+    """
+    Schéma d'un fichier : {propriété: ColumnSchema}. 'column_chunks(propriétés)' parcourt les
+    lignes par lots de colonnes ({propriété: valeurs}) ; les types imposés par la configuration
+    ('types') priment et leurs colonnes ne sont pas lues.
+    """
+    column_types = column_types or {}
+    inference = SchemaInference()
+    for column_values in column_chunks([name for name in headers if column_types.get(name) not in TYPES]):
+        inference.add(column_values)
+    return inference.schema(headers, column_types)
+
+
+def validate_columns(schema, column_chunks, row_filter=None):
+    """
+    Contrôle de toutes les lignes, colonne par colonne : dans chaque lot de lignes parcouru par
+    'column_chunks' (voir infer_schema), chaque valeur distincte n'est vérifiée qu'une fois.
+    Renvoie [(propriété, gravité, message, lignes)] pour les valeurs qui ne conviennent pas ; une
+    valeur inhabituelle d'une liste de choix ('enum') n'est qu'un avertissement.
+    'row_filter(ligne)' limite éventuellement le rapport à certaines lignes.
+    """
+    checked = [name for name, column in schema.items() if column.type != 'string']
+    found = {} # (propriété, message) -> lignes
+    first = 0
+    for column_values in column_chunks(checked):
+        count = 0
+        for name in checked:
+            column, values = schema[name], column_values[name]
+            count = len(values)
+            try:
+                # Clés (type, valeur) : 1 et True, égaux pour Python, sont des valeurs différentes ici.
+                bad = {key: message for key in set(zip(map(type, values), values)) if (message := column.problem(key[1]))}
+            except TypeError: # Valeurs non hachables (listes, objets) : vérifiées une à une
+                bad = None
+            if bad is None:
+                for row, value in enumerate(values, first):
+                    message = column.problem(value)
+                    if message: found.setdefault((name, message), []).append(row)
+            elif bad:
+                for row, key in enumerate(zip(map(type, values), values), first):
+                    if key in bad: found.setdefault((name, bad[key]), []).append(row)
+        first += count
+    order = {name: position for position, name in enumerate(checked)}
+    problems = []
+    for (name, message), rows in sorted(found.items(), key=lambda item: order[item[0][0]]): # Tri stable
+        if row_filter is not None: rows = [row for row in rows if row_filter(row)]
+        if rows: problems.append((name, 'warning' if schema[name].type == 'enum' else 'error', message, rows))
+    return problems
@@ -0,0 +1,39 @@
+# src/session.py
+from models import GeoJsonTableModel
+from spatial import FeatureSpatialIndex
+from merge import DEFAULT_KEY
+
+
+class EditSession:
+    """
+    État d'édition d'un fichier de la configuration (entrée de FILES) : son modèle,
+    et donc son journal de modifications, reste en mémoire quand l'utilisateur passe
+    à un autre fichier, ce qui permet de publier plusieurs fichiers en un seul commit.
+    """
+    def __init__(self, file_info):
+        self.file_info = file_info
+        self.model = GeoJsonTableModel()
+        self.model.merge_key = self.merge_key
+        self.spatial_index = FeatureSpatialIndex(self.model)
+        self.loaded = False
+
+    @property
+    def path(self): return self.file_info['path']
+
+    @property
+    def name(self): return self.file_info['name']
+
+    @property
+    def column_types(self): return self.file_info.get('types', {})
+
+    @property
+    def merge_key(self): return self.file_info.get('key', DEFAULT_KEY)
+
+    def has_changes(self):
+        return self.loaded and self.model.journal.has_changes()
+
+    def change_count(self):
+        return self.model.journal.count() if self.loaded else 0
+
+    def change_summary(self):
+        return self.model.journal.summary()
@@ -0,0 +1,15 @@
+# src/settings.py
+import json
+import os
+
+# Emplacement de la configuration, sans dépendance à Qt (contrôleur, cache de lecture, mode batch).
+# Le dossier n'est créé qu'au premier enregistrement.
+APP_NAME = "EditeurGeoJSON"
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), f".{APP_NAME}")
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+# Délai maximal (en secondes) des opérations réseau de vérification ; option GIT_TIMEOUT de la configuration.
+DEFAULT_GIT_TIMEOUT = 15
+
+def save_config(config):
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    with open(CONFIG_FILE, 'w') as f: json.dump(config, f, indent=4)
@@ -0,0 +1,232 @@
+# src/spatial.py
+import math
+from heapq import heappush, heapreplace, nsmallest
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+DEFAULT_CELL_SIZE = 0.01 # degrés (environ 1 km), quand l'index est construit vide
+POINTS_PER_CELL = 8      # densité visée quand la taille des cellules est calculée à la construction
+
+
+def _positions(coordinates):
+    """Positions [x, y, ...] contenues dans des coordonnées GeoJSON, quelle que soit leur profondeur."""
+    if isinstance(coordinates, (list, tuple)) and coordinates:
+        if isinstance(coordinates[0], (int, float)):
+            if len(coordinates) >= 2: yield coordinates
+        else:
+            for part in coordinates: yield from _positions(part)
+
+
+def geometry_bounds(geometry):
+    """Emprise (xmin, ymin, xmax, ymax) d'une géométrie GeoJSON, ou None si elle n'a pas de coordonnées."""
+    if not isinstance(geometry, dict): return None
+    if geometry.get('type') == 'GeometryCollection':
+        bounds = [b for b in map(geometry_bounds, geometry.get('geometries') or ()) if b]
+        if not bounds: return None
+        xmins, ymins, xmaxs, ymaxs = zip(*bounds)
+        return min(xmins), min(ymins), max(xmaxs), max(ymaxs)
+    xs, ys = [], []
+    for position in _positions(geometry.get('coordinates')):
+        xs.append(position[0])
+        ys.append(position[1])
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+
+def representative_point(geometry):
+    """
+    Point (x, y) qui représente une géométrie dans l'index : le point lui-même, ou le centre
+    de l'emprise pour les autres types. None pour une géométrie absente ou vide.
+    """
+    if isinstance(geometry, dict) and geometry.get('type') == 'Point':
+        coordinates = geometry.get('coordinates')
+        if isinstance(coordinates, (list, tuple)) and len(coordinates) >= 2:
+            x, y = coordinates[0], coordinates[1]
+            if isinstance(x, (int, float)) and isinstance(y, (int, float)): return float(x), float(y)
+        return None
+    bounds = geometry_bounds(geometry)
+    if bounds is None: return None
+    return (bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2
+
+
+def distance_m(x1, y1, x2, y2):
+    """Distance en mètres entre deux points lon/lat (WGS84, formule de haversine)."""
+    phi1, phi2 = math.radians(y1), math.radians(y2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(x2 - x1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """
+    Index spatial en grille régulière sur des points lon/lat, indexés par identifiant stable
+    de ligne. Chaque cellule (cell_size degrés de côté) liste ses identifiants : une requête
+    ne parcourt que les cellules qui recoupent la zone demandée. Ajout et retrait d'un point
+    en temps constant ; la taille des cellules est choisie à la construction d'après la densité.
+    """
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}   # (i, j) -> liste d'identifiants
+        self._points = {}  # identifiant -> (x, y)
+        self._extent = None # (imin, jmin, imax, jmax) des cellules utilisées (jamais réduite)
+
+    def __len__(self): return len(self._points)
+
+    @classmethod
+    def build(cls, items):
+        """Construit l'index à partir de couples (identifiant, (x, y) ou None)."""
+        items = [(row_id, point) for row_id, point in items if point is not None]
+        index = cls()
+        if len(items) > POINTS_PER_CELL:
+            xs = [point[0] for _, point in items]
+            ys = [point[1] for _, point in items]
+            area = max(max(xs) - min(xs), 1e-6) * max(max(ys) - min(ys), 1e-6)
+            index.cell_size = max(math.sqrt(area * POINTS_PER_CELL / len(items)), 1e-5)
+        for row_id, point in items: index.add(row_id, point)
+        return index
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def point(self, row_id): return self._points.get(row_id)
+
+    def add(self, row_id, point):
+        if row_id in self._points: self.remove(row_id)
+        if point is None: return
+        x, y = point
+        self._points[row_id] = (x, y)
+        i, j = cell = self._cell(x, y)
+        self._cells.setdefault(cell, []).append(row_id)
+        if self._extent is None: self._extent = (i, j, i, j)
+        else:
+            imin, jmin, imax, jmax = self._extent
+            self._extent = (min(imin, i), min(jmin, j), max(imax, i), max(jmax, j))
+
+    def remove(self, row_id):
+        point = self._points.pop(row_id, None)
+        if point is None: return
+        cell = self._cell(*point)
+        row_ids = self._cells[cell]
+        row_ids.remove(row_id)
+        if not row_ids: del self._cells[cell]
+
+    def _scan(self, imin, jmin, imax, jmax):
+        """Identifiants des cellules (i, j) comprises dans la plage donnée."""
+        if self._extent is None: return
+        eimin, ejmin, eimax, ejmax = self._extent
+        imin, jmin, imax, jmax = max(imin, eimin), max(jmin, ejmin), min(imax, eimax), min(jmax, ejmax)
+        if imin > imax or jmin > jmax: return
+        if (imax - imin + 1) * (jmax - jmin + 1) > len(self._cells):
+            # Zone plus grande que la partie occupée de la grille : on parcourt les cellules non vides.
+            for (i, j), row_ids in self._cells.items():
+                if imin <= i <= imax and jmin <= j <= jmax: yield from row_ids
+            return
+        cells = self._cells
+        for i in range(imin, imax + 1):
+            for j in range(jmin, jmax + 1):
+                row_ids = cells.get((i, j))
+                if row_ids: yield from row_ids
+
+    def in_bbox(self, xmin, ymin, xmax, ymax):
+        """Identifiants des points situés dans l'emprise (bornes comprises)."""
+        imin, jmin = self._cell(xmin, ymin)
+        imax, jmax = self._cell(xmax, ymax)
+        points = self._points
+        result = []
+        for row_id in self._scan(imin, jmin, imax, jmax):
+            x, y = points[row_id]
+            if xmin <= x <= xmax and ymin <= y <= ymax: result.append(row_id)
+        return result
+
+    def within_distance(self, x, y, meters):
+        """Couples (distance en mètres, identifiant) des points à moins de 'meters' de (x, y), du plus proche au plus lointain."""
+        dlat = meters / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(y) + dlat, 89.9)))
+        dlon = min(dlat / cos_lat, 180.0)
+        points = self._points
+        result = []
+        for row_id in self._scan(*self._cell(x - dlon, y - dlat), *self._cell(x + dlon, y + dlat)):
+            distance = distance_m(x, y, *points[row_id])
+            if distance <= meters: result.append((distance, row_id))
+        result.sort()
+        return result
+
+    def nearest(self, x, y, count=1):
+        """
+        Couples (distance en mètres, identifiant) des 'count' points les plus proches de (x, y).
+        Les cellules sont parcourues par anneaux autour de celle du point demandé, jusqu'à ce
+        qu'aucune cellule plus lointaine ne puisse contenir un point plus proche.
+        """
+        if not self._points or count <= 0: return []
+        ci, cj = self._cell(x, y)
+        imin, jmin, imax, jmax = self._extent
+        first_ring = max(0, imin - ci, ci - imax, jmin - cj, cj - jmax)
+        last_ring = max(ci - imin, imax - ci, cj - jmin, jmax - cj)
+        if 8 * max(first_ring, 1) > len(self._cells):
+            # Point très éloigné des données ou grille peu remplie : parcours direct.
+            points = self._points
+            return nsmallest(count, ((distance_m(x, y, *points[row_id]), row_id) for row_id in points))
+        # Plus forte latitude en jeu : borne la réduction des degrés de longitude avec la latitude.
+        max_lat = min(max(abs(y), abs(jmin * self.cell_size), abs((jmax + 1) * self.cell_size)), 89.9)
+        ring_meters = self.cell_size * METERS_PER_DEGREE * math.cos(math.radians(max_lat))
+        points, cells = self._points, self._cells
+        best = [] # tas des (-distance, identifiant) retenus
+        for ring in range(first_ring, last_ring + 1):
+            if ring == 0: ring_cells = [(ci, cj)]
+            else:
+                ring_cells = [(i, j) for i in (ci - ring, ci + ring) for j in range(cj - ring, cj + ring + 1)]
+                ring_cells += [(i, j) for j in (cj - ring, cj + ring) for i in range(ci - ring + 1, ci + ring)]
+            for cell in ring_cells:
+                for row_id in cells.get(cell, ()):
+                    distance = distance_m(x, y, *points[row_id])
+                    if len(best) < count: heappush(best, (-distance, row_id))
+                    elif distance < -best[0][0]: heapreplace(best, (-distance, row_id))
+            # Les points des anneaux suivants sont à plus de 'ring' cellules sur un des deux axes.
+            if len(best) == count and -best[0][0] <= ring * ring_meters: break
+        return sorted((-distance, row_id) for distance, row_id in best)
+
+
+class FeatureSpatialIndex:
+    """
+    Index spatial des géométries d'un modèle (GeoJsonTableModel), tenu à jour par ses signaux :
+    lignes ajoutées ou dupliquées, lignes supprimées, annulation. Une réinitialisation du
+    modèle (chargement, suppression massive) invalide la grille, reconstruite à la requête
+    suivante. Les requêtes renvoient des numéros de ligne du modèle.
+    """
+    def __init__(self, model):
+        self.model = model
+        self._grid = None
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.modelReset.connect(self.invalidate)
+
+    def build(self):
+        model = self.model
+        self._grid = GridIndex.build((model.row_id(row), model.get_point(row)) for row in range(model.rowCount()))
+        return self._grid
+
+    def invalidate(self): self._grid = None
+
+    def grid(self): return self._grid if self._grid is not None else self.build()
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self._grid is None: return
+        for row in range(first, last + 1): self._grid.add(self.model.row_id(row), self.model.get_point(row))
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        if self._grid is None: return
+        for row in range(first, last + 1): self._grid.remove(self.model.row_id(row))
+
+    def point(self, row):
+        """Point (x, y) d'une ligne tel qu'indexé, ou None."""
+        return self.grid().point(self.model.row_id(row))
+
+    def in_bbox(self, xmin, ymin, xmax, ymax):
+        """Lignes dont le point est dans l'emprise, dans l'ordre du tableau."""
+        return sorted(map(self.model.row_of, self.grid().in_bbox(xmin, ymin, xmax, ymax)))
+
+    def within_distance(self, x, y, meters):
+        """Couples (distance en mètres, ligne) à moins de 'meters' de (x, y), du plus proche au plus lointain."""
+        return [(distance, self.model.row_of(row_id)) for distance, row_id in self.grid().within_distance(x, y, meters)]
+
+    def nearest(self, x, y, count=1):
+        """Couples (distance en mètres, ligne) des 'count' lignes les plus proches de (x, y)."""
+        return [(distance, self.model.row_of(row_id)) for distance, row_id in self.grid().nearest(x, y, count)]
@@ -0,0 +1,43 @@
+# src/startup.py
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from logging_setup import logger
+from settings import CONFIG_DIR
+
+# Durée visée entre le début de main.py et la fenêtre affichée (postes de terrain peu puissants).
+TARGET_MS = 1500
+REPORT_FILE = os.path.join(CONFIG_DIR, "startup.json")
+
+_START = time.perf_counter()
+_phases = [] # (nom, début, durée) en secondes depuis _START
+
+
+@contextmanager
+def phase(name):
+    """Mesure une étape du démarrage (imports, construction de la fenêtre...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, start - _START, time.perf_counter() - start))
+
+
+def report():
+    """
+    Journalise la durée de chaque étape et le total depuis le début de main.py, avec un avertissement
+    au-delà de TARGET_MS. Le détail est aussi écrit dans REPORT_FILE si l'application est configurée.
+    """
+    total_ms = (time.perf_counter() - _START) * 1000
+    phases = [{"name": name, "start_ms": round(start * 1000, 1), "duration_ms": round(duration * 1000, 1)} for name, start, duration in _phases]
+    details = ", ".join(f"{p['name']} {p['duration_ms']:.0f} ms" for p in phases)
+    if total_ms > TARGET_MS: logger.warning(f"Démarrage en {total_ms:.0f} ms (cible : {TARGET_MS} ms) : {details}")
+    else: logger.info(f"Démarrage en {total_ms:.0f} ms : {details}")
+    if os.path.isdir(CONFIG_DIR):
+        try:
+            with open(REPORT_FILE, 'w') as f: json.dump({"total_ms": round(total_ms, 1), "target_ms": TARGET_MS, "phases": phases}, f, indent=2)
+        except OSError as e:
+            logger.warning(f"Rapport de démarrage non écrit : {e}")
+    return total_ms
@@ -1,6 +1,6 @@
 # src/ui_main_window.py
 from PySide6.QtCore import QCoreApplication, Qt
-from PySide6.QtGui import QAction, QIcon
+from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QToolBar, QTableView, QStackedWidget,
     QPushButton, QLabel, QMenuBar, QSpacerItem, QSizePolicy, QFormLayout, QStyle
@@ -62,18 +62,6 @@ class Ui_MainWindow(object):
         welcome_layout.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
         self.main_stacked_widget.addWidget(self.welcome_page)
 
-        # --- Page d'Édition (index 1) ---
-        # (Aucun changement dans cette section)
-        self.editor_page = QWidget()
-        editor_page_layout = QVBoxLayout(self.editor_page)
-        self.editor_title_label = QLabel("<h2></h2>") 
-        editor_page_layout.addWidget(self.editor_title_label)
-        self.editor_stacked_widget = QStackedWidget()
-        editor_page_layout.addWidget(self.editor_stacked_widget)
-        self.table_view_page = QWidget(); table_layout = QVBoxLayout(self.table_view_page); table_layout.setContentsMargins(0,0,0,0); self.table_view = QTableView(); self.add_button = QPushButton("Ajouter une ligne"); table_layout.addWidget(self.table_view); table_layout.addWidget(self.add_button, 0, Qt.AlignmentFlag.AlignLeft); self.editor_stacked_widget.addWidget(self.table_view_page)
-        self.form_view_page = QWidget(); form_page_layout = QVBoxLayout(self.form_view_page); self.form_scroll_area = QWidget(); self.form_layout = QFormLayout(self.form_scroll_area); form_page_layout.addWidget(self.form_scroll_area); nav_layout = QHBoxLayout(); self.form_prev_button = QPushButton("Précédent"); self.form_next_button = QPushButton("Suivant"); self.form_nav_label = QLabel("Fiche 1 / 10"); nav_layout.addStretch(); nav_layout.addWidget(self.form_prev_button); nav_layout.addWidget(self.form_nav_label); nav_layout.addWidget(self.form_next_button); nav_layout.addStretch(); form_page_layout.addLayout(nav_layout); self.editor_stacked_widget.addWidget(self.form_view_page)
-        self.main_stacked_widget.addWidget(self.editor_page)
-        
         # --- Barres, Menus, etc. (Aucun changement ici non plus) ---
         self.status_label = QLabel(); MainWindow.statusBar().addWidget(self.status_label); self.menubar = QMenuBar(); MainWindow.setMenuBar(self.menubar)
         style = MainWindow.style(); self.actionViewTable = QAction("Vue Tableau", MainWindow); self.actionViewTable.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView)); self.actionViewTable.setCheckable(True); self.actionViewForm = QAction("Vue Fiche", MainWindow); self.actionViewForm.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_FileDialogInfoView)); self.actionViewForm.setCheckable(True)
@@ -83,9 +71,23 @@ class Ui_MainWindow(object):
         self.menuAide = self.menubar.addMenu("&Aide"); self.actionAPropos = QAction("À &propos...", MainWindow); self.menuAide.addAction(self.actionAPropos)
         
         # --- Attribution des widgets ---
-        MainWindow.main_stacked_widget = self.main_stacked_widget; MainWindow.welcome_stacked_widget = self.welcome_stacked_widget; MainWindow.connection_status_label = self.connection_status_label; MainWindow.welcome_config_button = self.welcome_config_button; MainWindow.welcome_buttons_layout = self.welcome_buttons_layout; MainWindow.editor_stacked_widget = self.editor_stacked_widget; MainWindow.editor_title_label = self.editor_title_label; MainWindow.table_view = self.table_view; MainWindow.add_button = self.add_button; MainWindow.form_layout = self.form_layout; MainWindow.form_prev_button = self.form_prev_button; MainWindow.form_next_button = self.form_next_button; MainWindow.form_nav_label = self.form_nav_label; MainWindow.status_label = self.status_label; MainWindow.actionAccueil = self.actionAccueil; MainWindow.actionEnregistrer = self.actionEnregistrer; MainWindow.actionQuitter = self.actionQuitter; MainWindow.actionConfigurer = self.actionConfigurer; MainWindow.actionAPropos = self.actionAPropos; MainWindow.actionViewTable = self.actionViewTable; MainWindow.actionViewForm = self.actionViewForm
+        MainWindow.main_stacked_widget = self.main_stacked_widget; MainWindow.welcome_stacked_widget = self.welcome_stacked_widget; MainWindow.connection_status_label = self.connection_status_label; MainWindow.welcome_config_button = self.welcome_config_button; MainWindow.welcome_buttons_layout = self.welcome_buttons_layout; MainWindow.status_label = self.status_label; MainWindow.actionAccueil = self.actionAccueil; MainWindow.actionEnregistrer = self.actionEnregistrer; MainWindow.actionQuitter = self.actionQuitter; MainWindow.actionConfigurer = self.actionConfigurer; MainWindow.actionAPropos = self.actionAPropos; MainWindow.actionViewTable = self.actionViewTable; MainWindow.actionViewForm = self.actionViewForm
         
         self.retranslateUi(MainWindow)
 
+    def setupEditorUi(self, MainWindow):
+        # --- Page d'Édition (index 1) ---
+        # Construite à la première ouverture d'un fichier (voir MainWindow.ensure_editor) : la page d'accueil s'affiche plus tôt.
+        self.editor_page = QWidget()
+        editor_page_layout = QVBoxLayout(self.editor_page)
+        self.editor_title_label = QLabel("<h2></h2>") 
+        editor_page_layout.addWidget(self.editor_title_label)
+        self.editor_stacked_widget = QStackedWidget()
+        editor_page_layout.addWidget(self.editor_stacked_widget)
+        self.table_view_page = QWidget(); table_layout = QVBoxLayout(self.table_view_page); table_layout.setContentsMargins(0,0,0,0); self.table_view = QTableView(); self.add_button = QPushButton("Ajouter une ligne"); table_layout.addWidget(self.table_view); table_layout.addWidget(self.add_button, 0, Qt.AlignmentFlag.AlignLeft); self.editor_stacked_widget.addWidget(self.table_view_page)
+        self.form_view_page = QWidget(); form_page_layout = QVBoxLayout(self.form_view_page); self.form_scroll_area = QWidget(); self.form_layout = QFormLayout(self.form_scroll_area); form_page_layout.addWidget(self.form_scroll_area); nav_layout = QHBoxLayout(); self.form_prev_button = QPushButton("Précédent"); self.form_next_button = QPushButton("Suivant"); self.form_nav_label = QLabel("Fiche 1 / 10"); nav_layout.addStretch(); nav_layout.addWidget(self.form_prev_button); nav_layout.addWidget(self.form_nav_label); nav_layout.addWidget(self.form_next_button); nav_layout.addStretch(); form_page_layout.addLayout(nav_layout); self.editor_stacked_widget.addWidget(self.form_view_page)
+        self.main_stacked_widget.addWidget(self.editor_page)
+        MainWindow.editor_stacked_widget = self.editor_stacked_widget; MainWindow.editor_title_label = self.editor_title_label; MainWindow.table_view = self.table_view; MainWindow.add_button = self.add_button; MainWindow.form_layout = self.form_layout; MainWindow.form_prev_button = self.form_prev_button; MainWindow.form_next_button = self.form_next_button; MainWindow.form_nav_label = self.form_nav_label
+
     def retranslateUi(self, MainWindow):
         MainWindow.setWindowTitle(QCoreApplication.translate("MainWindow", "Éditeur GeoJSON", None))
\ No newline at end of file
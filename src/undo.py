@@ -0,0 +1,86 @@
+# src/undo.py
+from PySide6.QtGui import QUndoCommand
+
+# État du journal d'une ligne qui n'existait pas encore (voir ChangeJournal.row_state).
+_NEW_ROW = (None, False, None)
+
+
+class _RowsCommand(QUndoCommand):
+    """
+    Opération annulable sur des lignes repérées par leur identifiant stable (GeoJsonTableModel._row_ids).
+    Seul l'inverse de l'opération est conservé (anciennes valeurs, lignes retirées), jamais
+    une copie du fichier, ainsi que l'état du journal de ces lignes avant et après : annuler
+    puis refaire restitue exactement le décompte des modifications.
+    """
+    def __init__(self, model, text):
+        super().__init__(text)
+        self.model = model
+        self._before = None # {row_id: état du journal}, relevé par apply()
+        self._after = None
+
+    def redo(self):
+        journal = self.model.journal
+        if self._after is None: # Première exécution : l'opération est journalisée normalement
+            self.apply()
+            self._after = {row_id: journal.row_state(row_id) for row_id in self._before}
+        else:
+            self.reapply()
+            journal.set_row_states(self._after)
+
+    def undo(self):
+        self.unapply()
+        self.model.journal.set_row_states(self._before)
+
+
+class EditCommand(_RowsCommand):
+    """Modification de cellules d'une ligne ({propriété: valeur déjà convertie})."""
+    def __init__(self, model, row, values, text):
+        super().__init__(model, text)
+        self.row_id = model.row_id(row)
+        self.values = values
+        self.old_values = None
+
+    def apply(self):
+        self._before = {self.row_id: self.model.journal.row_state(self.row_id)}
+        self.old_values = self.model._write_values(self.model.row_of(self.row_id), self.values, record=True)
+
+    def reapply(self): self.model._write_values(self.model.row_of(self.row_id), self.values)
+    def unapply(self): self.model._write_values(self.model.row_of(self.row_id), self.old_values)
+
+
+class InsertCommand(_RowsCommand):
+    """Ajout de lignes en fin de tableau. Annuler les retire en gardant leurs features pour refaire."""
+    def __init__(self, model, features, text):
+        super().__init__(model, text)
+        self.features = features
+        self.row_ids = None
+
+    def apply(self):
+        self.row_ids = self.model._append_new_rows(self.features)
+        self._before = dict.fromkeys(self.row_ids, _NEW_ROW)
+        self.features = None
+
+    def reapply(self):
+        self.model._insert_by_id(self.features)
+        self.features = None
+
+    def unapply(self): self.features = self.model._take_ids(self.row_ids)
+
+
+class RemoveCommand(_RowsCommand):
+    """Suppression de lignes. Les features retirées sont gardées jusqu'à ce qu'annuler les réinsère."""
+    def __init__(self, model, rows, text):
+        super().__init__(model, text)
+        self.row_ids = [model.row_id(row) for row in rows]
+        self.features = None
+
+    def apply(self):
+        journal = self.model.journal
+        self._before = {row_id: journal.row_state(row_id) for row_id in self.row_ids}
+        self.features = self.model._take_ids(self.row_ids, record=True)
+
+    def reapply(self): self.features = self.model._take_ids(self.row_ids)
+
+    def unapply(self):
+        self.model._insert_by_id(self.features)
+        self.features = None
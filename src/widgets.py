@@ -1,10 +1,12 @@
 # src/widgets.py
 import sys
 import os
-from PySide6.QtWidgets import QStyledItemDelegate, QStyle, QApplication, QStyleOptionButton
-from PySide6.QtCore import QRect
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle, QApplication, QStyleOptionButton, QLabel
+from PySide6.QtCore import QRect, QEvent, QTimer, Qt
 from PySide6.QtGui import QIcon
 
+import profiling
+
 def resource_path(relative_path):
     """
     Obtient le chemin absolu de la ressource, fonctionne pour le développement
@@ -70,4 +72,56 @@ class ButtonDelegate(QStyledItemDelegate):
         # Utiliser le style de l'application pour dessiner les contrôles
         style = option.widget.style() if option.widget else QApplication.style()
         style.drawControl(QStyle.ControlElement.CE_PushButton, edit_option, painter)
-        style.drawControl(QStyle.ControlElement.CE_PushButton, delete_option, painter)
\ No newline at end of file
+        style.drawControl(QStyle.ControlElement.CE_PushButton, delete_option, painter)
+
+
+class PerformanceOverlay(QLabel):
+    """
+    Panneau des mesures internes (voir profiling.py) affiché par-dessus la fenêtre et rafraîchi
+    chaque seconde. Il compte aussi les repeintes des widgets surveillés (watch_paints), pour
+    rapporter le nombre d'appels à data() par repeinte du tableau.
+    """
+    REFRESH_MS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: white; font-family: monospace; padding: 6px;")
+        self._previous = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_active(self, active):
+        """Active les mesures et affiche le panneau, ou l'inverse."""
+        profiling.enable(active)
+        if active:
+            self._previous = profiling.snapshot()[1]
+            self._timer.start()
+            self.refresh()
+            self.show()
+            self.raise_()
+        else:
+            self._timer.stop()
+            self.hide()
+
+    def watch_paints(self, widget): widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint: profiling.count('table.paint')
+        return False
+
+    def refresh(self):
+        counters = profiling.snapshot()[1]
+        lines = profiling.summary(self._previous, self.REFRESH_MS / 1000)
+        paints = counters.get('table.paint', 0) - self._previous.get('table.paint', 0)
+        if paints:
+            data_calls = counters.get('model.data', 0) - self._previous.get('model.data', 0)
+            lines.append(f"data() par repeinte : {data_calls / paints:.0f}")
+        self._previous = counters
+        self.setText("\n".join(lines) or "Aucune mesure pour l'instant.")
+        self.adjustSize()
+        parent = self.parentWidget()
+        self.move(max(parent.width() - self.width() - 10, 0), 60)
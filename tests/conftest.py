@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Les modules de l'application s'importent par leur nom, comme depuis src/ (voir benchmarks/run_benchmarks.py).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,46 @@
+# tests/test_connection.py
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # Pas d'affichage nécessaire
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+git = pytest.importorskip("git")
+
+import controller as controller_module
+import git_handler
+
+
+def _wait(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize('hangs', [False, True])
+def test_connection_check_is_abandoned_at_the_deadline(tmp_path, monkeypatch, hangs):
+    # QApplication : les tests de widgets qui suivent ne peuvent pas partager une QCoreApplication.
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    git.Repo.init(tmp_path)
+    # git qui ne répond pas et ne peut pas être interrompu (Windows) : seul le contrôleur impose le délai.
+    monkeypatch.setattr(git_handler.GitHandler, 'test_connection', lambda self, timeout: time.sleep(1.0 if hangs else 0) or True)
+    monkeypatch.setattr(controller_module, 'CONNECTION_GRACE', 0)
+    controller = controller_module.AppController()
+    controller.config = {"LOCAL_REPO_PATH": str(tmp_path), "GIT_TIMEOUT": 0.2}
+    statuses = []
+    controller.connection_status_changed.connect(lambda success, message: statuses.append((success, message)))
+    started = time.monotonic()
+    controller.initialize_repo()
+    assert _wait(app, lambda: statuses)
+    if not hangs:
+        assert statuses == [(True, "Connecté au dépôt")] and not controller.connection_timer.isActive()
+        return
+    assert time.monotonic() - started < 1.0
+    assert not statuses[0][0] and "0.2 s" in statuses[0][1]
+    assert controller.connection_worker is None and controller.git_handler is not None
+    # Le résultat tardif de la vérification abandonnée est ignoré.
+    assert _wait(app, lambda: not controller._abandoned_checks)
+    assert len(statuses) == 1
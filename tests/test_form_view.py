@@ -0,0 +1,95 @@
+# tests/test_form_view.py
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # Pas d'affichage nécessaire
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+QtTest = pytest.importorskip("PySide6.QtTest")
+
+from form_view import FeatureForm
+
+DELAY = FeatureForm.COMMIT_DELAY_MS
+
+
+@pytest.fixture
+def form():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    form = FeatureForm()
+    form.resize(400, 200)
+    form.show()
+    app.processEvents()
+    committed = []
+    form.edits_committed.connect(lambda key, edits: committed.append((key, edits)))
+    form.committed = committed
+    yield form
+    form.close()
+    form.deleteLater()
+
+
+def _type(form, prop_name, text):
+    """Saisie dans un champ, comme au clavier (textEdited)."""
+    editor = form.editor(prop_name)
+    editor.setText(text)
+    editor.textEdited.emit(text)
+
+
+def _wait_until(condition, timeout):
+    deadline = time.monotonic() + timeout / 1000
+    while not condition() and time.monotonic() < deadline: QtTest.QTest.qWait(10)
+    return condition()
+
+
+def test_fields_are_created_when_scrolled_into_view(form):
+    headers = [f"champ_{i:03d}" for i in range(300)]
+    form.set_schema(headers, {})
+    assert form.editor(headers[0]) is not None
+    assert form.editor(headers[-1]) is None
+    scroll_bar = form.verticalScrollBar()
+    scroll_bar.setRange(0, 1_000_000)
+    scroll_bar.setValue(scroll_bar.maximum())
+    assert form.editor(headers[-1]) is not None
+
+
+def test_same_schema_keeps_the_fields(form):
+    form.set_schema(["nom", "n"], {"n": "int"})
+    editor = form.editor("nom")
+    form.set_schema(["nom", "n"], {"n": "int"})
+    assert form.editor("nom") is editor
+    form.set_schema(["nom", "n", "adresse"], {"n": "int"})
+    assert form.editor("nom") is not editor
+
+
+def test_edits_are_committed_together_after_a_pause(form):
+    form.set_schema(["nom", "n"], {"n": "int"})
+    form.bind({"nom": "Cantine", "n": 3}.get, key=7)
+    assert form.editor("n").text() == "3"
+    _type(form, "nom", "Cantine A")
+    QtTest.QTest.qWait(DELAY // 2)
+    _type(form, "n", "4") # Relance l'attente
+    QtTest.QTest.qWait(DELAY // 2)
+    assert form.committed == []
+    assert _wait_until(lambda: form.committed, 5 * DELAY)
+    assert form.committed == [(7, {"nom": "Cantine A", "n": "4"})]
+
+
+def test_editing_finished_commits_at_once(form):
+    form.set_schema(["nom"], {})
+    form.bind({"nom": "Cantine"}.get, key=1)
+    _type(form, "nom", "Cantine B")
+    form.editor("nom").editingFinished.emit()
+    assert form.committed == [(1, {"nom": "Cantine B"})]
+
+
+def test_rebinding_commits_the_previous_feature(form):
+    form.set_schema(["nom"], {})
+    form.bind({"nom": "Cantine"}.get, key=1)
+    _type(form, "nom", "Cantine C")
+    form.bind({"nom": "Autre"}.get, key=2)
+    assert form.committed == [(1, {"nom": "Cantine C"})]
+    assert form.editor("nom").text() == "Autre"
+    form.bind(None)
+    assert not form.editor("nom").isEnabled() and form.editor("nom").text() == ""
+    QtTest.QTest.qWait(2 * DELAY)
+    assert len(form.committed) == 1 # Plus rien en attente
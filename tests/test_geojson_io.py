@@ -0,0 +1,122 @@
+# tests/test_geojson_io.py
+import json
+
+import pytest
+
+from geojson_io import GeoJsonStreamReader, MappedFile, _dumps_spaced, blob_digest, splice_features
+
+_OGR_HEADER = ('{\n"type": "FeatureCollection",\n"name": "cantines",\n'
+               '"crs": { "type": "name", "properties": { "name": "urn:ogc:def:crs:OGC:1.3:CRS84" } },\n'
+               '"features": [\n')
+_FEATURES = [
+    {"type": "Feature", "properties": {"nom": "École Élémentaire", "n": 1}, "geometry": {"type": "Point", "coordinates": [-17.4, 14.7]}},
+    {"type": "Feature", "properties": {"nom": "Cantine « Ndèye » 🍲", "n": 2}, "geometry": None},
+    {"type": "Feature", "properties": {"nom": "plain ascii", "n": 3}, "geometry": {"type": "Point", "coordinates": [1, 2]}},
+]
+
+
+def _ogr_file(tmp_path, newline='\n'):
+    """Fichier au format d'ogr2ogr : une feature par ligne, '{ "a": 1 }'."""
+    text = _OGR_HEADER + ',\n'.join(_dumps_spaced(feature, False) for feature in _FEATURES) + '\n]\n}\n'
+    path = tmp_path / 'cantines.geojson'
+    path.write_bytes(text.replace('\n', newline).encode('utf-8'))
+    return path
+
+
+def _read(path, **options):
+    reader = GeoJsonStreamReader(str(path), **options)
+    features = [feature for batch in reader.iter_batches() for feature in batch]
+    return reader, features
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1 << 20])
+def test_offsets_are_byte_positions_with_multibyte_text(tmp_path, chunk_size):
+    # Petits tampons : des caractères de plusieurs octets sont coupés entre deux lectures.
+    path = _ogr_file(tmp_path)
+    content = path.read_bytes()
+    reader, features = _read(path, chunk_size=chunk_size)
+    assert features == _FEATURES
+    spans = reader.source.spans()
+    assert [json.loads(content[start:end]) for start, end in spans] == _FEATURES
+    assert reader.metadata['name'] == 'cantines' and list(reader.metadata) == ['type', 'name', 'crs', 'features']
+    assert reader.source.digest == blob_digest(content) and reader.source.matches(content)
+    assert not reader.source.ensure_ascii
+
+
+def test_offsets_with_crlf_line_endings(tmp_path):
+    path = _ogr_file(tmp_path, newline='\r\n')
+    content = path.read_bytes()
+    reader, _ = _read(path, chunk_size=5)
+    assert [json.loads(content[start:end]) for start, end in reader.source.spans()] == _FEATURES
+
+
+def test_ascii_escaped_file_is_detected(tmp_path):
+    path = tmp_path / 'ascii.geojson'
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": _FEATURES}, indent=2, ensure_ascii=True))
+    reader, features = _read(path)
+    assert features == _FEATURES and reader.source.ensure_ascii
+
+
+def test_blob_digest_is_the_git_object_id():
+    assert blob_digest(b'') == 'e69de29bb2d1d6434b8b29ae775ad8c2e48c5391'
+    assert blob_digest(b'hello\n') == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+
+def test_mapped_file_decodes_spans(tmp_path):
+    path = _ogr_file(tmp_path)
+    reader, _ = _read(path)
+    mapped = MappedFile(str(path))
+    try:
+        assert [mapped.decode(start, end) for start, end in reader.source.spans()] == _FEATURES
+    finally:
+        mapped.close()
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_splice_round_trip_is_byte_for_byte(tmp_path, newline):
+    path = _ogr_file(tmp_path, newline)
+    original = path.read_bytes()
+    reader, features = _read(path)
+    spans = reader.source.spans()
+    # Positions recopiées telles quelles.
+    content, positions = splice_features(original, spans, spans, reader.source.ensure_ascii)
+    assert content == original and positions == spans
+    # Features re-sérialisées dans le style du fichier : mêmes octets.
+    content, positions = splice_features(original, spans, features, reader.source.ensure_ascii)
+    assert content == original and positions == spans
+
+
+def test_splice_replaces_removes_and_appends(tmp_path):
+    path = _ogr_file(tmp_path)
+    original = path.read_bytes()
+    reader, features = _read(path)
+    spans = reader.source.spans()
+    changed = {**features[0], "properties": {"nom": "Collège Ünï", "n": 10}}
+    added = {"type": "Feature", "properties": {"nom": "nouvelle"}, "geometry": None}
+    content, positions = splice_features(original, spans, [changed, spans[2], added], False)
+    assert content.startswith(original[:spans[0][0]]) and content.endswith(original[spans[-1][1]:])
+    assert [json.loads(content[start:end]) for start, end in positions] == [changed, features[2], added]
+    assert content[positions[1][0]:positions[1][1]] == original[spans[2][0]:spans[2][1]]
+    assert json.loads(content)['features'] == [changed, features[2], added]
+
+
+def test_write_geojson_rewrites_only_edited_features(tmp_path):
+    pytest.importorskip("PySide6")
+    from geojson_io import write_geojson
+    from models import GeoJsonTableModel
+    path = _ogr_file(tmp_path)
+    original = path.read_bytes()
+    reader, features = _read(path)
+    model = GeoJsonTableModel()
+    model.begin_load()
+    model.append_features(features)
+    model.end_load(reader.metadata, reader.source)
+    model.set_read_only(False)
+    assert model.set_values(1, {"nom": "Cantine modifiée"})
+    source = write_geojson(str(path), model)
+    content = path.read_bytes()
+    spans = reader.source.spans()
+    assert content[:spans[1][0]] == original[:spans[1][0]]
+    assert content.endswith(original[spans[1][1]:])
+    assert json.loads(content)['features'][1]['properties']['nom'] == "Cantine modifiée"
+    assert source.matches(content) and [json.loads(content[start:end]) for start, end in source.spans()] == json.loads(content)['features']
@@ -0,0 +1,145 @@
+# tests/test_joins.py
+import json
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # Pas d'affichage nécessaire
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+
+from controller import AppController
+from joins import Relation, ValueIndex, join_key
+from models import GeoJsonTableModel
+from session import EditSession
+
+KITCHENS = "data/cuisine_centrale.geojson"
+CANTEENS = "data/cantines.geojson"
+
+
+def _features(prop_name, values):
+    return [{"type": "Feature", "properties": {prop_name: value}, "geometry": None} for value in values]
+
+
+def _model(prop_name, values):
+    model = GeoJsonTableModel()
+    model.load_data({"type": "FeatureCollection", "features": _features(prop_name, values)})
+    return model
+
+
+def _relation(canteens, kitchens):
+    return Relation(CANTEENS, "cuisine", KITCHENS, "nom",
+                    ValueIndex("cuisine").bind(canteens), ValueIndex("nom").bind(kitchens))
+
+
+def test_join_key_ignores_case_accents_and_spaces():
+    assert join_key(" Cuisine  centrale Yène ") == join_key("cuisine centrale yene") == "cuisine centrale yene"
+    assert join_key("") is None and join_key("   ") is None and join_key(None) is None
+    assert join_key({"nom": "Yène"}) is None
+
+
+def test_dangling_references_counts_and_duplicate_keys():
+    kitchens = _model("nom", ["Yène", "Rufisque", "Rufisque ", "Bargny"])
+    canteens = _model("cuisine", ["yene", "YÈNE", "Thiaroye", "", None, "rufisque", "Thiaroye"])
+    relation = _relation(canteens, kitchens)
+    assert relation.dangling() == {"Thiaroye": [2, 6]}
+    assert relation.counts() == {"Yène": 2, "Rufisque": 1, "Bargny": 0}
+    assert relation.duplicate_keys() == ["Rufisque"]
+    assert relation.referenced_rows("Rufisque") == [1, 2]
+    assert relation.referencing_rows("yène") == [0, 1]
+    assert relation.is_dangling("Thiaroye") and not relation.is_dangling("") and not relation.is_dangling("Bargny")
+
+
+def test_indexes_follow_the_model_signals():
+    kitchens = _model("nom", ["Yène", "Bargny"])
+    canteens = _model("cuisine", ["Yène", "Thiaroye"])
+    relation = _relation(canteens, kitchens)
+    assert relation.dangling() == {"Thiaroye": [1]}
+
+    # Cellule éditée (dataChanged), d'un côté et de l'autre.
+    assert canteens.set_values(1, {"cuisine": "Bargny"})
+    assert relation.dangling() == {} and relation.counts() == {"Yène": 1, "Bargny": 1}
+    assert kitchens.set_values(0, {"nom": "Yene 2"})
+    assert relation.dangling() == {"Yène": [0]}
+
+    # Lignes ajoutées, puis supprimées : les numéros de ligne suivent.
+    assert kitchens.insert_row() and kitchens.set_values(2, {"nom": "yène"})
+    assert relation.dangling() == {} and relation.referenced_rows("Yène") == [2]
+    assert canteens.remove_rows([0])
+    assert relation.counts() == {"Yene 2": 0, "Bargny": 1, "yène": 0}
+    assert relation.referencing_rows("Bargny") == [0]
+
+    # Annulation et réinitialisation du modèle (modelReset).
+    canteens.undo_stack.undo()
+    assert relation.referencing_rows("Yène") == [0] and relation.referencing_rows("Bargny") == [1]
+    canteens.load_data({"type": "FeatureCollection", "features": _features("cuisine", ["Inconnue"])})
+    assert relation.dangling() == {"Inconnue": [0]}
+
+    relation.source.unbind()
+    assert canteens.set_values(0, {"cuisine": "Bargny"})
+    assert relation.dangling() == {"Inconnue": [0]} # Plus suivi
+
+
+def test_index_from_file_is_a_snapshot(tmp_path):
+    path = tmp_path / "cuisines.geojson"
+    features = _features("nom", ["Yène", "Bargny", "yene"]) + [{"type": "Feature", "properties": None, "geometry": None}]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    index = ValueIndex.from_file(str(path), "nom")
+    assert index.rows(join_key("Yène")) == [0, 2] and index.count("bargny") == 1
+    assert index.label("yene") == "Yène" and sorted(index.keys()) == ["bargny", "yene"]
+
+
+# --- Relations du contrôleur : fichiers non ouverts lus par un worker ---
+
+def _wait(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def controller(tmp_path):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    for path, prop_name, values in ((KITCHENS, "nom", ["Yène", "Bargny"]), (CANTEENS, "cuisine", ["Yène", "Thiaroye"])):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(json.dumps({"type": "FeatureCollection", "features": _features(prop_name, values)}), encoding="utf-8")
+    controller = AppController()
+    controller.config = {"LOCAL_REPO_PATH": str(tmp_path), "FILES": [
+        {"name": "Cuisines centrales", "path": KITCHENS},
+        {"name": "Cantines", "path": CANTEENS, "references": {"cuisine": {"path": KITCHENS, "key": "nom"}}}]}
+    controller.app = app
+    return controller
+
+
+def test_unopened_files_are_indexed_by_a_worker(controller):
+    ready = []
+    controller.relations_ready.connect(lambda: ready.append(True))
+    # Cantines ouvertes : indexées depuis leur modèle ; les cuisines sont lues en arrière-plan.
+    session = EditSession({"name": "Cantines", "path": CANTEENS})
+    session.model.load_data({"type": "FeatureCollection", "features": _features("cuisine", ["Bargny", "Rufisque"])})
+    session.loaded = True
+    controller.sessions[CANTEENS] = session
+    assert controller.join_relations() == [] and controller.relations_worker is not None
+    assert _wait(controller.app, controller.has_relations) and ready == [True]
+    [report] = controller.check_references()
+    assert (report["file"], report["target"]) == ("Cantines", "Cuisines centrales")
+    assert report["dangling"] == {"Rufisque": [1]} and report["counts"] == {"Yène": 0, "Bargny": 1}
+    assert session.model.set_values(1, {"cuisine": "yene"})
+    assert controller.check_references()[0]["dangling"] == {}
+    assert controller.referenced_rows(CANTEENS, "cuisine", "YENE") == [0]
+    assert controller.referencing_rows(KITCHENS, "nom", "Bargny") == {CANTEENS: [0]}
+
+
+def test_invalidated_build_is_restarted(controller, tmp_path):
+    ready = []
+    controller.relations_ready.connect(lambda: ready.append(controller.check_references()[0]["dangling"]))
+    controller.build_relations()
+    first = controller.relations_worker
+    # Fichier modifié sur disque pendant la lecture (synchronisation) : la lecture est relancée.
+    (tmp_path / CANTEENS).write_text(json.dumps({"type": "FeatureCollection", "features": _features("cuisine", ["Bargny"])}), encoding="utf-8")
+    controller._invalidate_relations()
+    assert controller.relations_worker not in (None, first)
+    assert _wait(controller.app, lambda: ready and not controller._abandoned_relations)
+    assert ready == [{}] # Seul le résultat de la nouvelle lecture est pris en compte
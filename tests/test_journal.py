@@ -0,0 +1,111 @@
+# tests/test_journal.py
+import pytest
+
+from journal import MISSING, ChangeJournal, describe_changes
+
+
+def _feature(**properties):
+    return {"type": "Feature", "properties": properties, "geometry": None}
+
+
+def test_edit_back_to_original_value_is_not_a_change():
+    journal = ChangeJournal()
+    journal.record_edit(0, "nom", "A", "B")
+    journal.record_edit(0, "nom", "B", "A")
+    assert not journal.has_changes()
+
+
+def test_same_value_of_another_type_is_a_change():
+    journal = ChangeJournal()
+    journal.record_edit(0, "n", 1, True)
+    assert journal.edits == {0: {"n": 1}}
+
+
+def test_deleted_row_keeps_its_original_values():
+    journal = ChangeJournal()
+    journal.record_edit(3, "nom", "A", "B")
+    journal.record_edit(3, "ajout", MISSING, "x")
+    journal.record_delete(3, _feature(nom="B", ajout="x", autre=1))
+    assert journal.edits == {}
+    assert journal.deleted[3]["properties"] == {"nom": "A", "autre": 1}
+
+
+def test_inserted_row_deleted_again_leaves_no_trace():
+    journal = ChangeJournal()
+    journal.record_insert(7)
+    journal.record_edit(7, "nom", "", "x") # Les éditions d'une ligne ajoutée ne sont pas journalisées
+    journal.record_delete(7, _feature(nom="x"))
+    assert not journal.has_changes()
+
+
+def test_row_states_round_trip():
+    journal = ChangeJournal()
+    journal.record_edit(1, "nom", "A", "B")
+    journal.record_insert(2)
+    journal.record_delete(3, _feature(nom="C"))
+    states = {row_id: journal.row_state(row_id) for row_id in (1, 2, 3, 4)}
+    journal.clear()
+    journal.set_row_states(states)
+    assert (journal.edits, journal.inserted, journal.deleted) == ({1: {"nom": "A"}}, {2}, {3: _feature(nom="C")})
+
+
+def test_summary_and_description():
+    journal = ChangeJournal()
+    journal.record_edit(1, "nom", "A", "B")
+    journal.record_edit(2, "nom", "A", "B")
+    journal.record_edit(2, "adresse", "x", "y")
+    journal.record_insert(5)
+    summary = journal.summary()
+    assert summary == {"added": 1, "modified": 2, "deleted": 0, "properties": {"nom": 2, "adresse": 1}}
+    assert journal.count() == 3
+    assert describe_changes(summary) == "1 ajoutée(s), 2 modifiée(s) (nom, adresse)"
+    assert describe_changes(ChangeJournal().summary()) == "aucune modification"
+
+
+# --- État du journal à travers l'annulation (modèle et pile d'annulation Qt) ---
+
+@pytest.fixture
+def model():
+    pytest.importorskip("PySide6")
+    from models import GeoJsonTableModel
+    model = GeoJsonTableModel()
+    model.load_data({"features": [_feature(nom=f"nom {i}", n=i) for i in range(4)]})
+    model.set_read_only(False)
+    return model
+
+
+def _state(journal):
+    return ({row_id: dict(edits) for row_id, edits in journal.edits.items()}, set(journal.inserted), dict(journal.deleted))
+
+
+def test_undo_redo_restore_journal_exactly(model):
+    journal, stack = model.journal, model.undo_stack
+    states = [_state(journal)]
+    assert model.set_values(1, {"nom": "modifié"})
+    states.append(_state(journal))
+    assert model.insert_rows(2)
+    states.append(_state(journal))
+    assert model.set_values(4, {"nom": "nouveau"})
+    states.append(_state(journal))
+    assert model.remove_rows([0, 1, 5])
+    states.append(_state(journal))
+    assert states[-1] == ({}, {4}, {0: _feature(nom="nom 0", n=0), 1: _feature(nom="nom 1", n=1)})
+
+    for expected in reversed(states[:-1]):
+        stack.undo()
+        assert _state(journal) == expected
+    assert model.rowCount() == 4 and not journal.has_changes()
+    for expected in states[1:]:
+        stack.redo()
+        assert _state(journal) == expected
+    assert model.rowCount() == 3 and journal.count() == 3
+
+
+def test_undoing_an_edit_back_to_the_original_clears_the_row(model):
+    model.set_values(2, {"nom": "x"})
+    model.set_values(2, {"nom": "nom 2"})
+    assert not model.journal.has_changes()
+    model.undo_stack.undo()
+    assert model.journal.edits == {2: {"nom": "nom 2"}}
+    model.undo_stack.undo()
+    assert not model.journal.has_changes()
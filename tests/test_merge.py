@@ -0,0 +1,262 @@
+# tests/test_merge.py
+import json
+
+import pytest
+
+from geojson_io import GeoJsonStreamReader, _dumps_spaced
+from journal import MISSING, ChangeJournal
+from merge import describe_conflicts, index_by_key, local_changes, merge_features, merge_file
+
+
+def _feature(key, **properties):
+    return {"type": "Feature", "properties": {"_uuid": key, **properties}, "geometry": None}
+
+
+def _index(*features):
+    return index_by_key(features, '_uuid')
+
+
+class _Model:
+    """
+    Modèle réduit à ce qu'utilisent merge.py et write_geojson : lignes en dictionnaires et
+    journal (voir GeoJsonTableModel). Sans disposition de fichier, l'écriture est complète.
+    """
+    source = None
+
+    def __init__(self, features):
+        self.features = [json.loads(json.dumps(feature)) for feature in features]
+        self.row_ids = list(range(len(features)))
+        self.journal = ChangeJournal()
+
+    def row_id(self, row): return self.row_ids[row]
+    def get_geojson_data(self): return {"type": "FeatureCollection", "features": self.features}
+    def row_of(self, row_id): return self.row_ids.index(row_id) if row_id in self.row_ids else -1
+    def get_feature(self, row): return self.features[row]
+    def get_value(self, row, prop_name, default=""): return self.features[row]['properties'].get(prop_name, default)
+    def rowCount(self): return len(self.features)
+    def next_row_id(self): return max(self.row_ids, default=-1) + 1
+
+    def edit(self, row, prop_name, value):
+        properties = self.features[row]['properties']
+        self.journal.record_edit(self.row_ids[row], prop_name, properties.get(prop_name, MISSING), value)
+        properties[prop_name] = value
+
+    def delete(self, row):
+        self.journal.record_delete(self.row_ids.pop(row), self.features.pop(row))
+
+    def add(self, feature):
+        row_id = self.next_row_id()
+        self.row_ids.append(row_id)
+        self.features.append(feature)
+        self.journal.record_insert(row_id)
+
+
+# --- merge_features : fusion à trois, sans fichier ---
+
+BASE = _index(_feature("a", nom="A", n=1), _feature("b", nom="B", n=2), _feature("c", nom="C", n=3))
+
+
+def test_edits_on_both_sides_of_different_properties_are_merged():
+    theirs = _index(_feature("a", nom="A", n=10), _feature("b", nom="B", n=2), _feature("c", nom="C", n=3))
+    edits = {"a": ({"nom": "A local"}, None)}
+    replaced, removed, restored, conflicts = merge_features(BASE, theirs, edits, set())
+    assert conflicts == [] and removed == set() and restored == []
+    assert replaced == {"a": _feature("a", nom="A local", n=10)}
+
+
+def test_same_change_on_both_sides_is_not_a_conflict():
+    theirs = _index(_feature("a", nom="pareil", n=1))
+    replaced, _, _, conflicts = merge_features(BASE, theirs, {"a": ({"nom": "pareil"}, None)}, set())
+    assert replaced == {} and conflicts == []
+
+
+def test_same_value_of_another_type_is_a_conflict():
+    theirs = _index(_feature("a", nom="A", n=True))
+    _, _, _, conflicts = merge_features(BASE, theirs, {"a": ({"n": 5}, None)}, set())
+    assert [(key, prop_name) for key, prop_name, _ in conflicts] == [("a", "n")]
+
+
+@pytest.mark.parametrize('prefer, expected', [(None, None), ('ours', "local"), ('theirs', "distant")])
+def test_property_changed_on_both_sides(prefer, expected):
+    theirs = _index(_feature("a", nom="distant", n=1))
+    replaced, _, _, conflicts = merge_features(BASE, theirs, {"a": ({"nom": "local", "n": 7}, None)}, set(), prefer)
+    if prefer is None:
+        assert conflicts == [("a", "nom", "« local » localement, « distant » sur le dépôt distant")]
+    else:
+        assert conflicts == [] and replaced["a"]["properties"] == {"_uuid": "a", "nom": expected, "n": 7}
+
+
+def test_removed_property_is_merged():
+    theirs = _index(_feature("a", nom="A", n=1, autre="x"))
+    replaced, _, _, conflicts = merge_features(BASE, theirs, {"a": ({"nom": MISSING}, None)}, set())
+    assert conflicts == [] and replaced["a"]["properties"] == {"_uuid": "a", "n": 1, "autre": "x"}
+
+
+@pytest.mark.parametrize('prefer', [None, 'ours', 'theirs'])
+def test_edited_locally_deleted_remotely(prefer):
+    local = _feature("b", nom="B local", n=2)
+    theirs = _index(_feature("a", nom="A", n=1))
+    replaced, _, restored, conflicts = merge_features(BASE, theirs, {"b": ({"nom": "B local"}, local)}, set(), prefer)
+    assert replaced == {}
+    assert conflicts == ([("b", None, "modifiée localement, supprimée sur le dépôt distant")] if prefer is None else [])
+    assert restored == ([local] if prefer == 'ours' else [])
+
+
+@pytest.mark.parametrize('prefer', [None, 'ours', 'theirs'])
+def test_deleted_locally_edited_remotely(prefer):
+    theirs = _index(_feature("a", nom="A", n=1), _feature("b", nom="B distant", n=2))
+    _, removed, _, conflicts = merge_features(BASE, theirs, {}, {"b"}, prefer)
+    assert conflicts == ([("b", None, "supprimée localement, modifiée sur le dépôt distant")] if prefer is None else [])
+    assert removed == ({"b"} if prefer == 'ours' else set())
+
+
+def test_deletions_without_remote_change():
+    theirs = _index(_feature("a", nom="A", n=1), _feature("b", nom="B", n=2))
+    _, removed, _, conflicts = merge_features(BASE, theirs, {}, {"b", "c"})
+    assert removed == {"b"} and conflicts == [] # 'c' est supprimée des deux côtés
+
+
+def test_local_changes_uses_the_key_read_from_the_file():
+    model = _Model([_feature("a", nom="A"), {"type": "Feature", "properties": {"nom": "sans clé"}, "geometry": None}, _feature("c", nom="C")])
+    model.edit(0, "_uuid", "changée")
+    model.edit(0, "nom", "A2")
+    model.edit(1, "nom", "x")
+    model.delete(2)
+    model.add(_feature("d", nom="D"))
+    edits, deleted, added, unmatched = local_changes(model)
+    assert edits == {"a": ({"_uuid": "changée", "nom": "A2"}, model.features[0])}
+    assert deleted == {"c"} and added == [_feature("d", nom="D")] and unmatched == 1
+
+
+def test_describe_conflicts_limits_lines():
+    conflicts = [("a", "nom", "m1"), (None, None, "m2")] + [(str(i), None, "m") for i in range(20)]
+    lines = describe_conflicts(conflicts, max_lines=3).splitlines()
+    assert lines == ["- « a », nom : m1", "- m2", "- « 0 » : m", "... et 19 autre(s) conflit(s)."]
+
+
+# --- merge_file : fusion sur le fichier distant ---
+
+def _write(path, features):
+    text = '{\n"type": "FeatureCollection",\n"features": [\n' + ',\n'.join(_dumps_spaced(feature, False) for feature in features) + '\n]\n}\n'
+    path.write_bytes(text.encode('utf-8'))
+    return path.read_bytes()
+
+
+def _features(path):
+    return [feature for batch in GeoJsonStreamReader(str(path)).iter_batches() for feature in batch]
+
+
+FEATURES = [_feature("a", nom="École", n=1), _feature("b", nom="B", n=2), _feature("c", nom="C", n=3)]
+
+
+def test_merge_file_keeps_untouched_features_byte_for_byte(tmp_path):
+    path = tmp_path / 'data.geojson'
+    base = _write(path, FEATURES)
+    model = _Model(FEATURES)
+    model.edit(1, "nom", "B local")
+    model.delete(2)
+    model.add(_feature("d", nom="D"))
+    theirs = [_feature("a", nom="École distante", n=1), _feature("b", nom="B", n=20), FEATURES[2], _feature("e", nom="E")]
+    remote = _write(path, theirs)
+    conflicts, changed, source = merge_file(str(path), base, model)
+    assert conflicts == [] and changed and source is None # Fichier fusionné : à relire
+    assert _features(path) == [theirs[0], _feature("b", nom="B local", n=20), theirs[3], _feature("d", nom="D")]
+    line = _dumps_spaced(theirs[0], False).encode('utf-8')
+    assert line in remote and line in path.read_bytes()
+
+
+def test_merge_file_conflict_leaves_the_file_untouched(tmp_path):
+    path = tmp_path / 'data.geojson'
+    base = _write(path, FEATURES)
+    model = _Model(FEATURES)
+    model.edit(0, "nom", "local")
+    remote = _write(path, [_feature("a", nom="distant", n=1)] + FEATURES[1:])
+    conflicts, changed, _ = merge_file(str(path), base, model)
+    assert [(key, prop_name) for key, prop_name, _ in conflicts] == [("a", "nom")] and not changed
+    assert path.read_bytes() == remote
+    conflicts, changed, _ = merge_file(str(path), base, model, prefer='theirs')
+    assert conflicts == [] and not changed and path.read_bytes() == remote
+    conflicts, changed, _ = merge_file(str(path), base, model, prefer='ours')
+    assert conflicts == [] and changed and _features(path)[0]["properties"]["nom"] == "local"
+
+
+def test_merge_file_with_a_configured_key(tmp_path):
+    features = [{"type": "Feature", "properties": {"code": f"K{i}", "nom": f"n{i}"}, "geometry": None} for i in range(3)]
+    path = tmp_path / 'data.geojson'
+    base = _write(path, features)
+    model = _Model(features)
+    model.edit(2, "nom", "local")
+    _write(path, [{**features[0], "properties": {"code": "K0", "nom": "distant"}}] + features[1:])
+    assert merge_file(str(path), base, model, key='code') == ([], True, None)
+    assert [feature["properties"]["nom"] for feature in _features(path)] == ["distant", "n1", "local"]
+
+
+@pytest.mark.parametrize('prefer', [None, 'ours', 'theirs'])
+def test_rows_without_key_decide_for_the_whole_file(tmp_path, prefer):
+    features = [{"type": "Feature", "properties": {"nom": f"n{i}"}, "geometry": None} for i in range(3)]
+    path = tmp_path / 'data.geojson'
+    base = _write(path, features)
+    model = _Model(features)
+    model.edit(0, "nom", "local")
+    remote = _write(path, features[:2] + [{**features[2], "properties": {"nom": "distant"}}])
+    conflicts, changed, source = merge_file(str(path), base, model, prefer=prefer)
+    names = [feature["properties"]["nom"] for feature in _features(path)]
+    if prefer is None:
+        assert len(conflicts) == 1 and "_uuid" in conflicts[0][2] and not changed and path.read_bytes() == remote
+    elif prefer == 'theirs':
+        assert (conflicts, changed, source) == ([], False, None) and names == ["n0", "n1", "distant"]
+    else:
+        assert (conflicts, changed) == ([], True) and names == ["local", "n1", "n2"]
+        # Le fichier est le contenu du modèle, écrit dans le style du fichier distant.
+        content = path.read_bytes()
+        assert content.replace(b'"local"', b'"n0"').replace(b'"n2"', b'"distant"') == remote
+        assert source.matches(content)
+        assert [json.loads(content[start:end]) for start, end in source.spans()] == model.features
+
+
+def test_whole_file_ours_reuses_the_remote_text(tmp_path):
+    features = [{"type": "Feature", "properties": {"nom": f"n{i}"}, "geometry": None} for i in range(4)]
+    path = tmp_path / 'data.geojson'
+    base = _write(path, features)
+    model = _Model(features)
+    model.delete(1)
+    model.add({"type": "Feature", "properties": {"nom": "nouvelle"}, "geometry": None})
+    # Version distante dans un autre style, et dont les features sont dans un autre ordre.
+    remote = json.dumps({"type": "FeatureCollection", "features": features[::-1] + [features[0]]}, indent=4).encode('utf-8')
+    path.write_bytes(remote)
+    conflicts, changed, source = merge_file(str(path), base, model, prefer='ours')
+    content = path.read_bytes()
+    assert conflicts == [] and changed and json.loads(content)['features'] == model.features
+    for feature, (start, end) in zip(model.features[:-1], source.spans()): # Recopiées depuis la version distante
+        assert content[start:end].decode('utf-8') in remote.decode('utf-8') and json.loads(content[start:end]) == feature
+    assert content.startswith(b'{\n    "type": "FeatureCollection"')
+    assert source.span(model.row_ids[-1]) == source.spans()[-1]
+
+
+# --- Clé de fusion des lignes ajoutées (GeoJsonTableModel) ---
+
+@pytest.mark.parametrize('key, visible_headers', [('_uuid', None), ('id', None), ('_uuid', ["nom"])])
+def test_new_rows_get_a_fresh_merge_key(key, visible_headers):
+    pytest.importorskip("PySide6")
+    import uuid
+    from models import GeoJsonTableModel
+    model = GeoJsonTableModel()
+    model.merge_key = key
+    model.begin_load(visible_headers=visible_headers)
+    model.append_features([{"type": "Feature", "properties": {key: f"k{row}", "nom": f"N{row}"}, "geometry": None} for row in range(2)])
+    model.end_load({})
+    model.set_read_only(False)
+    assert model.insert_rows(2) and model.duplicate_rows([0])
+    keys = [model.get_feature(row)['properties'][key] for row in range(model.rowCount())]
+    assert keys[:2] == ["k0", "k1"] and len(set(keys)) == 5
+    assert all(str(uuid.UUID(value)) == value for value in keys[2:])
+
+
+def test_new_rows_without_merge_key_column():
+    pytest.importorskip("PySide6")
+    from models import GeoJsonTableModel
+    model = GeoJsonTableModel()
+    model.load_data({"features": [{"type": "Feature", "properties": {"nom": "A"}, "geometry": None}]})
+    model.set_read_only(False)
+    assert model.insert_rows(1)
+    assert model.get_feature(1)['properties'] == {"nom": ""}
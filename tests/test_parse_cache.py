@@ -0,0 +1,48 @@
+# tests/test_parse_cache.py
+import json
+
+import pytest
+
+from parse_cache import ParseCache, blob_id
+
+
+def test_key_depends_on_content_and_load_options(tmp_path):
+    path = tmp_path / "f.geojson"
+    path.write_text('{"type": "FeatureCollection", "features": []}', encoding="utf-8")
+    blob = blob_id(str(path))
+    assert blob == "188bb9e4734d254e85ec877bda5580db03ee0280" # git hash-object
+    key = ParseCache.key(blob, 'columnar', {}, None)
+    assert key.startswith(blob)
+    assert key != ParseCache.key(blob, 'dict', {}, None) != ParseCache.key(blob, 'columnar', {"n": 'int'}, None)
+
+
+def _load(path, cache, storage, visible_headers=None):
+    """Charge un fichier comme le contrôleur, dans ce thread. Renvoie le modèle et le worker."""
+    from controller import GeoJsonLoadWorker
+    from models import GeoJsonTableModel
+    model = GeoJsonTableModel()
+    model.begin_load(visible_headers=visible_headers, storage=storage)
+    worker = GeoJsonLoadWorker(str(path), cache=cache, cache_options={"storage": storage, "column_types": {}, "visible_headers": visible_headers})
+    worker.batch_loaded.connect(model.append_features)
+    worker.cache_loaded.connect(model.load_cached)
+    worker.finished.connect(lambda success, message, metadata, source: model.end_load(metadata, source, worker.inference))
+    worker.run()
+    return model, worker
+
+
+@pytest.mark.parametrize('storage, visible_headers', [('dict', None), ('columnar', None), ('columnar', ["nom", "n"])])
+def test_entry_written_by_the_load_worker_restores_the_model(tmp_path, storage, visible_headers):
+    pytest.importorskip("PySide6")
+    path = tmp_path / "f.geojson"
+    features = [{"type": "Feature", "properties": {"nom": f"Cantine {row}", "n": row, **({"extra": True} if row == 3 else {})},
+                 "geometry": {"type": "Point", "coordinates": [-17.4, 14.7]}} for row in range(5)]
+    path.write_text(json.dumps({"type": "FeatureCollection", "name": "cantines", "features": features}), encoding="utf-8")
+    cache = ParseCache(str(tmp_path / "cache"))
+    read, worker = _load(path, cache, storage, visible_headers)
+    assert worker.cache_key is not None and worker.inference is not None
+    cached, worker = _load(path, cache, storage, visible_headers)
+    assert worker.inference is None # Schéma repris du cache
+    assert cached.get_headers() == read.get_headers()
+    assert cached.get_all_features() == read.get_all_features() == features
+    assert cached.get_geojson_data()["name"] == "cantines" and cached.source.digest == read.source.digest
+    assert {name: column.type for name, column in cached.get_schema().items()} == {name: column.type for name, column in read.get_schema().items()}
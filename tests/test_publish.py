@@ -0,0 +1,181 @@
+# tests/test_publish.py
+import json
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+git = pytest.importorskip("git")
+
+from PySide6.QtCore import QCoreApplication
+
+from controller import AppController, PUBLISH_COMMIT, PUBLISH_PULL, PUBLISH_PUSH, PUBLISH_SERIALIZE, PUBLISH_VALIDATE, GitPublishWorker
+from geojson_io import GeoJsonStreamReader
+from git_handler import GitHandler
+from models import GeoJsonTableModel
+
+PATH = "data/cantines.geojson"
+OTHER_PATH = "data/menus.geojson"
+
+
+def _feature(key, nom, n):
+    return {"type": "Feature", "properties": {"_uuid": key, "nom": nom, "n": n}, "geometry": {"type": "Point", "coordinates": [-17.4, 14.7]}}
+
+
+def _write(path, features):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _identity(repo):
+    with repo.config_writer() as writer:
+        writer.set_value("user", "name", "Test").set_value("user", "email", "test@example.org")
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """Dépôt distant nu, avec un premier commit contenant PATH et OTHER_PATH."""
+    origin = git.Repo.init(tmp_path / "origin.git", bare=True)
+    seed = git.Repo.init(tmp_path / "seed")
+    _identity(seed)
+    _write(tmp_path / "seed" / PATH, [_feature(f"k{i}", f"Cantine {i}", i) for i in range(3)])
+    _write(tmp_path / "seed" / OTHER_PATH, [_feature(f"m{i}", f"Menu {i}", i) for i in range(2)])
+    seed.git.add("--", PATH, OTHER_PATH)
+    seed.git.commit("-m", "Données initiales")
+    seed.git.push(origin.git_dir, f"HEAD:refs/heads/{seed.active_branch.name}")
+    origin.git.symbolic_ref("HEAD", f"refs/heads/{seed.active_branch.name}")
+    return origin
+
+
+def _clone(origin, path):
+    repo = git.Repo.clone_from(origin.git_dir, path)
+    _identity(repo)
+    return repo
+
+
+def _model(path, column_types=None):
+    reader = GeoJsonStreamReader(str(path))
+    model = GeoJsonTableModel()
+    model.begin_load(column_types=column_types)
+    for batch in reader.iter_batches(): model.append_features(batch)
+    model.end_load(reader.metadata, reader.source)
+    model.set_read_only(False)
+    return model
+
+
+def _run(worker, cancel_at=None):
+    """Exécute la publication dans ce thread ; 'cancel_at' l'annule quand cette étape commence."""
+    stages, results = [], []
+    def on_progress(stage, _message):
+        stages.append(stage)
+        if stage == cancel_at: worker.cancel()
+    worker.progress.connect(on_progress)
+    worker.finished.connect(lambda success, message: results.append((success, message)))
+    worker.run()
+    return stages, results[0]
+
+
+def _remote_features(origin, path=PATH):
+    return json.loads(origin.git.show(f"HEAD:{path}"))["features"]
+
+
+def test_publish_goes_through_every_stage(tmp_path, origin):
+    local = _clone(origin, tmp_path / "local")
+    model = _model(tmp_path / "local" / PATH)
+    assert model.set_values(1, {"nom": "Cantine modifiée"})
+    worker = GitPublishWorker(GitHandler(local.working_dir), [(PATH, model)], "Mise à jour", validate=True)
+    stages, (success, message) = _run(worker)
+    assert success, message
+    assert stages == [PUBLISH_VALIDATE, PUBLISH_PULL, PUBLISH_SERIALIZE, PUBLISH_COMMIT, PUBLISH_PUSH]
+    assert worker.committed and worker.pushed and not worker.problems
+    assert origin.head.commit.hexsha == local.head.commit.hexsha
+    assert [feature["properties"]["nom"] for feature in _remote_features(origin)] == ["Cantine 0", "Cantine modifiée", "Cantine 2"]
+    assert worker.sources[PATH].matches((tmp_path / "local" / PATH).read_bytes())
+
+
+def test_publish_merges_a_remote_change(tmp_path, origin):
+    local = _clone(origin, tmp_path / "local")
+    model = _model(tmp_path / "local" / PATH)
+    other = _clone(origin, tmp_path / "other")
+    features = [_feature(f"k{i}", f"Cantine {i}", i) for i in range(3)]
+    features[2]["properties"]["n"] = 20
+    _write(tmp_path / "other" / PATH, features)
+    other.git.commit("-am", "Modification distante")
+    other.git.push()
+
+    assert model.set_values(0, {"nom": "Cantine locale"})
+    worker = GitPublishWorker(GitHandler(local.working_dir), [(PATH, model)], "Mise à jour")
+    stages, (success, message) = _run(worker)
+    assert success, message
+    assert stages == [PUBLISH_PULL, PUBLISH_SERIALIZE, PUBLISH_COMMIT, PUBLISH_PUSH]
+    assert worker.merged == [PATH]
+    properties = [feature["properties"] for feature in _remote_features(origin)]
+    assert (properties[0]["nom"], properties[2]["n"]) == ("Cantine locale", 20)
+
+
+def test_invalid_values_stop_before_any_write(tmp_path, origin):
+    local = _clone(origin, tmp_path / "local")
+    # Valeur écrite hors de l'éditeur, refusée par le type configuré de la colonne.
+    _write(tmp_path / "local" / PATH, [_feature("k0", "Cantine 0", 0), _feature("k1", "Cantine 1", "beaucoup")])
+    original = (tmp_path / "local" / PATH).read_bytes()
+    model = _model(tmp_path / "local" / PATH, column_types={"n": "int"})
+    assert model.set_values(0, {"nom": "Cantine modifiée"})
+    worker = GitPublishWorker(GitHandler(local.working_dir), [(PATH, model)], "Mise à jour", validate=True)
+    stages, (success, _message) = _run(worker)
+    assert not success and stages == [PUBLISH_VALIDATE]
+    assert [(prop_name, rows) for prop_name, _severity, _message, rows in worker.problems[PATH]] == [("n", [1])]
+    assert (tmp_path / "local" / PATH).read_bytes() == original
+
+
+@pytest.mark.parametrize("cancel_at", [PUBLISH_SERIALIZE, PUBLISH_COMMIT])
+def test_cancel_rolls_back_files_and_commit(tmp_path, origin, cancel_at):
+    local = _clone(origin, tmp_path / "local")
+    head = local.head.commit.hexsha
+    original = (tmp_path / "local" / PATH).read_bytes()
+    model = _model(tmp_path / "local" / PATH)
+    assert model.set_values(0, {"nom": "Cantine annulée"})
+    worker = GitPublishWorker(GitHandler(local.working_dir), [(PATH, model)], "Mise à jour")
+    stages, (success, message) = _run(worker, cancel_at=cancel_at)
+    assert not success and "annulée" in message
+    assert PUBLISH_PUSH not in stages and not worker.pushed
+    assert worker.committed == (cancel_at == PUBLISH_COMMIT) # Commit créé puis défait
+    assert local.head.commit.hexsha == head == origin.head.commit.hexsha
+    assert (tmp_path / "local" / PATH).read_bytes() == original
+    assert not local.is_dirty()
+
+
+# --- Publication de plusieurs fichiers ouverts (AppController, sessions d'édition) ---
+
+def _wait(app, busy, timeout=10):
+    """Traite les signaux des workers (threads Qt) jusqu'à la fin de l'opération en cours."""
+    deadline = time.monotonic() + timeout
+    while busy():
+        assert time.monotonic() < deadline
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_one_publish_commits_every_open_file(tmp_path, origin):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    local = _clone(origin, tmp_path / "local")
+    initial = local.head.commit
+    controller = AppController()
+    controller.config = {"LOCAL_REPO_PATH": local.working_dir, "CACHE_MAX_MB": 0}
+    controller.git_handler = GitHandler(local.working_dir)
+    results = []
+    controller.publish_finished.connect(lambda success, message: results.append((success, message)))
+    for name, path, row in (("Cantines", PATH, 1), ("Menus", OTHER_PATH, 0)):
+        controller.select_data_source({"name": name, "path": path})
+        _wait(app, controller.is_loading)
+        assert controller.model.set_values(row, {"nom": f"{name} modifié"})
+    # Le premier fichier, qui n'est plus affiché, garde ses modifications dans sa session.
+    assert [session.path for session in controller.modified_sessions()] == [PATH, OTHER_PATH]
+
+    controller.publish_changes()
+    _wait(app, controller.is_publishing)
+    assert results == [(True, "Modifications poussées sur GitHub !")]
+    commit = origin.head.commit
+    assert commit.parents == (initial,) and set(commit.stats.files) == {PATH, OTHER_PATH}
+    assert _remote_features(origin)[1]["properties"]["nom"] == "Cantines modifié"
+    assert _remote_features(origin, OTHER_PATH)[0]["properties"]["nom"] == "Menus modifié"
+    assert not controller.has_changes()
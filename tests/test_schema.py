@@ -0,0 +1,130 @@
+# tests/test_schema.py
+import pytest
+
+from feature_store import create_store
+from schema import ENUM_MAX_VALUES, ColumnSchema, SchemaInference, infer_column, infer_schema, validate_columns
+
+
+def _type(values):
+    return infer_column('c', values).type
+
+
+@pytest.mark.parametrize('values, expected', [
+    ([1, 2, None], 'int'),
+    ([1, 2.5], 'float'),
+    ([True, False], 'bool'),
+    (["2024-01-02", "2023-12-31T10:00:00Z"], 'date'),
+    (["2024-02-30"], 'string'), # Forme de date, mais pas une date
+    (["https://a.org", "http://b.org/x"], 'url'),
+    ([1, "un"], 'string'),
+    ([[1], {"a": 1}], 'string'),
+    ([None, None], 'string'),
+    ([], 'string'),
+])
+def test_inferred_types(values, expected):
+    assert _type(values) == expected
+
+
+@pytest.mark.parametrize('values, expected', [
+    # Lignes ajoutées dans le tableau : cellules '' d'une colonne numérique ou booléenne.
+    ([1, 2, ""], 'int'),
+    ([1, 2.5, "", ""], 'float'),
+    ([True, ""], 'bool'),
+    (["", "", ""], 'string'),
+    (["", None], 'string'),
+    (["2024-01-02", ""], 'date'),
+    (["https://a.org", ""], 'url'),
+    ([1, "", "x"], 'string'), # Un vrai texte reste un mélange
+])
+def test_empty_strings_do_not_decide_the_type(values, expected):
+    assert _type(values) == expected
+
+
+def test_enum_needs_few_repeated_values():
+    assert infer_column('c', ["a", "b", "a", "b", "a", "b", ""]).type == 'enum'
+    assert infer_column('c', ["a", "b", "a", "b", "a", "b"]).choices == {"a", "b"}
+    assert _type(["a", "b", "a"]) == 'string' # Pas assez répétées
+    many = [f"v{i}" for i in range(ENUM_MAX_VALUES + 1)] * 5
+    assert _type(many) == 'string'
+
+
+def test_chunked_inference_matches_whole_column():
+    values = [None, "", "a", "b", "c"] * 4 + ["d"] * 3 + [f"x{i}" for i in range(ENUM_MAX_VALUES)] + [""]
+    for size in (1, 3, 7, len(values)):
+        inference = SchemaInference()
+        for start in range(0, len(values), size): inference.add({'c': values[start:start + size]})
+        expected = infer_column('c', values)
+        column = inference.schema(['c'])['c']
+        assert (column.type, column.choices) == (expected.type, expected.choices)
+
+
+def test_configured_types_win_and_are_not_read():
+    read = []
+    def column_chunks(names):
+        read.extend(names)
+        yield {name: ["1", "2"] for name in names}
+    schema = infer_schema(['a', 'b'], column_chunks, {'a': 'int', 'b': 'inconnu'})
+    assert read == ['b'] and schema['a'].type == 'int' and schema['a'].explicit and schema['b'].type == 'string'
+
+
+@pytest.mark.parametrize('kind, text, expected', [
+    ('int', " 12 ", 12), ('int', "", None),
+    ('float', "3,5", 3.5), ('float', "1 000", 1000),
+    ('bool', "Oui", True), ('bool', "non", False),
+    ('date', "2024-05-01", "2024-05-01"), ('string', "", ""),
+])
+def test_convert(kind, text, expected):
+    value = ColumnSchema('c', kind).convert(text)
+    assert value == expected and type(value) is type(expected)
+
+
+@pytest.mark.parametrize('kind, text', [('int', "1.5"), ('float', "abc"), ('bool', "peut-être"), ('date', "01/05/2024"), ('url', "www.x.org")])
+def test_convert_rejects(kind, text):
+    with pytest.raises(ValueError):
+        ColumnSchema('c', kind).convert(text)
+
+
+@pytest.mark.parametrize('storage', ['dict', 'columnar', 'lazy'])
+def test_validate_columns_reports_rows_per_problem(storage):
+    store = create_store(storage)
+    values = [1, True, "x", None, "", 2, "x", [1]]
+    store.extend([{"type": "Feature", "properties": {"n": value, "cat": "a"}, "geometry": None} for value in values])
+    schema = {"n": ColumnSchema("n", 'int'), "cat": ColumnSchema("cat", 'enum', {"b"}), "libre": ColumnSchema("libre")}
+    problems = validate_columns(schema, store.column_chunks)
+    assert problems == [
+        ("n", 'error', "« True » n'est pas un nombre entier.", [1]),
+        ("n", 'error', "« x » n'est pas un nombre entier.", [2, 6]),
+        ("n", 'error', "« [1] » n'est pas un nombre entier.", [7]),
+        ("cat", 'warning', "« a » ne fait pas partie des valeurs habituelles.", list(range(8))),
+    ]
+    assert validate_columns(schema, store.column_chunks, {6}.__contains__) == [
+        ("n", 'error', "« x » n'est pas un nombre entier.", [6]),
+        ("cat", 'warning', "« a » ne fait pas partie des valeurs habituelles.", [6]),
+    ]
+
+
+def test_lazy_store_chunks_keep_row_numbers():
+    store = create_store('lazy')
+    store.extend([{"type": "Feature", "properties": {"n": "x" if row % 5 == 0 else row}, "geometry": None} for row in range(23)])
+    problems = validate_columns({"n": ColumnSchema("n", 'int')}, lambda names: store.column_chunks(names, chunk_size=4))
+    assert problems == [("n", 'error', "« x » n'est pas un nombre entier.", [0, 5, 10, 15, 20])]
+
+
+@pytest.mark.parametrize('storage', ['dict', 'columnar', 'lazy'])
+def test_schema_is_inferred_while_loading(tmp_path, monkeypatch, storage):
+    pytest.importorskip("PySide6")
+    import json
+    import models
+    from controller import GeoJsonLoadWorker
+    path = tmp_path / "f.geojson"
+    features = [{"type": "Feature", "properties": {"n": row, "cat": "ab"[row % 2], "date": "2024-05-01"}, "geometry": None} for row in range(40)]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    model = models.GeoJsonTableModel()
+    model.begin_load(storage=storage)
+    worker = GeoJsonLoadWorker(str(path), lazy=storage == 'lazy')
+    worker.batch_loaded.connect(model.append_features)
+    worker.finished.connect(lambda success, message, metadata, source: model.end_load(metadata, source, worker.inference))
+    worker.run()
+    # Le schéma vient de la lecture : aucun nouveau parcours des lignes.
+    monkeypatch.setattr(models, 'infer_schema', None)
+    assert {name: column.type for name, column in model.get_schema().items()} == {"cat": 'enum', "date": 'date', "n": 'int'}
@@ -0,0 +1,76 @@
+# tests/test_spatial.py
+import random
+
+import pytest
+
+from spatial import GridIndex, METERS_PER_DEGREE, distance_m, geometry_bounds, representative_point
+
+
+def _random_points(count, seed, xmin=-17.6, ymin=14.6, xmax=-17.0, ymax=14.9):
+    rng = random.Random(seed)
+    return {row_id: (rng.uniform(xmin, xmax), rng.uniform(ymin, ymax)) for row_id in range(count)}
+
+
+def _brute_within(points, x, y, meters):
+    return sorted((distance_m(x, y, *point), row_id) for row_id, point in points.items() if distance_m(x, y, *point) <= meters)
+
+
+def test_distance_and_geometry_helpers():
+    assert distance_m(0, 0, 0, 1) == pytest.approx(METERS_PER_DEGREE)
+    assert distance_m(-17.4, 14.7, -17.4, 14.7) == 0
+    polygon = {"type": "Polygon", "coordinates": [[[0, 0], [4, 0], [4, 2], [0, 2], [0, 0]]]}
+    assert geometry_bounds(polygon) == (0, 0, 4, 2)
+    assert representative_point(polygon) == (2, 1)
+    assert representative_point({"type": "Point", "coordinates": [1, 2, 30]}) == (1.0, 2.0)
+    collection = {"type": "GeometryCollection", "geometries": [polygon, {"type": "Point", "coordinates": [-1, 5]}]}
+    assert geometry_bounds(collection) == (-1, 0, 4, 5)
+    for empty in (None, {"type": "Point", "coordinates": []}, {"type": "LineString", "coordinates": []}):
+        assert representative_point(empty) is None
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_queries_match_brute_force(seed):
+    points = _random_points(500, seed)
+    index = GridIndex.build(list(points.items()) + [(999, None)])
+    assert len(index) == 500
+    rng = random.Random(seed)
+    for _ in range(20):
+        x, y = rng.uniform(-17.7, -16.9), rng.uniform(14.5, 15.0)
+        xmin, ymin = x - rng.uniform(0, 0.2), y - rng.uniform(0, 0.2)
+        assert sorted(index.in_bbox(xmin, ymin, x, y)) == sorted(row_id for row_id, (px, py) in points.items()
+                                                                   if xmin <= px <= x and ymin <= py <= y)
+        meters = rng.uniform(100, 20000)
+        assert index.within_distance(x, y, meters) == _brute_within(points, x, y, meters)
+        count = rng.randint(1, 10)
+        expected = sorted((distance_m(x, y, *point), row_id) for row_id, point in points.items())[:count]
+        assert index.nearest(x, y, count) == expected
+
+
+def test_nearest_far_from_the_data_and_at_high_latitude():
+    points = _random_points(300, 7, xmin=10, ymin=69, xmax=12, ymax=70)
+    index = GridIndex.build(points.items())
+    for x, y in ((11, 69.5), (-120, -40), (11, 80)):
+        expected = sorted((distance_m(x, y, *point), row_id) for row_id, point in points.items())[:3]
+        assert index.nearest(x, y, 3) == expected
+
+
+def test_add_move_and_remove_keep_queries_exact():
+    points = _random_points(200, 3)
+    index = GridIndex.build(points.items())
+    for row_id in range(0, 200, 3):
+        index.remove(row_id)
+        del points[row_id]
+    for row_id in range(1, 200, 3):
+        points[row_id] = (points[row_id][0] + 0.05, points[row_id][1] - 0.05)
+        index.add(row_id, points[row_id]) # Déplacement
+    points[500] = (-17.9, 14.2) # Hors de l'emprise d'origine
+    index.add(500, points[500])
+    assert len(index) == len(points)
+    assert index.nearest(-17.9, 14.2, 1) == [(0.0, 500)]
+    assert index.within_distance(-17.3, 14.75, 15000) == _brute_within(points, -17.3, 14.75, 15000)
+    assert index.point(0) is None and index.in_bbox(-180, -90, 180, 90).count(500) == 1
+
+
+def test_empty_index():
+    index = GridIndex.build([])
+    assert index.nearest(0, 0, 3) == [] and index.in_bbox(-1, -1, 1, 1) == [] and index.within_distance(0, 0, 1000) == []